@@ -0,0 +1,68 @@
+"""Benchmark the medical-text classifier that routes queries between the
+NLP extraction path and the web-search path.
+
+    python benchmarks/bench_classifier.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.classifier import MedicalTextClassifier  # noqa: E402
+
+# (query, is prescription text)
+CORPUS = [
+    ("Metformin 500 mg twice daily with meals", True),
+    ("Lisinopril 10mg PO QD", True),
+    ("Amoxicillin 875 mg BID x 10 days", True),
+    ("Albuterol inhaler 2 puffs q4h PRN wheezing", True),
+    ("Insulin glargine 20 units subq qhs", True),
+    ("Rx: atorvastatin 40 mg, disp #90, 3 refills", True),
+    ("Warfarin 5 mg po daily; aspirin 81 mg daily", True),
+    ("Ondansetron 4 mg IV every 6 hours as needed", True),
+    ("Prednisone 20mg tab, take 2 tabs by mouth daily", True),
+    ("Sig: 1 cap PO TID", True),
+    ("Levothyroxine 75 mcg every morning before breakfast", True),
+    ("Hydrocortisone 1% cream topical BID", True),
+    ("What are the best medications for type 2 diabetes?", False),
+    ("drugs that interact with grapefruit juice", False),
+    ("alternatives to statins for elderly patients", False),
+    ("Is it safe to combine ibuprofen and alcohol", False),
+    ("first line treatment for hypertension in pregnancy", False),
+    ("side effects of SSRIs in teenagers", False),
+    ("which antibiotics are safe for penicillin allergy", False),
+    ("important counseling points for anticoagulants", False),
+]
+
+LEGACY_PATTERNS = [
+    r'\d+\s*mg', r'\d+\s*mcg', r'\d+\s*ml',
+    r'take\s+\d+', r'twice\s+daily', r'once\s+daily',
+    r'tablet', r'capsule', r'injection'
+]
+
+
+def legacy_is_medical(text: str) -> bool:
+    return any(re.search(pattern, text, re.IGNORECASE) for pattern in LEGACY_PATTERNS)
+
+
+def measure(name, classify, iterations=2000):
+    correct = sum(classify(query) == expected for query, expected in CORPUS)
+    misrouted = [query for query, expected in CORPUS if expected and not classify(query)]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for query, _ in CORPUS:
+            classify(query)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / (iterations * len(CORPUS)) * 1e6
+    print(f"{name:10} accuracy {correct}/{len(CORPUS)}  {per_call_us:6.2f} us/query  "
+          f"prescriptions sent to web search: {len(misrouted)}")
+    for query in misrouted:
+        print(f"{'':10}   - {query}")
+
+
+if __name__ == "__main__":
+    measure("legacy", legacy_is_medical)
+    measure("combined", MedicalTextClassifier().is_medical)
@@ -0,0 +1,98 @@
+"""Benchmark parsing of NLP extraction responses.
+
+Runs the previous parser (slice from the first "{" to the last "}" and
+json.loads) and the tolerant item parser, whole and fed in streaming chunks,
+over benchmarks/data/extraction_responses.jsonl: extraction responses in
+the shapes models return for the extraction prompt (bare and wrapped arrays,
+fenced blocks, prose around the JSON, one object per line, trailing commas,
+output cut off at the token limit), each with the drugs it should yield.
+
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --chunk 16 --repeat 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.extraction import JSONItemParser, drug_details_from_items, parse_drug_details  # noqa: E402
+from src.models import ExtractedDrugInfo  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "extraction_responses.jsonl")
+
+
+def legacy_parse(response_content: str) -> List[ExtractedDrugInfo]:
+    """The parser extraction used before the item parser"""
+    try:
+        if "{" in response_content:
+            json_str = response_content[response_content.find("{"):response_content.rfind("}") + 1]
+            drug_data = json.loads(json_str)
+            if isinstance(drug_data, list):
+                return [ExtractedDrugInfo(**item) for item in drug_data]
+            return [ExtractedDrugInfo(**drug_data)]
+        return []
+    except Exception:
+        return []
+
+
+def streaming_parse(chunk: int) -> Callable[[str], List[ExtractedDrugInfo]]:
+    def parse(text: str) -> List[ExtractedDrugInfo]:
+        parser = JSONItemParser()
+        items = []
+        for start in range(0, len(text), chunk):
+            items += parser.feed(text[start:start + chunk])
+        return drug_details_from_items(items + parser.close())
+    return parse
+
+
+def load_corpus(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def measure(name: str, parse: Callable[[str], List[ExtractedDrugInfo]], corpus: List[Dict], repeat: int) -> Dict[str, float]:
+    by_shape = defaultdict(lambda: [0, 0])
+    exact = found = expected = 0
+    for row in corpus:
+        names = [detail.drug_name for detail in parse(row["response"])]
+        ok = names == row["expected"]
+        exact += ok
+        found += len(set(names) & set(row["expected"]))
+        expected += len(row["expected"])
+        by_shape[row["shape"]][0] += ok
+        by_shape[row["shape"]][1] += 1
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in corpus:
+            parse(row["response"])
+    micros = (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+    print(f"{name:16} success {exact / len(corpus):6.1%}  drug recall {found / expected:6.1%}  {micros:7.1f} µs/response")
+    return {shape: ok / total for shape, (ok, total) in by_shape.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--chunk", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--repeat", type=int, default=100, help="Passes over the corpus for timing")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} responses")
+    results = {
+        "legacy": measure("legacy", legacy_parse, corpus, args.repeat),
+        "item parser": measure("item parser", parse_drug_details, corpus, args.repeat),
+        "streamed": measure(f"streamed ({args.chunk})", streaming_parse(args.chunk), corpus, args.repeat),
+    }
+    print("\nsuccess by shape")
+    print(f"{'':18}" + "".join(f"{name:>14}" for name in results))
+    for shape in sorted(results["legacy"]):
+        print(f"{shape:18}" + "".join(f"{rates[shape]:>14.0%}" for rates in results.values()))
@@ -0,0 +1,68 @@
+"""Benchmark start-up cost: importing the workflow module and building a
+Workflow, each measured in a fresh interpreter.
+
+    python benchmarks/bench_import.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["langgraph", "langchain_openai", "langchain_core", "firecrawl", "openai"]
+
+# Each snippet prints the seconds spent after interpreter start-up plus the heavy modules it loaded
+SNIPPETS = {
+    "import src.workflow": "import src.workflow",
+    "Workflow()": "from src.workflow import Workflow; Workflow()",
+    "local-only extraction": (
+        "from src.workflow import Workflow; from src.models import ResearchState; "
+        "w = Workflow(); w._extract_drugs_step(ResearchState(query='Metformin 500 mg BID; Warfarin 5 mg')); "
+        "w._analyze_interactions_step(ResearchState(query='', extracted_drugs=['Metformin', 'Warfarin']))"
+    ),
+    "Workflow().warm()": "from src.workflow import Workflow; Workflow().warm()",
+}
+
+TEMPLATE = """
+import sys, time, io, contextlib, json
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    {snippet}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(snippet: str) -> dict:
+    env = {
+        **os.environ,
+        # No network or API keys are needed to start up
+        "FIRECRAWL_API_KEY": os.getenv("FIRECRAWL_API_KEY", "fc-benchmark"),
+        "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY", "sk-benchmark"),
+        "ANALYSIS_CACHE_PATH": "",
+        "FIRECRAWL_CACHE_PATH": "",
+        "PYTHONWARNINGS": "ignore",
+    }
+    code = TEMPLATE.format(snippet=snippet, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start-up cost benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, snippet in SNIPPETS.items():
+        results = [measure(snippet) for _ in range(args.runs)]
+        median_ms = statistics.median(result["seconds"] for result in results) * 1000
+        loaded = ", ".join(results[-1]["loaded"]) or "none"
+        print(f"{name:<24} median {median_ms:8.1f} ms   heavy modules loaded: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
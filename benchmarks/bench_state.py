@@ -0,0 +1,138 @@
+"""Benchmark the memory and construction cost of verification results.
+
+Compares the previous representation (interactions, dosage notes and
+alternatives as dicts, final state re-validated with ResearchState(**state))
+against slotted record dataclasses with validation-free model_construct(),
+for a batch of results held in memory at once.
+
+    python benchmarks/bench_state.py --results 5000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel  # noqa: E402
+from src.models import (  # noqa: E402
+    Alternative, DosageRecommendation, DrugInfo, DrugInteraction, ExtractedDrugInfo, ResearchState,
+)
+
+DRUGS = ["Warfarin", "Aspirin", "Metformin", "Lisinopril", "Atorvastatin"]
+
+
+class LegacyResearchState(BaseModel):
+    """ResearchState as it was before the typed records"""
+    query: str
+    extracted_drugs: List[str] = []
+    drug_info: List[DrugInfo] = []
+    search_results: List[Dict[str, Any]] = []
+    extracted_drug_details: List[ExtractedDrugInfo] = []
+    analysis: Optional[str] = None
+    interactions: List[Dict[str, Any]] = []
+    dosage_recommendations: List[Dict[str, Any]] = []
+    alternatives: List[Dict[str, Any]] = []
+    timings: Dict[str, Any] = {}
+
+
+def drug_info(name: str) -> DrugInfo:
+    return DrugInfo(
+        name=name,
+        description=f"{name} monograph summary",
+        interaction_severity="Moderate",
+        contraindications=["Severe hepatic impairment"],
+        age_restrictions=["Not for children under 12"],
+        therapeutic_class="Example class",
+        monitoring_required=["Renal function"],
+    )
+
+
+def records(index: int, compact: bool) -> Dict[str, Any]:
+    """The node outputs of one verification, as either representation builds them"""
+    names = DRUGS[: 2 + index % 4]
+    interactions = [
+        {
+            "drug_pair": f"{a} + {b}",
+            "interaction_severity": "Moderate",
+            "notes": f"Monitor for interactions between {a} and {b}",
+            "source": "heuristic",
+        }
+        for i, a in enumerate(names) for b in names[i + 1:]
+    ]
+    dosage = [
+        {"drug_name": name, "recommended_dose": "Follow prescriber instructions", "notes": "Age restrictions: Not for children under 12"}
+        for name in names
+    ]
+    alternatives = [
+        {"drug_name": f"Alternative to {name}", "dose": "As prescribed", "reason": "Consider due to contraindications: Severe hepatic impairment"}
+        for name in names
+    ]
+    if compact:
+        interactions = [DrugInteraction(**record) for record in interactions]
+        dosage = [DosageRecommendation(**record) for record in dosage]
+        alternatives = [Alternative(**record) for record in alternatives]
+    return {
+        "query": f"prescription {index}: " + "; ".join(names),
+        "extracted_drugs": names,
+        "drug_info": [drug_info(name) for name in names],
+        "analysis": "Primary concern is additive interaction risk; monitor renal function.",
+        "interactions": interactions,
+        "dosage_recommendations": dosage,
+        "alternatives": alternatives,
+    }
+
+
+def build_legacy(state: Dict[str, Any]) -> BaseModel:
+    return LegacyResearchState(**state)
+
+
+def build_compact(state: Dict[str, Any]) -> BaseModel:
+    return ResearchState.model_construct(**state)
+
+
+def held_bytes(build: Callable[[Dict[str, Any]], BaseModel], compact: bool, count: int, keep: Callable[[BaseModel], Any]) -> int:
+    """Memory kept alive by keep(result) for count results, once the node outputs are gone"""
+    gc.collect()
+    tracemalloc.start()
+    kept = [keep(build(records(index, compact))) for index in range(count)]
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return held
+
+
+def measure(name: str, build: Callable[[Dict[str, Any]], BaseModel], compact: bool, count: int) -> None:
+    outputs = [records(index, compact) for index in range(count)]
+    start = time.perf_counter()
+    results = [build(state) for state in outputs]
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for result in results:
+        result.model_dump(mode="json")
+    dump_seconds = time.perf_counter() - start
+    del outputs, results
+
+    total = held_bytes(build, compact, count, lambda result: result)
+    # Interactions, dosage notes and alternatives alone, the part that changed
+    record_lists = held_bytes(
+        build, compact, count,
+        lambda result: (result.interactions, result.dosage_recommendations, result.alternatives),
+    )
+    print(
+        f"{name:8} {total / count:7.0f} B/result ({record_lists / count:5.0f} B in records)  "
+        f"build {count / build_seconds:7.0f}/s  dump {count / dump_seconds:6.0f}/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=5000, help="Verification results held in memory")
+    args = parser.parse_args()
+    measure("legacy", build_legacy, compact=False, count=args.results)
+    measure("compact", build_compact, compact=True, count=args.results)
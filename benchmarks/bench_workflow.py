@@ -0,0 +1,174 @@
+"""Offline end-to-end benchmark of Workflow.run / Workflow.arun.
+
+The LLM and Firecrawl are replaced with fakes (benchmarks/fakes.py) that add
+a configurable latency profile and failure rate, and the queries come from a
+deterministic synthetic corpus, so no network access or API keys are needed.
+
+    python benchmarks/bench_workflow.py --requests 50 --concurrency 4
+    python benchmarks/bench_workflow.py --mode async --concurrency 32 --llm-latency 0.5
+    python benchmarks/bench_workflow.py --monographs  # corpus drugs answered from the local index
+    python benchmarks/bench_workflow.py --warm --no-routing  # every stage runs for every query
+    python benchmarks/bench_workflow.py --warm --refill-rate 0.5  # half the prescriptions are reworded refills
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import DRUGS, synthetic_prescriptions  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeAsyncFirecrawlService, FakeFirecrawlApp, FakeLLM, LatencyProfile, synthetic_monograph,
+)
+from src.cache import SQLiteCache  # noqa: E402
+from src.firecrawl import FirecrawlService  # noqa: E402
+from src.monographs import MonographIndex  # noqa: E402
+from src.recognizer import default_recognizer  # noqa: E402
+from src.workflow import Workflow  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_workflow(args) -> Workflow:
+    llm = FakeLLM(LatencyProfile(args.llm_latency, args.jitter, failure_rate=args.failure_rate, seed=args.seed))
+    firecrawl_latency = LatencyProfile(args.firecrawl_latency, args.jitter, failure_rate=args.failure_rate, seed=args.seed + 1)
+    # Warm runs share in-memory caches; cold runs disable them entirely
+    if not args.warm:
+        os.environ["ANALYSIS_CACHE_PATH"] = os.environ["FIRECRAWL_CACHE_PATH"] = os.environ["RESULT_CACHE_PATH"] = ""
+    if not (args.warm or args.monographs):
+        os.environ["MONOGRAPH_INDEX_PATH"] = ""
+    firecrawl_cache = SQLiteCache(":memory:", namespace="firecrawl") if args.warm else None
+    analysis_cache = SQLiteCache(":memory:", namespace="drug_analysis") if args.warm else None
+    result_cache = SQLiteCache(":memory:", namespace="prescription_results") if args.warm else None
+    firecrawl = FirecrawlService(cache=firecrawl_cache, app=FakeFirecrawlApp(firecrawl_latency))
+    async_firecrawl = FakeAsyncFirecrawlService(firecrawl_latency, cache=firecrawl_cache)
+    if not args.warm:
+        firecrawl.cache = async_firecrawl.cache = None
+    recognizer = default_recognizer()
+    monograph_index = None
+    if args.warm or args.monographs:
+        monograph_index = MonographIndex(":memory:", aliases=recognizer.aliases())
+    if args.monographs:
+        for drug, _ in DRUGS:
+            monograph_index.add(drug, f"local://{drug.lower()}", synthetic_monograph(drug))
+    return Workflow(
+        recognizer=recognizer,
+        monograph_index=monograph_index,
+        research_concurrency=args.research_concurrency,
+        analysis_cache=analysis_cache,
+        result_cache=result_cache,
+        llm=llm,
+        firecrawl=firecrawl,
+        async_firecrawl=async_firecrawl,
+        local_research=not args.no_routing,
+        template_low_risk=not args.no_routing,
+    )
+
+
+def run_sync(workflow: Workflow, queries: List[str], concurrency: int) -> List[Dict]:
+    def timed(query: str) -> Dict:
+        start = time.perf_counter()
+        try:
+            state = workflow.run(query)
+            return {"seconds": time.perf_counter() - start, "error": None, "routes": state.timings.get("routes", {})}
+        except Exception as e:
+            return {"seconds": time.perf_counter() - start, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed, queries))
+
+
+async def run_async(workflow: Workflow, queries: List[str], concurrency: int) -> List[Dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(query: str) -> Dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                state = await workflow.arun(query)
+                return {"seconds": time.perf_counter() - start, "error": None, "routes": state.timings.get("routes", {})}
+            except Exception as e:
+                return {"seconds": time.perf_counter() - start, "error": str(e)}
+
+    try:
+        return await asyncio.gather(*(timed(query) for query in queries))
+    finally:
+        await workflow.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Workflow benchmark")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mean seconds per LLM call")
+    parser.add_argument("--firecrawl-latency", type=float, default=0.15, help="Mean seconds per Firecrawl call")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Relative latency jitter")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of backend calls that fail with 429")
+    parser.add_argument("--research-concurrency", type=int, default=5)
+    parser.add_argument("--warm", action="store_true", help="Share Firecrawl and analysis caches across requests")
+    parser.add_argument("--monographs", action="store_true", help="Pre-index monographs for the corpus drugs locally")
+    parser.add_argument("--refill-rate", type=float, default=0.0, help="Fraction of prescriptions that repeat an earlier one, reworded")
+    parser.add_argument("--no-routing", action="store_true", help="Disable local research and templated recommendation routes")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    queries = synthetic_prescriptions(args.requests, seed=args.seed, refill_rate=args.refill_rate)
+    workflow = build_workflow(args)
+
+    start = time.perf_counter()
+    # The workflow narrates every step; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.mode == "async":
+            results = asyncio.run(run_async(workflow, queries, args.concurrency))
+        else:
+            results = run_sync(workflow, queries, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    latencies = [result["seconds"] for result in results]
+    firecrawl_calls = workflow.firecrawl.app.calls + workflow.async_firecrawl.fake_app.calls
+    report = {
+        "mode": args.mode,
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "errors": sum(1 for result in results if result["error"]),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "llm_calls": workflow.llm.calls,
+        "firecrawl_calls": firecrawl_calls,
+        "routes": dict(sorted(Counter(
+            f"{decision}:{route}" for result in results for decision, route in result.get("routes", {}).items()
+        ).items())),
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"{report['requests']} requests ({args.mode}, concurrency {args.concurrency}) in {report['elapsed_seconds']}s")
+    print(f"  throughput     {report['throughput_rps']} req/s")
+    print(f"  latency        p50 {report['p50_ms']} ms | p95 {report['p95_ms']} ms | p99 {report['p99_ms']} ms")
+    print(f"  errors         {report['errors']}")
+    print(f"  backend calls  LLM {report['llm_calls']} | Firecrawl {report['firecrawl_calls']}")
+    print(f"  routes         {' | '.join(f'{route} {count}' for route, count in report['routes'].items())}")
+
+
+if __name__ == "__main__":
+    main()
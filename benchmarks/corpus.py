@@ -0,0 +1,81 @@
+"""Deterministic synthetic prescriptions for offline benchmarks"""
+
+import random
+from typing import List
+
+DRUGS = [
+    ("Metformin", ["500 mg", "850 mg", "1000 mg"]),
+    ("Lisinopril", ["5 mg", "10 mg", "20 mg"]),
+    ("Atorvastatin", ["10 mg", "20 mg", "40 mg"]),
+    ("Amlodipine", ["2.5 mg", "5 mg", "10 mg"]),
+    ("Warfarin", ["2 mg", "5 mg"]),
+    ("Aspirin", ["81 mg", "325 mg"]),
+    ("Levothyroxine", ["50 mcg", "75 mcg", "100 mcg"]),
+    ("Omeprazole", ["20 mg", "40 mg"]),
+    ("Sertraline", ["50 mg", "100 mg"]),
+    ("Simvastatin", ["20 mg", "40 mg"]),
+    ("Furosemide", ["20 mg", "40 mg"]),
+    ("Metoprolol", ["25 mg", "50 mg"]),
+    ("Coumadin", ["5 mg"]),
+    ("Glucophage", ["500 mg"]),
+    ("Zestril", ["10 mg"]),
+]
+FREQUENCIES = ["once daily", "twice daily", "BID", "TID", "QHS", "PRN", "every 8 hours"]
+ROUTES = ["PO", "by mouth", "orally", ""]
+# Spellings a refill may use instead of the original frequency
+FREQUENCY_SYNONYMS = {"twice daily": "BID", "BID": "twice daily", "TID": "three times daily", "every 8 hours": "q8h"}
+UNKNOWN_DRUGS = ["Zorvatrin 15 mg", "Quelabex 200 mg", "Prednazolone 5 mg"]
+QUESTIONS = [
+    "What are the first-line medications for hypertension?",
+    "drugs that interact with grapefruit juice",
+    "safest antibiotics for penicillin allergy",
+    "alternatives to statins for elderly patients",
+]
+
+
+def synthetic_prescriptions(
+    count: int, seed: int = 7, question_rate: float = 0.1, unknown_rate: float = 0.1, refill_rate: float = 0.0
+) -> List[str]:
+    """Mix of structured prescriptions, unrecognized drugs and free-text questions.
+
+    With refill_rate, that fraction of prescriptions re-issues an earlier one
+    reworded: lines reordered, routes and frequencies spelled differently.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    issued = []
+    for _ in range(count):
+        if refill_rate and issued and rng.random() < refill_rate:
+            corpus.append(_refill(rng, rng.choice(issued)))
+            continue
+        roll = rng.random()
+        if roll < question_rate:
+            corpus.append(rng.choice(QUESTIONS))
+            continue
+        orders = [
+            [name, rng.choice(strengths), rng.choice(ROUTES), rng.choice(FREQUENCIES)]
+            for name, strengths in rng.sample(DRUGS, rng.randint(1, 5))
+        ]
+        extra = []
+        if roll < question_rate + unknown_rate:
+            extra.append(rng.choice(UNKNOWN_DRUGS) + " daily")
+        if rng.random() < 0.3:
+            extra.append(f"Patient age {rng.randint(18, 90)}")
+        issued.append((orders, extra))
+        corpus.append(_render(orders, extra))
+    return corpus
+
+
+def _render(orders: List[List[str]], extra: List[str]) -> str:
+    return "; ".join([" ".join(part for part in order if part) for order in orders] + extra)
+
+
+def _refill(rng: random.Random, prescription) -> str:
+    orders, extra = prescription
+    reworded = []
+    for name, strength, route, frequency in orders:
+        if route:
+            route = rng.choice([r for r in ROUTES if r])
+        reworded.append([name, strength, route, FREQUENCY_SYNONYMS.get(frequency, frequency)])
+    rng.shuffle(reworded)
+    return _render(reworded, extra)
@@ -0,0 +1,267 @@
+"""Offline stand-ins for the LLM and Firecrawl backends.
+
+They answer every prompt the workflow sends with plausible, deterministic
+content after a simulated latency, and fail at a configurable rate, so the
+pipeline can be measured on a machine with no network or API keys.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from firecrawl.firecrawl import SearchResponse, ScrapeResponse
+
+from src.firecrawl import AsyncFirecrawlService
+from src.models import DrugAnalysis, DrugAnalysisBatch, ExtractedDrugList, NamedDrugAnalysis
+from src.prompts import DrugAnalysisPrompts
+from src.recognizer import default_recognizer
+from src.tracing import tracer
+
+
+class FakeRateLimitError(Exception):
+    """Simulated upstream throttling (HTTP 429)"""
+
+    status_code = 429
+
+
+class LatencyProfile:
+    """Simulated call latency: mean * (1 +/- jitter), a slow tail and a failure rate"""
+
+    def __init__(
+        self,
+        mean: float = 0.2,
+        jitter: float = 0.25,
+        tail_rate: float = 0.02,
+        tail_multiplier: float = 5.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.mean = mean
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_multiplier = tail_multiplier
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            delay = self.mean * (1 + self.jitter * self._random.uniform(-1, 1))
+            if self._random.random() < self.tail_rate:
+                delay *= self.tail_multiplier
+            return max(0.0, delay)
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+def _stable_choice(key: str, options: List[str]) -> str:
+    digest = int(hashlib.md5(key.encode("utf-8")).hexdigest(), 16)
+    return options[digest % len(options)]
+
+
+def synthetic_monograph(drug_name: str) -> str:
+    """A drug page with the navigation chrome real monograph sites carry"""
+    return "\n".join([
+        "[Home](https://example.org) | [Drugs A-Z](https://example.org/az) | [Pill Identifier](https://example.org/pills)",
+        "![logo](https://example.org/logo.png)",
+        f"# {drug_name.title()}",
+        f"{drug_name.title()} is used to treat chronic conditions in adults.",
+        "## Drug interactions",
+        f"- {drug_name.title()} may interact with warfarin, NSAIDs and potassium supplements.",
+        "- Avoid combining with strong CYP3A4 inhibitors.",
+        "## Dosage",
+        "- Usual adult dose: 10 mg once daily; maximum 40 mg per day.",
+        "## Contraindications",
+        "- Pregnancy, severe renal impairment.",
+        "## Related articles",
+        "[Sign up for our newsletter](https://example.org/newsletter)",
+    ] + [f"[Sponsored link {i}](https://ads.example.org/{i})" for i in range(40)])
+
+
+class FakeLLM:
+    """Duck-typed chat model covering invoke/ainvoke/with_structured_output"""
+
+    model_name = "fake-llm"
+
+    def __init__(self, latency: Optional[LatencyProfile] = None):
+        self.latency = latency or LatencyProfile()
+        self.recognizer = default_recognizer()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _begin(self) -> float:
+        with self._lock:
+            self.calls += 1
+        if self.latency.fails():
+            raise FakeRateLimitError("429 Too Many Requests (simulated)")
+        return self.latency.sample()
+
+    def _record(self, messages: List[Any], output: str, seconds: float) -> None:
+        prompt_chars = sum(len(getattr(message, "content", "")) for message in messages)
+        tracer.record_llm(seconds, prompt_chars // 4, len(output) // 4)
+
+    def _respond(self, messages: List[Any]) -> str:
+        system = messages[0].content if messages else ""
+        user = messages[-1].content if messages else ""
+        if system == DrugAnalysisPrompts.NLP_EXTRACTION_SYSTEM:
+            drugs = self.recognizer.recognize(user).drugs
+            return json.dumps([drug.model_dump() for drug in drugs] or {"drug_name": "Unknown"})
+        if system == DrugAnalysisPrompts.DRUG_EXTRACTION_SYSTEM:
+            return "Lisinopril 10mg\nAmlodipine 5mg\nHydrochlorothiazide 25mg\nLosartan 50mg"
+        return (
+            "Primary concern is additive interaction risk; monitor renal function and potassium. "
+            "No dose adjustment needed for most adults. Counsel the patient on bleeding signs. "
+            "Follow up in two weeks."
+        )
+
+    def _structured(self, schema: Any, messages: List[Any]) -> Any:
+        user = messages[-1].content
+        if schema is DrugAnalysis:
+            drug_name = user.split("\n", 1)[0].replace("Drug:", "").strip()
+            return self._analysis(DrugAnalysis, drug_name)
+        if schema is ExtractedDrugList:
+            return ExtractedDrugList(drugs=self.recognizer.recognize(user).drugs)
+        if schema is DrugAnalysisBatch:
+            drug_names = [line[len("### Drug:"):].strip() for line in user.splitlines() if line.startswith("### Drug:")]
+            return DrugAnalysisBatch(analyses=[self._analysis(NamedDrugAnalysis, name, drug_name=name) for name in drug_names])
+        raise ValueError(f"FakeLLM has no structured response for {schema}")
+
+    @staticmethod
+    def _analysis(model: Any, name: str, **extra: Any) -> Any:
+        return model(
+            **extra,
+            interaction_severity=_stable_choice(name, ["Major", "Moderate", "Minor", "None"]),
+            contraindications=["Pregnancy", "Severe renal impairment"],
+            age_restrictions=["Use caution in patients over 65"],
+            dosage_forms=["tablet"],
+            description=f"{name} is used to treat chronic conditions.",
+            common_interactions=["warfarin", "NSAIDs"],
+            therapeutic_class=_stable_choice(name, ["ACE inhibitor", "Statin", "Biguanide", "Beta-blocker"]),
+            monitoring_required=["Renal function"],
+        )
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        delay = self._begin()
+        time.sleep(delay)
+        content = self._respond(messages)
+        self._record(messages, content, delay)
+        return AIMessage(content=content)
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        delay = self._begin()
+        await asyncio.sleep(delay)
+        content = self._respond(messages)
+        self._record(messages, content, delay)
+        return AIMessage(content=content)
+
+    def stream(self, messages: List[Any], *args, **kwargs):
+        delay = self._begin()
+        content = self._respond(messages)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(delay / len(words))
+            yield AIMessageChunk(content=word if i == 0 else " " + word)
+        self._record(messages, content, delay)
+
+    async def astream(self, messages: List[Any], *args, **kwargs):
+        delay = self._begin()
+        content = self._respond(messages)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(delay / len(words))
+            yield AIMessageChunk(content=word if i == 0 else " " + word)
+        self._record(messages, content, delay)
+
+    def with_structured_output(self, schema: Any, **kwargs) -> "FakeStructuredLLM":
+        return FakeStructuredLLM(self, schema, include_raw=kwargs.get("include_raw", False))
+
+
+class FakeStructuredLLM:
+    def __init__(self, llm: FakeLLM, schema: Any, include_raw: bool = False):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def _output(self, result: Any) -> Any:
+        if not self.include_raw:
+            return result
+        return {"raw": AIMessage(content=result.model_dump_json()), "parsed": result, "parsing_error": None}
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> Any:
+        delay = self.llm._begin()
+        time.sleep(delay)
+        result = self.llm._structured(self.schema, messages)
+        self.llm._record(messages, result.model_dump_json(), delay)
+        return self._output(result)
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> Any:
+        delay = self.llm._begin()
+        await asyncio.sleep(delay)
+        result = self.llm._structured(self.schema, messages)
+        self.llm._record(messages, result.model_dump_json(), delay)
+        return self._output(result)
+
+
+class FakeFirecrawlApp:
+    """Stands in for firecrawl.FirecrawlApp inside the real FirecrawlService"""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None):
+        self.latency = latency or LatencyProfile()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _wait(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency.fails():
+            raise FakeRateLimitError("429 Too Many Requests (simulated)")
+        time.sleep(self.latency.sample())
+
+    @staticmethod
+    def _drug_from_query(query: str) -> str:
+        return query.split(" drug ")[0].strip()
+
+    def search(self, query: str, limit: int = 5, scrape_options: Any = None, **kwargs) -> SearchResponse:
+        self._wait()
+        drug_name = self._drug_from_query(query)
+        slug = drug_name.lower().replace(" ", "-")
+        return SearchResponse(success=True, data=[
+            {"url": f"https://example.org/{slug}/{i}", "title": drug_name, "markdown": synthetic_monograph(drug_name)}
+            for i in range(limit)
+        ])
+
+    def scrape_url(self, url: str, formats: Any = None, **kwargs) -> ScrapeResponse:
+        self._wait()
+        drug_name = url.rstrip("/").split("/")[-2].replace("-", " ")
+        return ScrapeResponse(success=True, url=url, markdown=synthetic_monograph(drug_name))
+
+
+class FakeAsyncFirecrawlService(AsyncFirecrawlService):
+    """The real async client with its HTTP layer replaced by FakeFirecrawlApp"""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None, **kwargs):
+        super().__init__(api_key="fake", **kwargs)
+        self.fake_app = FakeFirecrawlApp(latency)
+
+    async def _post(self, endpoint: str, payload: dict) -> dict:
+        with self.fake_app._lock:
+            self.fake_app.calls += 1
+        if self.fake_app.latency.fails():
+            raise FakeRateLimitError("429 Too Many Requests (simulated)")
+        await asyncio.sleep(self.fake_app.latency.sample())
+        if endpoint == "/v1/search":
+            drug_name = FakeFirecrawlApp._drug_from_query(payload["query"])
+            slug = drug_name.lower().replace(" ", "-")
+            return {"success": True, "data": [
+                {"url": f"https://example.org/{slug}/{i}", "markdown": synthetic_monograph(drug_name)}
+                for i in range(payload.get("limit", 5))
+            ]}
+        drug_name = payload["url"].rstrip("/").split("/")[-2].replace("-", " ")
+        return {"success": True, "data": {"url": payload["url"], "markdown": synthetic_monograph(drug_name)}}
@@ -1,11 +1,99 @@
 # main.py
 
+import argparse
+import json
 from dotenv import load_dotenv
 from src.workflow import Workflow
 
 load_dotenv()
 
+def run_batch(args):
+    from src.batch import BatchRunner
+
+    runner = BatchRunner(concurrency=args.concurrency, chunk_size=args.chunk_size)
+    stats = runner.run(args.batch, args.output)
+    print(json.dumps(stats, indent=2))
+
+def render_interactions(interactions):
+    print("⚠️ Drug Interactions:")
+    for inter in interactions:
+        print(f" • {inter.drug_pair}: Severity={inter.interaction_severity}, Notes={inter.notes or '—'}")
+
+def render_checks(update):
+    """Interactions, dose checks and alternatives, then the heading the recommendations follow"""
+    render_interactions(update.get("interactions", []))
+    if update.get("dosage_recommendations"):
+        print("\n💊 Dosage Recommendations:")
+        for rec in update["dosage_recommendations"]:
+            status = f" [{rec.status}]" if rec.status else ""
+            print(f" • {rec.drug_name}: {rec.recommended_dose}{status} ({rec.notes or 'standard dosing'})")
+    if update.get("alternatives"):
+        print("\n🔄 Alternative Medications:")
+        for alt in update["alternatives"]:
+            print(f" • {alt.drug_name} {alt.dose}: {alt.reason}")
+    print("\n📝 Clinical Recommendations:")
+
+def render_drug(drug):
+    print(f"💊 {drug.name}: {drug.therapeutic_class or 'Unknown class'}, severity {drug.interaction_severity or 'Unknown'}")
+
+def render_result(update):
+    """A whole result at once (a result-cache hit, or a run that was not streamed)"""
+    if update.get("extracted_drugs"):
+        print(f"🧾 Drugs found: {', '.join(update['extracted_drugs'])}")
+    for drug in update.get("drug_info", []):
+        render_drug(drug)
+    render_checks(update)
+    print(update.get("analysis") or "")
+
+def render_event(event):
+    """Print one streamed workflow event as soon as it arrives"""
+    if event["type"] == "stage":
+        update = event["update"]
+        if event["stage"] == "extract_drugs" and update.get("extracted_drugs"):
+            print(f"🧾 Drugs found: {', '.join(update['extracted_drugs'])}")
+        elif event["stage"] == "lookup_result" and update.get("analysis") is not None:
+            # A repeat prescription: the whole result arrives at once from the result cache
+            render_result(update)
+        elif event["stage"] == "analyze_interactions":
+            render_checks(update)
+        elif event["stage"] == "generate_recommendations":
+            print()
+    elif event["type"] == "drug":
+        render_drug(event["drug"])
+    elif event["type"] == "token" and not event.get("cached"):
+        # The cached text is printed with the rest of the cached result
+        print(event["text"], end="", flush=True)
+
 def main():
+    parser = argparse.ArgumentParser(description="Drug Interaction & Dosage Analysis Agent")
+    parser.add_argument("--batch", help="JSONL or CSV file of prescriptions to verify")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file for batch results (appended, used to resume)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Prescriptions (and drug lookups) processed in parallel in batch mode")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Prescriptions per batch chunk")
+    parser.add_argument("--serve", action="store_true", help="Run the HTTP verification service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address the service binds to")
+    parser.add_argument("--port", type=int, default=8080, help="Port the service listens on")
+    parser.add_argument("--workers", type=int, help="Warm workflows serving requests (default SERVER_WORKERS or 4)")
+    parser.add_argument("--no-stream", action="store_true", help="Print results only once the whole analysis is done")
+    parser.add_argument(
+        "--purge-caches", action="store_true", help="Drop expired and other-version cache entries, then exit"
+    )
+    args = parser.parse_args()
+
+    if args.purge_caches:
+        print(json.dumps(Workflow().purge_caches(), indent=2))
+        return
+
+    if args.batch:
+        run_batch(args)
+        return
+
+    if args.serve:
+        from src.server import serve
+
+        serve(args.host, args.port, args.workers)
+        return
+
     workflow = Workflow()
     print("Drug Interaction & Dosage Analysis Agent")
 
@@ -16,36 +104,19 @@ def main():
         if not user_input:
             continue
 
-        # Example: workflow.run might accept structured queries like:
-        # {"mode": "interaction", "drugs": ["A", "B"], "age": "65"}
+        if not args.no_stream:
+            print(f"\n📊 Analysis Results for: {user_input}")
+            print("=" * 60)
+            for event in workflow.stream(user_input):
+                render_event(event)
+            print()
+            continue
+
         result = workflow.run(user_input)
 
         print(f"\n📊 Analysis Results for: {user_input}")
         print("=" * 60)
-
-        if hasattr(result, "interactions"):
-            print("⚠️ Drug Interactions:")
-            for inter in result.interactions:
-                print(f" • {inter['drug_pair']}: Severity={inter['interaction_severity']}, Notes={inter.get('notes', '—')}")
-
-        if hasattr(result, "dosage"):
-            print("\n💊 Dosage Recommendations:")
-            print(f" • {result.dosage['drug_name']}: {result.dosage['recommended_dose']} ({result.dosage.get('notes', 'standard dosing')})")
-
-        if hasattr(result, "alternatives"):
-            print("\n🔄 Alternative Medications:")
-            for alt in result.alternatives:
-                print(f" • {alt['drug_name']} {alt['dose']}: {alt['reason']}")
-
-        if hasattr(result, "extracted_info"):
-            print("\n🧾 NLP-Extracted Drug Info:")
-            for info in result.extracted_info:
-                print(f" • {info}")
-
-        if hasattr(result, "recommendations"):
-            print("\n📝 Clinical Recommendations:")
-            print(result.recommendations)
-
+        render_result(dict(result))
         print()
 
 if __name__ == "__main__":
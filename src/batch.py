@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from .models import ResearchState, DrugInfo
+from .scheduler import BATCH, request_context, set_lane
+from .workflow import MAX_RESEARCHED_DRUGS, Workflow
+
+
+def read_prescriptions(path: str) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "query"} records from a JSONL or CSV file"""
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                yield {"id": str(row.get("id") or index), "query": row.get("query", "")}
+    else:
+        with open(path, encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if isinstance(row, str):
+                    row = {"query": row}
+                yield {"id": str(row.get("id", index)), "query": row.get("query", "")}
+
+
+# Row statuses: verified, verified without research for some drugs, not verified
+OK, DEGRADED, ERROR = "ok", "degraded", "error"
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """IDs already fully verified in an output file (the resume checkpoint)
+
+    Failed and degraded rows are not counted, so a resumed run retries them.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line from an interrupted run
+            if row.get("status") == OK:
+                done.add(str(row.get("id")))
+    return done
+
+
+class BatchRunner:
+    """Verify a file of prescriptions, researching each unique drug only once"""
+
+    def __init__(self, workflow: Optional[Workflow] = None, concurrency: int = 4, chunk_size: int = 200):
+        self.concurrency = max(1, concurrency)
+        # concurrency bounds both the prescriptions and the drug research in flight
+        self.workflow = workflow or Workflow(research_concurrency=self.concurrency)
+        self.chunk_size = max(1, chunk_size)
+        # Successful research shared by every prescription in the batch; failed
+        # drugs are left out so the next chunk (or a resumed run) retries them
+        self.drug_cache: Dict[str, DrugInfo] = {}
+        self.stats = {
+            "processed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "degraded": 0,
+            "cached": 0,
+            "unique_drugs": 0,
+        }
+
+    def run(self, input_path: str, output_path: str) -> Dict[str, Any]:
+        done = completed_ids(output_path)
+        start = time.perf_counter()
+
+        # Interactive requests sharing the process get upstream capacity first
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, initializer=set_lane, initargs=(BATCH,))
+        with open(output_path, "a", encoding="utf-8") as out, executor:
+            chunk = []
+            for record in read_prescriptions(input_path):
+                if record["id"] in done:
+                    self.stats["skipped"] += 1
+                    continue
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self._run_chunk(chunk, executor, out)
+                    self._print_progress(start)
+                    chunk = []
+            if chunk:
+                self._run_chunk(chunk, executor, out)
+
+        elapsed = time.perf_counter() - start
+        self.stats["elapsed_seconds"] = round(elapsed, 3)
+        self.stats["prescriptions_per_second"] = round(self.stats["processed"] / elapsed, 3) if elapsed else 0.0
+        self._print_progress(start)
+        return self.stats
+
+    def _run_chunk(self, chunk: List[Dict[str, str]], executor: ThreadPoolExecutor, out) -> None:
+        # 1. Extract drugs from every prescription in the chunk
+        states = list(executor.map(self._extract, chunk))
+
+        # 2. Repeat prescriptions are answered from the result cache
+        finished = {}
+        for index, state in enumerate(states):
+            cached = self.workflow.cached_result(state) if state is not None else None
+            if cached is not None:
+                finished[index] = state.model_copy(update=cached)
+        self.stats["cached"] += len(finished)
+        pending = [None if index in finished else state for index, state in enumerate(states)]
+
+        # 3. Research each drug not seen earlier in the batch exactly once, several per analysis call
+        new_drugs = {}
+        for state in pending:
+            if state is None:
+                continue
+            for drug_name in state.extracted_drugs[:MAX_RESEARCHED_DRUGS]:
+                key = self.workflow._drug_key(drug_name)
+                if key not in self.drug_cache and key not in new_drugs:
+                    new_drugs[key] = drug_name
+        self.stats["unique_drugs"] += len(new_drugs)
+        with request_context(BATCH):
+            researched = dict(zip(new_drugs, self.workflow._research_drugs(list(new_drugs.values()))))
+        self.drug_cache.update(
+            (key, info) for key, info in researched.items()
+            if info is not None and not self.workflow._analysis_failed(info)
+        )
+
+        # 4. Check every prescribed dose in the chunk in one vectorized pass
+        dose_checks = self._check_doses(pending)
+
+        # 5. Finish each prescription and stream it out as soon as it is ready
+        futures = {
+            executor.submit(self._finish, state, checks, researched): record
+            for record, state, checks in zip(chunk, pending, dose_checks)
+            if state is not None
+        }
+        for index, (record, state) in enumerate(zip(chunk, states)):
+            if state is None:
+                self._write(out, record, ERROR, error="extraction failed")
+            elif index in finished:
+                self._write(out, record, OK, result=finished[index].model_dump())
+        for future in as_completed(futures):
+            record = futures[future]
+            try:
+                result, unresearched = future.result()
+            except Exception as e:
+                print(f"Batch verification error for {record['id']}: {e}")
+                self._write(out, record, ERROR, error=str(e))
+                continue
+            if unresearched:
+                self._write(out, record, DEGRADED, result=result.model_dump(), unresearched=unresearched)
+            else:
+                self._write(out, record, OK, result=result.model_dump())
+
+    def _extract(self, record: Dict[str, str]) -> Optional[ResearchState]:
+        try:
+            state = ResearchState(query=record["query"])
+            return state.model_copy(update=self.workflow._extract_drugs_step(state))
+        except Exception as e:
+            print(f"Batch extraction error for {record['id']}: {e}")
+            return None
+
+    def _check_doses(self, states: List[Optional[ResearchState]]) -> List[List[Any]]:
+        """Dose checks per prescription, computed for the whole chunk at once"""
+        orders = [
+            self.workflow.dose_orders(state.query, state.extracted_drug_details) if state is not None else []
+            for state in states
+        ]
+        try:
+            checks = self.workflow.dose_checker.check([order for group in orders for order in group])
+        except Exception as e:
+            print(f"Batch dose check error: {e}")
+            return [[] for _ in states]
+        grouped, start = [], 0
+        for group in orders:
+            grouped.append(checks[start:start + len(group)])
+            start += len(group)
+        return grouped
+
+    def _finish(
+        self, state: ResearchState, dose_checks: List[Any], researched: Dict[str, Optional[DrugInfo]]
+    ) -> Tuple[ResearchState, List[str]]:
+        """The verified prescription and the drugs whose research failed"""
+        drug_info, unresearched = [], []
+        for drug_name in state.extracted_drugs[:MAX_RESEARCHED_DRUGS]:
+            key = self.workflow._drug_key(drug_name)
+            info = self.drug_cache.get(key) or researched.get(key)
+            if info is None or self.workflow._analysis_failed(info):
+                unresearched.append(drug_name)
+            if info is not None:
+                drug_info.append(info.model_copy(update={"name": drug_name}))
+        state = state.model_copy(update={"drug_info": drug_info})
+        state = state.model_copy(update=self.workflow._analyze_interactions_step(state, dose_checks))
+        state = state.model_copy(update=self.workflow.recommend(state))
+        self.workflow.store_result(state)
+        return state, unresearched
+
+    def _write(self, out, record: Dict[str, str], status: str, **fields: Any) -> None:
+        self.stats[{OK: "processed", DEGRADED: "degraded", ERROR: "failed"}[status]] += 1
+        row = {"id": record["id"], "query": record["query"], "status": status, **fields}
+        out.write(json.dumps(row) + "\n")
+        out.flush()
+
+    def _print_progress(self, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        rate = self.stats["processed"] / elapsed if elapsed else 0.0
+        print(
+            f"📦 Batch: {self.stats['processed']} verified, {self.stats['degraded']} degraded, {self.stats['failed']} failed, "
+            f"{self.stats['skipped']} skipped, {self.stats['cached']} from cache, {self.stats['unique_drugs']} unique drugs researched "
+            f"({rate:.2f} prescriptions/s)"
+        )
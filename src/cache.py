@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL and size-bounded LRU eviction.
+
+    Values are stored as JSON in a single SQLite table, partitioned by
+    namespace so several caches can share one database file. Safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "default",
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                tag TEXT NOT NULL DEFAULT '',
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (namespace, accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Content-addressed key for an arbitrary JSON-serializable tuple"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, tag: str = "") -> None:
+        payload = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO cache_entries
+                   (namespace, key, value, tag, size, created_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (self.namespace, key, payload, tag, len(payload), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Drop entries older than the TTL, returning how many were removed"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, time.time() - self.ttl),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_tag(self, keep_tag: str) -> int:
+        """Drop entries whose tag differs from keep_tag (e.g. stale versions)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND tag != ?",
+                (self.namespace, keep_tag),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the size limits hold"""
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+        while count > self.max_entries or (self.max_bytes is not None and total > self.max_bytes and count > 1):
+            excess = max(1, count - self.max_entries)
+            rows = self._conn.execute(
+                """SELECT key, size FROM cache_entries WHERE namespace = ?
+                   ORDER BY accessed_at ASC LIMIT ?""",
+                (self.namespace, excess),
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                [(self.namespace, key) for key, _ in rows],
+            )
+            self.evictions += len(rows)
+            count -= len(rows)
+            total -= sum(size for _, size in rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def file_digest(path: str) -> str:
+    """Short content hash of a data file, for versioning results derived from it"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
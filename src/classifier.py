@@ -0,0 +1,68 @@
+import json
+import os
+import re
+from typing import Iterable, List, Optional
+
+# Units and counted forms that follow a number ("500 mg", "2 puffs")
+DOSE_UNITS = [
+    "mg", "mcg", "µg", "g", "ml", "units?", "iu", "meq", "%",
+    "tablets?", "tabs?", "capsules?", "caps?", "puffs?", "drops?", "sprays?",
+]
+
+# Whole-word terms that only show up in prescription text
+PRESCRIPTION_TERMS = [
+    # Dosing instructions
+    r"take\s+\d+",
+    r"(?:once|twice|three times|four times)\s+(?:daily|a day)",
+    r"every\s+\d+(?:-\d+)?\s+hours?",
+    "at bedtime", "as needed", "with meals", "before meals", "after meals",
+    # Sig codes
+    "sig", "qd", "qod", "qam", "qpm", "qhs", "bid", "tid", "qid", "prn", "ac", "pc", "hs", r"q\d+h",
+    # Routes
+    "po", "iv", "im", "sc", "subq", "sl", "intravenous", "intramuscular", "subcutaneous",
+    "sublingual", "topical", "inhaled", "by mouth",
+    # Dosage forms
+    "tablets?", "capsules?", "injections?", "inhalers?", "suspension", "ointment", "patch(?:es)?",
+    # Prescription markers
+    "rx", "refills?", "dispense", "disp",
+]
+
+
+class MedicalTextClassifier:
+    """Decides whether a query is prescription text (cheap NLP path) or a
+    free-form question that needs web search.
+
+    Everything is compiled once into a single alternation that runs over the
+    lowercased query, so custom terms and patterns must be written in
+    lowercase.
+    """
+
+    def __init__(
+        self,
+        dose_units: Optional[Iterable[str]] = None,
+        terms: Optional[Iterable[str]] = None,
+        extra_patterns: Optional[Iterable[str]] = None,
+    ):
+        self.dose_units: List[str] = list(dose_units if dose_units is not None else DOSE_UNITS)
+        self.terms: List[str] = list(terms if terms is not None else PRESCRIPTION_TERMS)
+        self.patterns: List[str] = [
+            rf"\d+(?:\.\d+)?\s*(?:{'|'.join(self.dose_units)})(?!\w)",
+            rf"\b(?:{'|'.join(self.terms)})\b",
+            *(extra_patterns or []),
+        ]
+        self._regex = re.compile("|".join(f"(?:{pattern})" for pattern in self.patterns))
+
+    def is_medical(self, text: str) -> bool:
+        return self._regex.search(text.lower()) is not None
+
+    __call__ = is_medical
+
+
+def default_classifier() -> MedicalTextClassifier:
+    """Default patterns plus extra lowercase regexes from the JSON list at MEDICAL_TEXT_PATTERNS_PATH"""
+    path = os.getenv("MEDICAL_TEXT_PATTERNS_PATH")
+    extra_patterns = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            extra_patterns = json.load(f)
+    return MedicalTextClassifier(extra_patterns=extra_patterns)
@@ -0,0 +1,193 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .models import FLAGGED_DOSE_STATUSES, Alternative, DosageRecommendation, DrugInteraction
+
+# Rough size of a token for English text; good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+DEFAULT_CONTENT_TOKENS = 600
+DEFAULT_RECOMMENDATION_TOKENS = 800
+
+# Headings and lines worth keeping when a monograph has to be cut down
+RELEVANT_TERMS = [
+    "interact", "contraindicat", "dosage", "dosing", "dose", "warning", "precaution",
+    "boxed", "side effect", "adverse", "monitor", "renal", "hepatic", "pregnan",
+    "pediatric", "geriatric", "elderly", "indication", "used to treat", "maximum",
+]
+
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_BARE_URL = re.compile(r"https?://\S+")
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_BOILERPLATE = re.compile(
+    r"cookie|newsletter|subscribe|sign up|sign in|log in|advertis|sponsored|privacy policy|"
+    r"terms of (?:use|service)|all rights reserved|©|skip to (?:main )?content|share this|print this page",
+    re.IGNORECASE,
+)
+_SEVERITY_RANK = {"Major": 3, "Moderate": 2, "Minor": 1}
+_RELEVANT = re.compile("|".join(re.escape(term) for term in RELEVANT_TERMS), re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def content_token_budget() -> int:
+    return int(os.getenv("ANALYSIS_CONTENT_TOKENS", DEFAULT_CONTENT_TOKENS))
+
+
+def recommendation_token_budget() -> int:
+    return int(os.getenv("RECOMMENDATION_DATA_TOKENS", DEFAULT_RECOMMENDATION_TOKENS))
+
+
+def strip_markdown_chrome(markdown: str) -> str:
+    """Drop images, link targets, navigation bars and site boilerplate"""
+    lines = []
+    for line in markdown.splitlines():
+        link_count = len(_LINK.findall(line))
+        line = _BARE_URL.sub("", _LINK.sub(r"\1", _IMAGE.sub("", line))).strip()
+        if not line or _BOILERPLATE.search(line):
+            continue
+        words = re.sub(r"[^\w\s]", " ", line).split()
+        # Lines made of links (menus, breadcrumbs, related articles) carry no content
+        if link_count and len(words) <= 3 * link_count:
+            continue
+        if not words:
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def split_sections(markdown: str) -> List[Tuple[str, List[str]]]:
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+    for line in markdown.splitlines():
+        if _HEADING.match(line):
+            sections.append((line, []))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, body) for heading, body in sections if heading or body]
+
+
+def compact_content(markdown: str, token_budget: Optional[int] = None) -> str:
+    """Reduce a scraped page to its clinically relevant sections within token_budget.
+
+    Sections with a relevant heading come first, then sections that mention
+    relevant terms, then the rest; repeated lines are dropped and the kept
+    sections are emitted in page order.
+    """
+    if not markdown:
+        return ""
+    budget_chars = (token_budget if token_budget is not None else content_token_budget()) * CHARS_PER_TOKEN
+    sections = split_sections(strip_markdown_chrome(markdown))
+
+    seen = set()
+    candidates = []
+    for position, (heading, body) in enumerate(sections):
+        unique = []
+        for line in body:
+            key = re.sub(r"\W+", " ", line.lower()).strip()
+            if key and key not in seen:
+                seen.add(key)
+                unique.append(line)
+        if not unique:
+            continue
+        if _RELEVANT.search(heading):
+            priority = 0
+        elif any(_RELEVANT.search(line) for line in unique):
+            priority = 1
+            # Only the relevant lines of an otherwise unrelated section
+            unique = [line for line in unique if _RELEVANT.search(line)]
+        else:
+            priority = 2
+        candidates.append((priority, position, heading, unique))
+
+    selected = []
+    remaining = budget_chars
+    for priority, position, heading, body in sorted(candidates, key=lambda c: (c[0], c[1])):
+        text = "\n".join([heading] + body if heading else body)
+        if len(text) + 1 <= remaining:
+            selected.append((position, text))
+            remaining -= len(text) + 1
+        elif remaining > len(heading) + 40:
+            # Partially fill the budget, cutting at a line boundary where possible
+            cut = text[:remaining]
+            if "\n" in cut[len(heading) + 1:]:
+                cut = cut[:cut.rfind("\n")]
+            selected.append((position, cut))
+            remaining = 0
+        if remaining <= 0:
+            break
+    return "\n".join(text for _, text in sorted(selected))
+
+
+def _drop_empty(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if value not in (None, "", [], {})}
+
+
+def compact_recommendation_data(
+    drugs: Iterable[Any],
+    interactions: List[DrugInteraction],
+    dosage_recommendations: List[DosageRecommendation],
+    alternatives: List[Alternative],
+    token_budget: Optional[int] = None,
+    max_items: int = 4,
+) -> str:
+    """Minified JSON of the analysis for the recommendations prompt, within token_budget.
+
+    Only fields the synthesis needs are kept, lists are capped, pairs with no
+    interaction are omitted and, if still too large, the least important parts
+    are dropped first (alternatives, then unflagged dosage notes, then per-drug
+    detail, then the mildest interactions). Flagged doses are always kept.
+    """
+    budget_chars = (token_budget if token_budget is not None else recommendation_token_budget()) * CHARS_PER_TOKEN
+    data = {
+        "drugs": [_drop_empty({
+            "name": drug.name,
+            "class": drug.therapeutic_class,
+            "severity": drug.interaction_severity,
+            "contraindications": drug.contraindications[:max_items],
+            "interacts_with": drug.common_interactions[:max_items],
+            "monitoring": drug.monitoring_required[:max_items],
+            "age_restrictions": drug.age_restrictions[:max_items],
+        }) for drug in drugs],
+        "interactions": [_drop_empty({
+            "pair": interaction.drug_pair,
+            "severity": interaction.interaction_severity,
+            "notes": interaction.notes,
+        }) for interaction in sorted(
+            (i for i in interactions if i.interaction_severity not in (None, "None")),
+            key=lambda i: -_SEVERITY_RANK.get(i.interaction_severity, 0),
+        )],
+        "dosage": [
+            _drop_empty({"drug": rec.drug_name, "status": rec.status, "notes": rec.notes})
+            for rec in dosage_recommendations
+            # The default note and in-range doses add nothing the model does not already assume
+            if rec.notes and rec.status != "ok" and not rec.notes.startswith("Standard dosing")
+        ],
+        "alternatives": [_drop_empty({"for": alt.drug_name, "reason": alt.reason}) for alt in alternatives],
+    }
+    data = _drop_empty(data)
+
+    def dumps() -> str:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    text = dumps()
+    if len(text) > budget_chars:
+        data.pop("alternatives", None)
+        text = dumps()
+    if len(text) > budget_chars and "dosage" in data:
+        data["dosage"] = [rec for rec in data["dosage"] if rec.get("status") in FLAGGED_DOSE_STATUSES]
+        data = _drop_empty(data)
+        text = dumps()
+    for field in ("age_restrictions", "monitoring", "interacts_with", "contraindications"):
+        if len(text) <= budget_chars:
+            break
+        for drug in data.get("drugs", []):
+            drug.pop(field, None)
+        text = dumps()
+    while len(text) > budget_chars and data.get("interactions"):
+        # Interactions are sorted most severe first, so the mildest go first
+        data["interactions"].pop()
+        text = dumps()
+    return text
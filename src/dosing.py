@@ -0,0 +1,296 @@
+import csv
+import math
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from .cache import file_digest
+from .interactions import normalize_drug_name
+
+DEFAULT_LIMITS_PATH = os.path.join(os.path.dirname(__file__), "data", "dose_limits.csv")
+# Age whose band is applied when the prescription does not give one
+DEFAULT_AGE = 30.0
+
+UNIT_TO_MG = {"mg": 1.0, "mcg": 1e-3, "µg": 1e-3, "ug": 1e-3, "g": 1000.0}
+VOLUME_UNITS = {"ml"}
+
+STATUSES = ["ok", "exceeds_single", "exceeds_daily", "avoid", "no_limits", "unparsed"]
+OK, EXCEEDS_SINGLE, EXCEEDS_DAILY, AVOID, NO_LIMITS, UNPARSED = range(len(STATUSES))
+# Statuses for which the dose was actually compared against a limit
+CHECKED = {"ok", "exceeds_single", "exceeds_daily", "avoid"}
+
+_NUMBER_WORDS = {"once": 1, "one": 1, "twice": 2, "two": 2, "three": 3, "thrice": 3, "four": 4, "five": 5, "six": 6}
+_FIXED_FREQUENCIES = [
+    (re.compile(r"\b(?:qod|every other day|alternate days)\b"), 0.5),
+    (re.compile(r"\b(?:weekly|once a week|every week)\b"), 1 / 7),
+    (re.compile(r"\b(?:qid|qds)\b"), 4.0),
+    (re.compile(r"\b(?:tid|tds)\b"), 3.0),
+    (re.compile(r"\b(?:bid|bd)\b"), 2.0),
+    (re.compile(r"\b(?:qd|od|daily|nightly|qhs|qam|qpm|at bedtime|every (?:morning|evening|night))\b"), 1.0),
+]
+_ABBREVIATION_DOTS = re.compile(r"(?<!\d)\.|\.(?!\d)")
+_TIMES_A_DAY = re.compile(r"\b(\d+|once|one|twice|two|three|thrice|four|five|six)\s*(?:x\s*)?(?:times?\s*)?(?:a|per|each)?\s*(?:day|daily)\b")
+_EVERY_HOURS = re.compile(r"\b(?:q|every\s*)(\d+(?:\.\d+)?)(?:\s*-\s*\d+(?:\.\d+)?)?\s*(?:h|hrs?|hours?)\b")
+_AGE = re.compile(
+    r"\b(\d{1,3}(?:\.\d+)?)\s*(?:-\s*)?(?:years?|yrs?|y/?o|yo)\b|\bage[d:]?\s*(\d{1,3}(?:\.\d+)?)\b",
+    re.IGNORECASE,
+)
+_AGE_MONTHS = re.compile(r"\b(\d{1,2})\s*(?:-\s*)?(?:months?|mos?)\s*old\b", re.IGNORECASE)
+_WEIGHT_KG = re.compile(r"\b(\d{1,3}(?:\.\d+)?)\s*kgs?\b", re.IGNORECASE)
+_WEIGHT_LB = re.compile(r"\b(\d{1,3}(?:\.\d+)?)\s*(?:lbs?|pounds)\b", re.IGNORECASE)
+
+
+def doses_per_day(frequency: str) -> float:
+    """Administrations per day for a frequency string; NaN if it cannot tell (e.g. plain PRN)"""
+    # Dotted Sig codes ("b.i.d.") read like their plain forms; decimals keep their point
+    text = _ABBREVIATION_DOTS.sub("", frequency.lower()).strip()
+    if not text:
+        return math.nan
+    # "every 4-6 hours" can mean every 4 hours, which is the case the maximum must cover
+    match = _EVERY_HOURS.search(text)
+    if match and float(match.group(1)) > 0:
+        return 24.0 / float(match.group(1))
+    match = _TIMES_A_DAY.search(text)
+    if match:
+        count = match.group(1)
+        return float(count) if count.isdigit() else float(_NUMBER_WORDS[count])
+    for pattern, per_day in _FIXED_FREQUENCIES:
+        if pattern.search(text):
+            return per_day
+    return math.nan
+
+
+def patient_from_text(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """(age in years, weight in kg) mentioned in a prescription or query, None where absent"""
+    age = weight = None
+    match = _AGE_MONTHS.search(text)
+    if match:
+        age = int(match.group(1)) / 12
+    else:
+        match = _AGE.search(text)
+        if match:
+            age = float(match.group(1) or match.group(2))
+    match = _WEIGHT_KG.search(text)
+    if match:
+        weight = float(match.group(1))
+    else:
+        match = _WEIGHT_LB.search(text)
+        if match:
+            weight = round(float(match.group(1)) * 0.4536, 1)
+    return age, weight
+
+
+def strip_patient(text: str) -> str:
+    """text with its age and weight mentions removed"""
+    for pattern in (_AGE_MONTHS, _AGE, _WEIGHT_KG, _WEIGHT_LB):
+        text = pattern.sub(" ", text)
+    return text
+
+
+def format_mg(value: float) -> str:
+    return f"{value * 1000:g} mcg" if value < 1 else f"{value:g} mg"
+
+
+class DoseOrder(NamedTuple):
+    drug_name: str
+    amount: str
+    unit: str
+    frequency: str = ""
+    age: Optional[float] = None
+    weight_kg: Optional[float] = None
+
+
+class DoseCheck(NamedTuple):
+    drug_name: str
+    status: str
+    single_mg: Optional[float]
+    daily_mg: Optional[float]
+    max_single_mg: Optional[float]
+    max_daily_mg: Optional[float]
+    message: str
+
+
+class DoseChecker:
+    """Rules-based dose-range validation against age and weight banded limits.
+
+    Each limits row covers one drug for ages [min_age, max_age) with fixed
+    maximums per dose and per day and optional mg/kg maximums; the lower of
+    the two applies when the patient's weight is known. Doses are normalized
+    to mg (mL through the drug's standard oral-liquid strength) and multiplied
+    by the doses per day parsed from the frequency. Parsing is per order, but
+    band selection and every limit comparison run as NumPy array operations
+    over the whole list, so a batch is checked in one pass.
+    """
+
+    def __init__(self, rows: List[Dict[str, str]], aliases: Optional[Dict[str, str]] = None):
+        self.drugs = sorted({normalize_drug_name(row["drug"]) for row in rows})
+        self.ids = {name: index for index, name in enumerate(self.drugs)}
+        self.aliases = {
+            normalize_drug_name(alias): normalize_drug_name(canonical) for alias, canonical in (aliases or {}).items()
+        }
+
+        def column(name: str) -> np.ndarray:
+            return np.array([float(row.get(name) or "nan") for row in rows], dtype=np.float64)
+
+        self.band_drug = np.array([self.ids[normalize_drug_name(row["drug"])] for row in rows], dtype=np.int32)
+        self.band_min_age = column("min_age")
+        self.band_max_age = column("max_age")
+        self.max_single = column("max_single_mg")
+        self.max_daily = column("max_daily_mg")
+        self.max_single_per_kg = column("max_single_mg_per_kg")
+        self.max_daily_per_kg = column("max_daily_mg_per_kg")
+        self.mg_per_ml = column("mg_per_ml")
+        self.notes = [row.get("note") or "" for row in rows]
+        # Content hash of the limits file ("" if built in memory)
+        self.digest = ""
+
+    @classmethod
+    def from_file(cls, path: str, aliases: Optional[Dict[str, str]] = None) -> "DoseChecker":
+        with open(path, newline="", encoding="utf-8") as f:
+            checker = cls(list(csv.DictReader(f)), aliases=aliases)
+        checker.digest = file_digest(path)
+        return checker
+
+    def age_boundaries(self) -> List[float]:
+        """Ages (years) at which some drug's limits change, excluding 0 and the open-ended top"""
+        if not len(self.band_drug):
+            return []
+        ages = np.concatenate([self.band_min_age, self.band_max_age])
+        ages = ages[np.isfinite(ages) & (ages > 0) & (ages < np.nanmax(self.band_max_age))]
+        return [float(age) for age in np.unique(ages)]
+
+    def drug_id(self, name: str) -> int:
+        key = normalize_drug_name(name)
+        return self.ids.get(self.aliases.get(key, key), -1)
+
+    def _parse(self, orders: Sequence[DoseOrder]) -> Dict[str, np.ndarray]:
+        count = len(orders)
+        drug = np.empty(count, dtype=np.int32)
+        amount = np.full(count, np.nan)
+        unit_mg = np.full(count, np.nan)
+        volume = np.zeros(count, dtype=bool)
+        per_day = np.empty(count)
+        age = np.full(count, np.nan)
+        weight = np.full(count, np.nan)
+        for i, order in enumerate(orders):
+            drug[i] = self.drug_id(order.drug_name)
+            try:
+                amount[i] = float(order.amount)
+            except (TypeError, ValueError):
+                pass
+            unit = (order.unit or "").lower()
+            if unit in VOLUME_UNITS:
+                volume[i] = True
+            else:
+                unit_mg[i] = UNIT_TO_MG.get(unit, np.nan)
+            per_day[i] = doses_per_day(order.frequency or "")
+            if order.age is not None:
+                age[i] = order.age
+            if order.weight_kg is not None:
+                weight[i] = order.weight_kg
+        return {
+            "drug": drug, "amount": amount, "unit_mg": unit_mg, "volume": volume,
+            "per_day": per_day, "age": age, "weight": weight,
+        }
+
+    def check(self, orders: Sequence[DoseOrder]) -> List[DoseCheck]:
+        """Validate every order in one vectorized pass"""
+        if not orders:
+            return []
+        p = self._parse(orders)
+        age = np.where(np.isnan(p["age"]), DEFAULT_AGE, p["age"])
+
+        # (orders, bands) mask of the band each order falls in; at most one per order
+        in_band = (
+            (self.band_drug[None, :] == p["drug"][:, None])
+            & (self.band_min_age[None, :] <= age[:, None])
+            & (age[:, None] < self.band_max_age[None, :])
+        )
+        has_band = in_band.any(axis=1)
+        band = in_band.argmax(axis=1) if len(self.band_drug) else np.zeros(len(orders), dtype=np.intp)
+
+        def limit(values: np.ndarray) -> np.ndarray:
+            return np.where(has_band, values[band], np.nan) if len(values) else np.full(len(orders), np.nan)
+
+        mg_factor = np.where(p["volume"], limit(self.mg_per_ml), p["unit_mg"])
+        single = p["amount"] * mg_factor
+        daily = single * p["per_day"]
+        # fmin ignores NaN, so a missing weight or per-kg limit leaves the fixed limit
+        max_single = np.fmin(limit(self.max_single), limit(self.max_single_per_kg) * p["weight"])
+        max_daily = np.fmin(limit(self.max_daily), limit(self.max_daily_per_kg) * p["weight"])
+
+        tolerance = 1 + 1e-9
+        status = np.select(
+            [
+                ~has_band,
+                limit(self.max_daily) == 0,
+                np.isnan(single),
+                single > max_single * tolerance,
+                daily > max_daily * tolerance,
+            ],
+            [NO_LIMITS, AVOID, UNPARSED, EXCEEDS_SINGLE, EXCEEDS_DAILY],
+            default=OK,
+        )
+        return [
+            self._result(order, int(status[i]), single[i], daily[i], max_single[i], max_daily[i],
+                         int(band[i]) if has_band[i] else None, np.isnan(p["age"][i]))
+            for i, order in enumerate(orders)
+        ]
+
+    def _result(
+        self,
+        order: DoseOrder,
+        status: int,
+        single: float,
+        daily: float,
+        max_single: float,
+        max_daily: float,
+        band: Optional[int],
+        age_assumed: bool,
+    ) -> DoseCheck:
+        def value(x: float) -> Optional[float]:
+            return None if np.isnan(x) else round(float(x), 6)
+
+        if status == NO_LIMITS:
+            message = f"No dose limits on file for {order.drug_name}" + (" at this age" if self.drug_id(order.drug_name) >= 0 else "")
+        elif status == UNPARSED:
+            message = f"Dose '{f'{order.amount} {order.unit}'.strip()}' could not be converted to mg"
+        elif status == AVOID:
+            message = self.notes[band] or f"{order.drug_name} is not recommended at this age"
+        else:
+            limits = []
+            if not np.isnan(max_single):
+                limits.append(f"{format_mg(max_single)} per dose")
+            if not np.isnan(max_daily):
+                limits.append(f"{format_mg(max_daily)}/day")
+            if status == EXCEEDS_SINGLE:
+                message = f"{format_mg(single)} per dose exceeds the maximum of {format_mg(max_single)}"
+            elif status == EXCEEDS_DAILY:
+                message = f"{format_mg(daily)}/day exceeds the maximum of {format_mg(max_daily)}/day"
+            elif np.isnan(daily):
+                message = f"{format_mg(single)} per dose is within limits; frequency unknown, daily total not checked"
+            else:
+                message = f"{format_mg(daily)}/day is within limits ({', '.join(limits)})"
+            if self.notes[band]:
+                message += f". {self.notes[band]}"
+        if age_assumed and status in (OK, EXCEEDS_SINGLE, EXCEEDS_DAILY, AVOID):
+            message += ". Age not given; adult limits applied"
+        return DoseCheck(
+            drug_name=order.drug_name,
+            status=STATUSES[status],
+            single_mg=value(single),
+            daily_mg=value(daily),
+            max_single_mg=value(max_single),
+            max_daily_mg=value(max_daily),
+            message=message,
+        )
+
+
+def default_dose_checker(aliases: Optional[Dict[str, str]] = None) -> DoseChecker:
+    """Checker over DOSE_LIMITS_PATH (bundled limits by default); empty if it cannot be loaded"""
+    path = os.getenv("DOSE_LIMITS_PATH", DEFAULT_LIMITS_PATH)
+    try:
+        return DoseChecker.from_file(path, aliases=aliases)
+    except Exception as e:
+        print(f"Dose limits error: {e}")
+        return DoseChecker([], aliases=aliases)
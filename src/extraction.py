@@ -0,0 +1,163 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+from .models import ExtractedDrugInfo
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# Only these characters change the parser state; everything between them is skipped
+_STRUCTURAL = re.compile(r'[{}\[\]",\\]')
+_FIELDS = set(ExtractedDrugInfo.model_fields)
+
+
+class _Frame:
+    __slots__ = ("opener", "start", "has_key", "expects_key", "cut")
+
+    def __init__(self, opener: str, start: int):
+        self.opener = opener
+        self.start = start
+        # Whether the item key (e.g. "drug_name") is one of this object's own members
+        self.has_key = False
+        # Whether the next string in this object is a member name
+        self.expects_key = opener == "{"
+        # Position of the last comma between members, where a truncated object can be cut
+        self.cut: Optional[int] = None
+
+
+class JSONItemParser:
+    """Incremental, tolerant parser for the JSON objects in LLM output.
+
+    Text is fed as it arrives and every outermost object with the item key
+    among its members is returned as soon as its closing brace is seen,
+    wherever it sits: in a bare or wrapped array ({"drugs": [...]}), in a
+    fenced code block, or among prose. Nested values such as
+    {"dose": {"amount": 5}} stay part of their item. Objects that fail strict
+    parsing are retried without trailing commas, and close() recovers the
+    complete members of an item cut off mid-output.
+    """
+
+    def __init__(self, key: str = "drug_name"):
+        self.key = key
+        self._buffer = ""
+        self._position = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        # Start of the member name being read, -1 inside a value string
+        self._key_start = -1
+        # Position of a character escaped by a backslash, which is not structural
+        self._escaped_at = -1
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Items completed by this piece of text"""
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        stack = self._stack
+        for match in _STRUCTURAL.finditer(buffer, self._position):
+            i = match.start()
+            char = buffer[i]
+            if self._in_string:
+                if i == self._escaped_at:
+                    continue
+                if char == "\\":
+                    self._escaped_at = i + 1
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start >= 0 and buffer[self._key_start + 1:i] == self.key:
+                        stack[-1].has_key = True
+                    self._key_start = -1
+            elif char == '"':
+                # Quotes in prose outside any object are not strings
+                self._in_string = bool(stack)
+                if stack and stack[-1].expects_key:
+                    stack[-1].expects_key = False
+                    self._key_start = i
+            elif char in "{[":
+                if stack:
+                    stack[-1].expects_key = False
+                stack.append(_Frame(char, i))
+            elif char in "}]" and stack:
+                frame = stack.pop()
+                if char == "}" and frame.opener == "{" and frame.has_key and not self._inside_item():
+                    item = self._load(buffer[frame.start:i + 1])
+                    if item is not None:
+                        items.append(item)
+            elif char == "," and stack and stack[-1].opener == "{":
+                stack[-1].cut = i
+                stack[-1].expects_key = True
+        self._position = len(buffer)
+        return items
+
+    def close(self) -> List[Dict[str, Any]]:
+        """The complete members of an item left open by truncated output"""
+        items = []
+        for frame in self._stack:
+            if frame.opener == "{" and frame.has_key:
+                if frame.cut is not None:
+                    item = self._load(self._buffer[frame.start:frame.cut] + "}")
+                    if item is not None and self.key in item:
+                        items.append(item)
+                break
+        self._stack = []
+        self._in_string = False
+        self._key_start = -1
+        self._escaped_at = -1
+        return items
+
+    def _inside_item(self) -> bool:
+        """Whether an enclosing object is itself an item (so this one is part of it)"""
+        return any(frame.has_key for frame in self._stack)
+
+    @staticmethod
+    def _load(text: str) -> Optional[Dict[str, Any]]:
+        for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            return value if isinstance(value, dict) else None
+        return None
+
+
+def parse_json_items(text: str) -> List[Dict[str, Any]]:
+    parser = JSONItemParser()
+    return parser.feed(text) + parser.close()
+
+
+def _field_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(_field_text(item) for item in value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def drug_details_from_items(items: List[Dict[str, Any]]) -> List[ExtractedDrugInfo]:
+    """ExtractedDrugInfo for each object naming a drug, with numbers and lists coerced to text"""
+    details = []
+    for item in items:
+        fields = {key: _field_text(value) for key, value in item.items() if key in _FIELDS}
+        if fields.get("drug_name"):
+            details.append(ExtractedDrugInfo(**fields))
+    return details
+
+
+def parse_drug_details(text: str) -> List[ExtractedDrugInfo]:
+    """Every drug recoverable from an extraction response, whatever shape the JSON took"""
+    return drug_details_from_items(parse_json_items(text))
+
+
+def raw_output_text(message: Any) -> str:
+    """The text a model returned for a structured call: content, or the unparsed tool arguments"""
+    content = getattr(message, "content", "")
+    if isinstance(content, str) and content.strip():
+        return content
+    for call in getattr(message, "invalid_tool_calls", None) or []:
+        if call.get("args"):
+            return call["args"]
+    for call in (getattr(message, "additional_kwargs", None) or {}).get("tool_calls") or []:
+        arguments = (call.get("function") or {}).get("arguments")
+        if arguments:
+            return arguments
+    return ""
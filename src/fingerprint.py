@@ -0,0 +1,128 @@
+import bisect
+import hashlib
+import json
+import math
+import re
+from typing import Callable, List, Optional, Sequence
+from .dosing import UNIT_TO_MG, VOLUME_UNITS, doses_per_day, patient_from_text, strip_patient
+from .models import ExtractedDrugInfo
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_WORD = re.compile(r"[a-z][a-z'-]*")
+_ROUTES = {"po": "oral", "p.o.": "oral", "by mouth": "oral", "orally": "oral", "oral": "oral"}
+# Sig and dosage-form vocabulary and filler that do not change what a
+# prescription means; every other word in the query is part of its key
+_FILLER = {
+    "an", "and", "as", "at", "by", "each", "every", "for", "in", "is", "of", "on", "or", "per", "plus",
+    "the", "then", "to", "with",
+    "check", "please", "prescribed", "prescription", "rx", "take", "takes", "taking", "verify",
+    "patient", "old", "year", "years", "yr", "yrs", "yo", "month", "months",
+    "kg", "kgs", "lb", "lbs", "pound", "pounds", "weighs", "weighing",
+    "tab", "tabs", "tablet", "tablets", "cap", "caps", "capsule", "capsules", "dose", "doses",
+    "day", "days", "daily", "time", "times", "hour", "hours", "hr", "hrs",
+    "one", "two", "three", "four", "five", "six", "once", "twice", "thrice",
+    "mouth", "needed", "prn",
+}
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def age_band(age: Optional[float], boundaries: Sequence[float]) -> str:
+    """Band of an age in years between sorted boundaries, e.g. "12-16" or "18+"; "unknown" if not given"""
+    if age is None:
+        return "unknown"
+    bounds = [0] + list(boundaries)
+    index = bisect.bisect_right(boundaries, age)
+    if index == len(boundaries):
+        return f"{bounds[-1]:g}+"
+    return f"{bounds[index]:g}-{boundaries[index]:g}"
+
+
+def residual_terms(query: str, drug_names: Sequence[str]) -> List[str]:
+    """Words of the query beyond its drugs, doses, Sig and patient age/weight.
+
+    These carry conditions (pregnancy, renal impairment), allergies and names
+    that the structured fields miss, so two queries only share a cached result
+    when they agree on them too.
+    """
+    text = strip_patient(query.lower())
+    for name in sorted(drug_names, key=len, reverse=True):
+        text = text.replace(name.lower(), " ")
+    terms = set()
+    for word in _WORD.findall(text):
+        word = word.strip("'-")
+        # Single letters are what is left of abbreviations such as "b.i.d." and "q8h"
+        if (
+            len(word) < 2 or word in _FILLER or word in UNIT_TO_MG or word in VOLUME_UNITS or word in _ROUTES
+            or not math.isnan(doses_per_day(word))
+        ):
+            continue
+        terms.add(word)
+    return sorted(terms)
+
+
+def canonical_dose(amount: str, unit: str) -> str:
+    """A dose in mg where the unit converts ("0.5 g" and "500 mg" are both "500mg")"""
+    match = _NUMBER.search(amount or "")
+    unit = _normalize_text(unit or "")
+    if match is None:
+        return _normalize_text(f"{amount} {unit}")
+    value = float(match.group())
+    if unit in UNIT_TO_MG:
+        return f"{round(value * UNIT_TO_MG[unit], 6):g}mg"
+    return f"{value:g}{unit}"
+
+
+def canonical_frequency(frequency: str) -> str:
+    """Doses per day ("BID", "twice daily" and "q12h" are all "2/day"), else the normalized text"""
+    per_day = doses_per_day(frequency or "")
+    if math.isnan(per_day):
+        return _normalize_text(frequency or "")
+    return f"{round(per_day, 4):g}/day"
+
+
+def canonical_route(route: str) -> str:
+    text = _normalize_text(route or "")
+    return _ROUTES.get(text, text)
+
+
+def prescription_fingerprint(
+    drug_names: List[str],
+    details: List[ExtractedDrugInfo],
+    query: str,
+    canonical_name: Callable[[str], str],
+    age_boundaries: Sequence[float],
+) -> str:
+    """Stable hash of what a verification depends on, independent of how the prescription was worded.
+
+    Drugs are keyed by canonical name (brands and synonyms fold to the
+    generic) and sorted; doses are normalized to mg and frequencies to doses
+    per day; the patient is reduced to an age band (between the ages at
+    which the dose limits change) and, when given, a weight. Any other words
+    in the query are kept as they are, see residual_terms.
+    """
+    by_name = {detail.drug_name: detail for detail in details}
+    # Duplicates are kept: a brand and its generic prescribed together is a finding
+    entries = []
+    for name in drug_names + [name for name in by_name if name not in drug_names]:
+        detail = by_name.get(name)
+        if detail is None:
+            entries.append((canonical_name(name), "", "", ""))
+            continue
+        entries.append((
+            canonical_name(name),
+            canonical_dose(detail.dosage_amount, detail.dosage_unit) if detail.dosage_amount else "",
+            canonical_frequency(detail.frequency),
+            canonical_route(detail.route),
+        ))
+    age, weight = patient_from_text(query)
+    payload = {
+        "drugs": sorted(entries),
+        "age": age_band(age, age_boundaries),
+        # Weight-based limits depend on the exact weight
+        "weight_kg": round(weight, 1) if weight is not None else None,
+        "context": residual_terms(query, list(drug_names) + list(by_name)),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
@@ -1,27 +1,185 @@
+import asyncio
 import os
-from firecrawl import FirecrawlApp, ScrapeOptions
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
 from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict
+from .cache import SQLiteCache
+from .scheduler import scheduler
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .tracing import tracer
 
 load_dotenv()
 
+DEFAULT_CACHE_PATH = ".cache/firecrawl.sqlite"
+DEFAULT_CACHE_TTL = 7 * 24 * 3600  # Monograph pages seldom change
+
+
+def default_firecrawl_cache() -> Optional[SQLiteCache]:
+    """Build the Firecrawl cache from environment settings (None if disabled)"""
+    path = os.getenv("FIRECRAWL_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    return SQLiteCache(
+        path,
+        namespace="firecrawl",
+        ttl=float(os.getenv("FIRECRAWL_CACHE_TTL", DEFAULT_CACHE_TTL)),
+        max_entries=int(os.getenv("FIRECRAWL_CACHE_MAX_ENTRIES", "5000")),
+    )
+
+
+class FirecrawlHTTPError(Exception):
+    """A failed Firecrawl API call, with the HTTP status for the retry policy"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CachedSearchResponse(BaseModel):
+    """Search results served from the cache, shaped like the SDK's SearchResponse.
+
+    Cache hits use these instead of the SDK models so that the Firecrawl SDK
+    is only imported when a request actually goes to the network.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    success: bool = True
+    data: List[Dict[str, Any]] = []
+    warning: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CachedScrapeResponse(BaseModel):
+    """A scraped page served from the cache, shaped like the SDK's ScrapeResponse"""
+    model_config = ConfigDict(extra="allow")
+
+    success: bool = True
+    url: Optional[str] = None
+    markdown: Optional[str] = None
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def search_cache_key(query: str, num_results: int, max_chars: Optional[int] = None) -> str:
+    return SQLiteCache.make_key("search", normalize_query(query), num_results, ["markdown"], max_chars)
+
+
+def scrape_cache_key(url: str, max_chars: Optional[int] = None) -> str:
+    return SQLiteCache.make_key("scrape", normalize_url(url), ["markdown"], max_chars)
+
+
+def _documents(result) -> list:
+    """Result documents of a search response, or the page of a scrape response"""
+    data = getattr(result, "data", None)
+    return data if isinstance(data, list) else [result]
+
+
+def markdown_size(result) -> int:
+    """Characters of markdown in a scrape response or across search results"""
+    if not result:
+        return 0
+    documents = _documents(result)
+    total = 0
+    for document in documents:
+        markdown = document.get("markdown") if isinstance(document, dict) else document.markdown
+        total += len(markdown or "")
+    return total
+
+
+def truncate_markdown(result, max_chars: Optional[int]):
+    """Cut the markdown of a scrape response, or of every search result, to max_chars"""
+    if max_chars is None or not result:
+        return result
+    documents = _documents(result)
+    for document in documents:
+        if isinstance(document, dict):
+            if document.get("markdown"):
+                document["markdown"] = document["markdown"][:max_chars]
+        elif document.markdown:
+            document.markdown = document.markdown[:max_chars]
+    return result
+
+
+def drug_info_query(query: str) -> str:
+    return f"{query} drug information interactions dosage"
+
+
+def drug_interactions_query(drug_name: str) -> str:
+    return f"{drug_name} drug interactions contraindications safety"
+
+
 class FirecrawlService:
-    def __init__(self):
+    def __init__(self, cache: Optional[SQLiteCache] = None, cache_only: Optional[bool] = None, app=None):
+        if cache_only is None:
+            cache_only = os.getenv("FIRECRAWL_CACHE_ONLY", "").lower() in {"1", "true", "yes"}
+        self.cache_only = cache_only
+        self.cache = cache if cache is not None else default_firecrawl_cache()
+        # Identical searches and scrapes already in flight share one request
+        self._flights = SingleFlight("firecrawl")
+
+        if app is not None:
+            # Any object with FirecrawlApp's search/scrape_url signature, e.g. a test double
+            self.app = app
+            return
+        from firecrawl import FirecrawlApp
+
         api_key = os.getenv("FIRECRAWL_API_KEY")
+        if self.cache_only:
+            # Offline mode never touches the network, so no key is needed
+            self.app = FirecrawlApp(api_key=api_key) if api_key else None
+            return
         if not api_key:
             raise ValueError("Missing FIRECRAWL_API_KEY environment variable")
         self.app = FirecrawlApp(api_key=api_key)
 
-    def search_drug_info(self, query: str, num_results: int = 5):
+    def _search(self, query: str, num_results: int, max_chars: Optional[int] = None):
+        key = search_cache_key(query, num_results, max_chars)
+        start = time.perf_counter()
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                result = CachedSearchResponse(**cached)
+                tracer.record_firecrawl("search", time.perf_counter() - start, markdown_size(result), cache_hit=True)
+                return result
+        if self.cache_only:
+            return []
+        return self._flights.do(key, self._fetch_search, key, query, num_results, max_chars, start)
+
+    def _fetch_search(self, key: str, query: str, num_results: int, max_chars: Optional[int], start: float):
+        from firecrawl import ScrapeOptions
+
+        result = scheduler.call(
+            "firecrawl",
+            self.app.search,
+            query=query,
+            limit=num_results,
+            scrape_options=ScrapeOptions(
+                formats=["markdown"],
+                # Page chrome is dropped server-side when only a prefix is needed
+                onlyMainContent=True if max_chars else None
+            )
+        )
+        result = truncate_markdown(result, max_chars)
+        tracer.record_firecrawl("search", time.perf_counter() - start, markdown_size(result), cache_hit=False)
+        if self.cache is not None and result and result.data:
+            self.cache.set(key, result.model_dump())
+        return result
+
+    def search_drug_info(self, query: str, num_results: int = 5, max_chars: Optional[int] = None):
         """Search for drug information from medical databases and resources"""
         try:
-            result = self.app.search(
-                query=f"{query} drug information interactions dosage",
-                limit=num_results,
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"]
-                )
-            )
-            return result
+            return self._search(drug_info_query(query), num_results, max_chars)
         except Exception as e:
             print(f"Search error: {e}")
             return []
@@ -29,26 +187,189 @@ class FirecrawlService:
     def search_drug_interactions(self, drug_name: str, num_results: int = 3):
         """Search specifically for drug interaction information"""
         try:
-            result = self.app.search(
-                query=f"{drug_name} drug interactions contraindications safety",
-                limit=num_results,
-                scrape_options=ScrapeOptions(
-                    formats=["markdown"]
-                )
-            )
-            return result
+            return self._search(drug_interactions_query(drug_name), num_results)
         except Exception as e:
             print(f"Interaction search error: {e}")
             return []
 
-    def scrape_medical_page(self, url: str):
+    def scrape_medical_page(self, url: str, max_chars: Optional[int] = None):
         """Scrape medical information pages"""
         try:
-            result = self.app.scrape_url(
-                url,
-                formats=["markdown"]
+            key = scrape_cache_key(url, max_chars)
+            start = time.perf_counter()
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    result = CachedScrapeResponse(**cached)
+                    tracer.record_firecrawl("scrape", time.perf_counter() - start, markdown_size(result), cache_hit=True)
+                    return result
+            if self.cache_only:
+                return None
+            return self._flights.do(key, self._fetch_scrape, key, url, max_chars, start)
+        except Exception as e:
+            print(f"Scraping error: {e}")
+            return None
+
+    def _fetch_scrape(self, key: str, url: str, max_chars: Optional[int], start: float):
+        result = scheduler.call(
+            "firecrawl",
+            self.app.scrape_url,
+            url,
+            formats=["markdown"],
+            only_main_content=True if max_chars else None
+        )
+        result = truncate_markdown(result, max_chars)
+        tracer.record_firecrawl("scrape", time.perf_counter() - start, markdown_size(result), cache_hit=False)
+        if self.cache is not None and result and result.markdown:
+            self.cache.set(key, result.model_dump())
+        return result
+
+    def cache_stats(self):
+        """Hit/miss counters for the search and scrape cache"""
+        return self.cache.stats() if self.cache is not None else {}
+
+
+class AsyncFirecrawlService:
+    """Async Firecrawl client sharing one pooled aiohttp session across calls"""
+
+    def __init__(
+        self,
+        cache: Optional[SQLiteCache] = None,
+        cache_only: Optional[bool] = None,
+        max_connections: int = 100,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        if cache_only is None:
+            cache_only = os.getenv("FIRECRAWL_CACHE_ONLY", "").lower() in {"1", "true", "yes"}
+        self.cache_only = cache_only
+        self.cache = cache if cache is not None else default_firecrawl_cache()
+        self.api_key = api_key or os.getenv("FIRECRAWL_API_KEY")
+        if not self.api_key and not self.cache_only:
+            raise ValueError("Missing FIRECRAWL_API_KEY environment variable")
+        self.api_url = api_url or os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev")
+        self.max_connections = max_connections
+        # Sessions are bound to the loop that created them, so each loop gets its own
+        self._sessions: Dict[asyncio.AbstractEventLoop, Any] = {}
+        self._flights = AsyncSingleFlight("firecrawl")
+
+    async def _get_session(self):
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            await self._close_sessions(lambda other: other.is_closed())
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=aiohttp.ClientTimeout(total=60),
             )
-            return result
+            self._sessions[loop] = session
+        return session
+
+    async def _close_sessions(self, select: Callable[[asyncio.AbstractEventLoop], bool]) -> None:
+        """Close and forget the sessions of the loops select() picks"""
+        for loop in [loop for loop in self._sessions if select(loop)]:
+            session = self._sessions.pop(loop)
+            try:
+                await session.close()
+            except RuntimeError:
+                # Its loop is closed, and the connections went with it
+                pass
+
+    async def _post(self, endpoint: str, payload: dict) -> dict:
+        session = await self._get_session()
+        async with session.post(f"{self.api_url}{endpoint}", json=payload) as response:
+            body = await response.json(content_type=None)
+            if response.status >= 300 or not body.get("success"):
+                raise FirecrawlHTTPError(
+                    f"Firecrawl {endpoint} failed with status {response.status}: {body.get('error', body)}",
+                    response.status,
+                )
+            return body
+
+    async def _search(self, query: str, num_results: int, max_chars: Optional[int] = None):
+        key = search_cache_key(query, num_results, max_chars)
+        start = time.perf_counter()
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                result = CachedSearchResponse(**cached)
+                tracer.record_firecrawl("search", time.perf_counter() - start, markdown_size(result), cache_hit=True)
+                return result
+        if self.cache_only:
+            return []
+        return await self._flights.do(key, self._fetch_search, key, query, num_results, max_chars, start)
+
+    async def _fetch_search(self, key: str, query: str, num_results: int, max_chars: Optional[int], start: float):
+        scrape_options = {"formats": ["markdown"]}
+        if max_chars:
+            scrape_options["onlyMainContent"] = True
+        body = await scheduler.acall("firecrawl", self._post, "/v1/search", {
+            "query": query,
+            "limit": num_results,
+            "scrapeOptions": scrape_options,
+        })
+        from firecrawl.firecrawl import SearchResponse
+
+        result = truncate_markdown(SearchResponse(**body), max_chars)
+        tracer.record_firecrawl("search", time.perf_counter() - start, markdown_size(result), cache_hit=False)
+        if self.cache is not None and result.data:
+            await asyncio.to_thread(self.cache.set, key, result.model_dump())
+        return result
+
+    async def search_drug_info(self, query: str, num_results: int = 5, max_chars: Optional[int] = None):
+        """Search for drug information from medical databases and resources"""
+        try:
+            return await self._search(drug_info_query(query), num_results, max_chars)
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    async def search_drug_interactions(self, drug_name: str, num_results: int = 3):
+        """Search specifically for drug interaction information"""
+        try:
+            return await self._search(drug_interactions_query(drug_name), num_results)
+        except Exception as e:
+            print(f"Interaction search error: {e}")
+            return []
+
+    async def scrape_medical_page(self, url: str, max_chars: Optional[int] = None):
+        """Scrape medical information pages"""
+        try:
+            key = scrape_cache_key(url, max_chars)
+            start = time.perf_counter()
+            if self.cache is not None:
+                cached = await asyncio.to_thread(self.cache.get, key)
+                if cached is not None:
+                    result = CachedScrapeResponse(**cached)
+                    tracer.record_firecrawl("scrape", time.perf_counter() - start, markdown_size(result), cache_hit=True)
+                    return result
+            if self.cache_only:
+                return None
+            return await self._flights.do(key, self._fetch_scrape, key, url, max_chars, start)
         except Exception as e:
             print(f"Scraping error: {e}")
             return None
+
+    async def _fetch_scrape(self, key: str, url: str, max_chars: Optional[int], start: float):
+        payload = {"url": url, "formats": ["markdown"]}
+        if max_chars:
+            payload["onlyMainContent"] = True
+        body = await scheduler.acall("firecrawl", self._post, "/v1/scrape", payload)
+        from firecrawl.firecrawl import ScrapeResponse
+
+        result = truncate_markdown(ScrapeResponse(**body.get("data", {})), max_chars)
+        tracer.record_firecrawl("scrape", time.perf_counter() - start, markdown_size(result), cache_hit=False)
+        if self.cache is not None and result.markdown:
+            await asyncio.to_thread(self.cache.set, key, result.model_dump())
+        return result
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def aclose(self) -> None:
+        """Close this loop's session and any left by loops that have since closed"""
+        current = asyncio.get_running_loop()
+        await self._close_sessions(lambda loop: loop is current or loop.is_closed())
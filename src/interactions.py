@@ -0,0 +1,229 @@
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional
+from .cache import file_digest
+
+DEFAULT_DATASET_PATH = os.path.join(os.path.dirname(__file__), "data", "ddi_interactions.csv")
+
+SEVERITIES = ["None", "Minor", "Moderate", "Major"]
+SEVERITY_CODES = {name.lower(): code for code, name in enumerate(SEVERITIES)}
+
+# Compiled index layout: magic, header length, JSON header, padding to 8 bytes,
+# sorted uint64 pair keys, then uint32 values (severity << 24 | description id)
+MAGIC = b"DDIX0001"
+_HEADER = struct.Struct("<8sQ")
+
+_DOSE_PATTERN = re.compile(
+    r"\b\d+(?:\.\d+)?\s*(?:mg|mcg|µg|g|ml|units?|iu|%)\b|\([^)]*\)", re.IGNORECASE
+)
+
+# Dosage forms, routes and release/salt suffixes that do not change the active drug
+_FORM_WORDS = {
+    "tablet", "tablets", "tab", "tabs", "capsule", "capsules", "cap", "caps",
+    "oral", "injection", "solution", "suspension", "cream", "ointment", "po", "iv",
+    "hcl", "hydrochloride", "er", "xr", "sr", "xl",
+}
+
+
+def normalize_drug_name(name: str) -> str:
+    """Lowercase a drug mention and strip doses, dosage forms and parentheticals"""
+    name = _DOSE_PATTERN.sub(" ", name.lower())
+    words = re.sub(r"[^a-z0-9\-]+", " ", name).split()
+    return " ".join(word for word in words if word not in _FORM_WORDS)
+
+
+class InteractionIndex:
+    """Pairwise drug-drug interaction lookups against a local dataset.
+
+    Pairs are stored as sorted 64-bit keys built from canonical drug ids, so
+    a lookup is one dict access for the name plus a binary search. A compiled
+    index file is memory-mapped rather than read into Python objects.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        descriptions: List[str],
+        keys: Any,
+        values: Any,
+        aliases: Optional[Dict[str, str]] = None,
+        _mmap: Optional[mmap.mmap] = None,
+    ):
+        self.names = names
+        self.ids = {name: index for index, name in enumerate(names)}
+        self.descriptions = descriptions
+        self.aliases = {normalize_drug_name(alias): normalize_drug_name(canonical) for alias, canonical in (aliases or {}).items()}
+        self._keys = keys
+        self._values = values
+        self._mmap = _mmap
+        # Content hash of the file the index was loaded from ("" if built in memory)
+        self.digest = ""
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, str]], aliases: Optional[Dict[str, str]] = None) -> "InteractionIndex":
+        alias_map = {normalize_drug_name(a): normalize_drug_name(c) for a, c in (aliases or {}).items()}
+        ids: Dict[str, int] = {}
+        descriptions: List[str] = []
+        description_ids: Dict[str, int] = {}
+        pairs: Dict[int, int] = {}
+
+        for record in records:
+            drug_a = normalize_drug_name(record.get("drug_a", ""))
+            drug_b = normalize_drug_name(record.get("drug_b", ""))
+            drug_a, drug_b = alias_map.get(drug_a, drug_a), alias_map.get(drug_b, drug_b)
+            severity = SEVERITY_CODES.get(str(record.get("severity", "")).strip().lower())
+            if not drug_a or not drug_b or drug_a == drug_b or severity is None:
+                continue
+            id_a = ids.setdefault(drug_a, len(ids))
+            id_b = ids.setdefault(drug_b, len(ids))
+            description = (record.get("description") or "").strip()
+            if description not in description_ids:
+                description_ids[description] = len(descriptions)
+                descriptions.append(description)
+            key = cls._pair_key(id_a, id_b)
+            value = (severity << 24) | description_ids[description]
+            # Keep the most severe record when a pair appears more than once
+            if key not in pairs or (pairs[key] >> 24) < severity:
+                pairs[key] = value
+
+        sorted_keys = sorted(pairs)
+        keys = array("Q", sorted_keys)
+        values = array("I", (pairs[key] for key in sorted_keys))
+        names = sorted(ids, key=ids.get)
+        return cls(names, descriptions, keys, values, aliases)
+
+    @classmethod
+    def from_file(cls, path: str, aliases: Optional[Dict[str, str]] = None) -> "InteractionIndex":
+        """Load a compiled .ddix index or build one from a CSV/JSON dataset"""
+        with open(path, "rb") as f:
+            is_compiled = f.read(len(MAGIC)) == MAGIC
+        if is_compiled:
+            index = cls.load(path)
+        elif path.endswith(".json"):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                aliases = {**data.get("aliases", {}), **(aliases or {})}
+                data = data.get("interactions", [])
+            index = cls.from_records(data, aliases)
+        else:
+            with open(path, newline="", encoding="utf-8") as f:
+                index = cls.from_records(csv.DictReader(f), aliases)
+        index.digest = file_digest(path)
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the compiled, memory-mappable form of the index"""
+        header = json.dumps({
+            "names": self.names,
+            "descriptions": self.descriptions,
+            "aliases": self.aliases,
+            "count": len(self._keys),
+        }).encode("utf-8")
+        padding = (-(_HEADER.size + len(header))) % 8
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(header)))
+            f.write(header + b"\0" * padding)
+            f.write(array("Q", self._keys).tobytes())
+            f.write(array("I", self._values).tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "InteractionIndex":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled interaction index")
+        header = json.loads(mapped[_HEADER.size:_HEADER.size + header_length])
+        count = header["count"]
+        offset = _HEADER.size + header_length
+        offset += (-offset) % 8
+        view = memoryview(mapped)
+        keys = view[offset:offset + count * 8].cast("Q")
+        values = view[offset + count * 8:offset + count * 12].cast("I")
+        return cls(header["names"], header["descriptions"], keys, values, header.get("aliases"), _mmap=mapped)
+
+    @staticmethod
+    def _pair_key(id_a: int, id_b: int) -> int:
+        low, high = sorted((id_a, id_b))
+        return (low << 32) | high
+
+    def canonical_id(self, name: str) -> Optional[int]:
+        normalized = normalize_drug_name(name)
+        normalized = self.aliases.get(normalized, normalized)
+        return self.ids.get(normalized)
+
+    def pair(self, drug_a: str, drug_b: str) -> Optional[Dict[str, str]]:
+        """Interaction between two drugs, or None if the dataset has no record"""
+        id_a, id_b = self.canonical_id(drug_a), self.canonical_id(drug_b)
+        if id_a is None or id_b is None or id_a == id_b:
+            return None
+        return self._lookup(self._pair_key(id_a, id_b))
+
+    def _lookup(self, key: int) -> Optional[Dict[str, str]]:
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return None
+        value = self._values[position]
+        return {
+            "severity": SEVERITIES[value >> 24],
+            "description": self.descriptions[value & 0xFFFFFF],
+        }
+
+    def check(self, drug_names: List[str]) -> List[Dict[str, str]]:
+        """All known interactions within a medication list"""
+        resolved = [(name, self.canonical_id(name)) for name in drug_names]
+        resolved = [(name, drug_id) for name, drug_id in resolved if drug_id is not None]
+        found = []
+        for (name_a, id_a), (name_b, id_b) in combinations(resolved, 2):
+            if id_a == id_b:
+                continue
+            hit = self._lookup(self._pair_key(id_a, id_b))
+            if hit:
+                found.append({"drug_a": name_a, "drug_b": name_b, **hit})
+        return found
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._keys.release()
+            self._values.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+def default_interaction_index(aliases: Optional[Dict[str, str]] = None) -> Optional[InteractionIndex]:
+    """Load the interaction index named by DDI_INDEX_PATH (bundled dataset by default)"""
+    path = os.getenv("DDI_INDEX_PATH", DEFAULT_DATASET_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        index = InteractionIndex.from_file(path)
+        if aliases:
+            index.aliases.update(
+                (normalize_drug_name(alias), normalize_drug_name(canonical)) for alias, canonical in aliases.items()
+            )
+        return index
+    except Exception as e:
+        print(f"Interaction index error: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # python -m src.interactions dataset.csv index.ddix
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.interactions <dataset.csv|json> <output.ddix>")
+        sys.exit(1)
+    index = InteractionIndex.from_file(sys.argv[1])
+    index.save(sys.argv[2])
+    print(f"Compiled {len(index)} interactions across {len(index.names)} drugs to {sys.argv[2]}")
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 
@@ -12,6 +13,14 @@ class DrugAnalysis(BaseModel):
     therapeutic_class: str = ""
     monitoring_required: List[str] = []
 
+class NamedDrugAnalysis(DrugAnalysis):
+    """DrugAnalysis tagged with the drug it describes"""
+    drug_name: str
+
+class DrugAnalysisBatch(BaseModel):
+    """Structured output for analyzing several drugs in one LLM call"""
+    analyses: List[NamedDrugAnalysis] = []
+
 class DrugInfo(BaseModel):
     name: str
     description: str
@@ -33,6 +42,36 @@ class ExtractedDrugInfo(BaseModel):
     duration: str = ""
     special_instructions: str = ""
 
+class ExtractedDrugList(BaseModel):
+    """Structured output for extracting every drug in a prescription in one LLM call"""
+    drugs: List[ExtractedDrugInfo] = []
+
+# Per-result records are slotted dataclasses rather than models or dicts: a
+# batch holds thousands of them, pydantic passes instances through without
+# re-validating, and model_dump() still serializes them as plain objects
+@dataclass(slots=True)
+class DrugInteraction:
+    drug_pair: str  # "Name1 + Name2"
+    interaction_severity: str  # Major, Moderate, Minor, None, Unknown
+    notes: str = ""
+    source: str = ""  # interaction_index or heuristic
+
+# Dose check statuses that mark a prescribed dose as unsafe
+FLAGGED_DOSE_STATUSES = {"exceeds_single", "exceeds_daily", "avoid"}
+
+@dataclass(slots=True)
+class DosageRecommendation:
+    drug_name: str
+    recommended_dose: str
+    notes: str = ""
+    status: str = ""  # Dose check result (ok, exceeds_single, exceeds_daily, avoid); empty if unchecked
+
+@dataclass(slots=True)
+class Alternative:
+    drug_name: str
+    dose: str
+    reason: str = ""
+
 class ResearchState(BaseModel):
     query: str
     extracted_drugs: List[str] = []  # Drugs extracted from medical text
@@ -40,6 +79,7 @@ class ResearchState(BaseModel):
     search_results: List[Dict[str, Any]] = []
     extracted_drug_details: List[ExtractedDrugInfo] = []
     analysis: Optional[str] = None
-    interactions: List[Dict[str, Any]] = []
-    dosage_recommendations: List[Dict[str, Any]] = []
-    alternatives: List[Dict[str, Any]] = []
+    interactions: List[DrugInteraction] = []
+    dosage_recommendations: List[DosageRecommendation] = []
+    alternatives: List[Alternative] = []
+    timings: Dict[str, Any] = {}  # Per-run timing summary from tracing
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+from .compaction import split_sections, strip_markdown_chrome
+from .firecrawl import DEFAULT_CACHE_TTL
+from .interactions import normalize_drug_name
+
+DEFAULT_INDEX_PATH = ".cache/monographs.sqlite"
+# Pages are read through a memory map rather than SQLite's page cache
+DEFAULT_MMAP_BYTES = 256 * 1024 * 1024
+
+# BM25 weights for the heading, body and drug columns; a matching heading
+# ("Drug interactions", "Dosage") says more than a passing mention, and the
+# drug column only narrows the match
+_BM25_WEIGHTS = (4.0, 1.0, 0.0)
+# Clinical terms that make a passage worth sending to analysis. Whole words
+# rather than prefixes: the porter tokenizer already folds inflections
+# (interactions, dosing), and prefix queries are several times slower
+QUERY_TERMS = [
+    "interaction", "contraindication", "contraindicated", "dosage", "dosing", "dose",
+    "warning", "precaution", "boxed warning", "side effect", "adverse", "monitor",
+    "renal", "hepatic", "pregnancy", "pediatric", "geriatric", "elderly", "indication", "maximum",
+]
+_RELEVANT_QUERY = " OR ".join(f'"{term}"' for term in QUERY_TERMS)
+# Pages scraped from the web expire; local files are refreshed by re-indexing instead
+_SCRAPED = "(source LIKE 'http://%' OR source LIKE 'https://%')"
+
+
+class Passage(NamedTuple):
+    heading: str
+    body: str
+    position: int
+
+
+class LocalMonograph(NamedTuple):
+    """Best passages for a drug from the local index, in page order"""
+    drug: str
+    source: str
+    content: str
+
+
+class MonographIndex:
+    """Full-text index of drug monographs, consulted before web search.
+
+    Monographs are split into heading-delimited passages and indexed with
+    SQLite FTS5, so the interaction and dosing passages for a drug come back
+    ranked by BM25 in a few milliseconds. The database file is memory-mapped
+    and updated in place: adding a page replaces only that page's passages,
+    and unchanged files are skipped when a directory is re-indexed. Pages
+    scraped from the web are served for ttl seconds after they were last
+    fetched, like the Firecrawl cache they came through. Safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        aliases: Optional[Dict[str, str]] = None,
+        mmap_bytes: int = DEFAULT_MMAP_BYTES,
+        ttl: Optional[float] = None,
+    ):
+        self.path = path
+        self.ttl = ttl
+        # Synonym/brand -> canonical generic, normalized like the interaction index
+        self.aliases = {
+            normalize_drug_name(alias): normalize_drug_name(canonical) for alias, canonical in (aliases or {}).items()
+        }
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS monographs (
+                id INTEGER PRIMARY KEY,
+                drug TEXT NOT NULL,
+                source TEXT NOT NULL UNIQUE,
+                digest TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                fetched_at REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(monographs)")}
+        if "fetched_at" not in columns:
+            # Indexes built before fetch times were kept
+            self._conn.execute("ALTER TABLE monographs ADD COLUMN fetched_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE monographs SET fetched_at = updated_at")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_monographs_drug ON monographs (drug)")
+        self._conn.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                heading, body, drug, monograph UNINDEXED, position UNINDEXED,
+                tokenize = 'porter unicode61'
+            )"""
+        )
+        self._conn.commit()
+        self.purge_expired()
+
+    def drug_key(self, name: str) -> str:
+        key = normalize_drug_name(name)
+        return self.aliases.get(key, key)
+
+    def add(self, drug: str, source: str, markdown: str) -> bool:
+        """Index (or re-index) one page for drug; False if it was already current"""
+        digest = hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+        key = self.drug_key(drug)
+        sections = split_sections(strip_markdown_chrome(markdown))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT id, drug, digest FROM monographs WHERE source = ?", (source,)).fetchone()
+            if row is not None and row[1] == key and row[2] == digest:
+                # Fetched again unchanged: fresh for another ttl
+                self._conn.execute("UPDATE monographs SET fetched_at = ? WHERE id = ?", (now, row[0]))
+                self._conn.commit()
+                return False
+            if row is not None:
+                self._conn.execute("DELETE FROM passages WHERE monograph = ?", (row[0],))
+                self._conn.execute("DELETE FROM monographs WHERE id = ?", (row[0],))
+            if not sections:
+                self._conn.commit()
+                return False
+            cursor = self._conn.execute(
+                "INSERT INTO monographs (drug, source, digest, updated_at, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, source, digest, now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO passages (heading, body, drug, monograph, position) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (heading.lstrip("#").strip(), "\n".join(body), key, cursor.lastrowid, position)
+                    for position, (heading, body) in enumerate(sections)
+                ],
+            )
+            self._conn.commit()
+        return True
+
+    def remove(self, source: str) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM monographs WHERE source = ?", (source,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM passages WHERE monograph = ?", (row[0],))
+                self._conn.execute("DELETE FROM monographs WHERE id = ?", (row[0],))
+                self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Drop scraped pages fetched more than ttl seconds ago, returning how many were removed"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            expired = [
+                row[0] for row in self._conn.execute(
+                    f"SELECT id FROM monographs WHERE {_SCRAPED} AND fetched_at < ?", (time.time() - self.ttl,)
+                )
+            ]
+            self._conn.executemany("DELETE FROM passages WHERE monograph = ?", [(id_,) for id_ in expired])
+            self._conn.executemany("DELETE FROM monographs WHERE id = ?", [(id_,) for id_ in expired])
+            self._conn.commit()
+        return len(expired)
+
+    def index_directory(self, directory: str) -> int:
+        """Index every .md file under directory (drug named by the file stem); returns pages updated"""
+        updated = 0
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if not filename.endswith((".md", ".markdown")):
+                    continue
+                path = os.path.join(root, filename)
+                with open(path, encoding="utf-8") as f:
+                    markdown = f.read()
+                drug = os.path.splitext(filename)[0].replace("_", " ")
+                updated += self.add(drug, f"file://{os.path.abspath(path)}", markdown)
+        return updated
+
+    def lookup(self, drug: str, max_passages: int = 8) -> Optional[LocalMonograph]:
+        """The drug's most relevant passages from its best-matching unexpired page.
+
+        None on a miss, including when no passage matches the clinical terms:
+        a page without interaction or dosing content is no substitute for research.
+        """
+        key = self.drug_key(drug)
+        cutoff = time.time() - self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            ranked = self._conn.execute(
+                f"""SELECT monograph, heading, body, position FROM passages
+                    WHERE passages MATCH ? AND drug = ? AND monograph IN (
+                        SELECT id FROM monographs WHERE drug = ? AND (NOT {_SCRAPED} OR fetched_at >= ?)
+                    )
+                    ORDER BY bm25(passages, {", ".join(map(str, _BM25_WEIGHTS))})
+                    LIMIT ?""",
+                (f'drug: "{key}" AND {{heading body}}: ({_RELEVANT_QUERY})', key, key, cutoff, max_passages * 4),
+            ).fetchall()
+            if not ranked:
+                self.misses += 1
+                return None
+            # Passages come from the page with the best-ranked passage only
+            monograph = ranked[0][0]
+            source = self._conn.execute("SELECT source FROM monographs WHERE id = ?", (monograph,)).fetchone()[0]
+            self.hits += 1
+        passages = [
+            Passage(heading, body, int(position))
+            for page, heading, body, position in ranked if page == monograph
+        ][:max_passages]
+        content = "\n".join(
+            (f"## {p.heading}\n{p.body}" if p.heading else p.body)
+            for p in sorted(passages, key=lambda p: p.position)
+        )
+        return LocalMonograph(drug=key, source=source, content=content)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM monographs").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "pages": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def default_monograph_index(aliases: Optional[Dict[str, str]] = None) -> Optional[MonographIndex]:
+    """Open the index at MONOGRAPH_INDEX_PATH, refreshed from MONOGRAPH_DIR if set (None if disabled)"""
+    path = os.getenv("MONOGRAPH_INDEX_PATH", DEFAULT_INDEX_PATH)
+    if not path:
+        return None
+    try:
+        # Scraped pages go stale on the same schedule as the Firecrawl cache
+        ttl = float(os.getenv("FIRECRAWL_CACHE_TTL", DEFAULT_CACHE_TTL))
+        index = MonographIndex(path, aliases=aliases, ttl=ttl)
+        directory = os.getenv("MONOGRAPH_DIR")
+        if directory and os.path.isdir(directory):
+            updated = index.index_directory(directory)
+            if updated:
+                print(f"📚 Indexed {updated} monograph pages from {directory}")
+        return index
+    except Exception as e:
+        print(f"Monograph index error: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # python -m src.monographs monographs/ [.cache/monographs.sqlite]
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m src.monographs <directory> [index.sqlite]")
+        sys.exit(1)
+    index = MonographIndex(sys.argv[2] if len(sys.argv) == 3 else DEFAULT_INDEX_PATH)
+    updated = index.index_directory(sys.argv[1])
+    print(f"Indexed {updated} changed pages; {len(index)} pages in {index.path}")
@@ -1,5 +1,9 @@
 # prompts.py
 
+import hashlib
+from typing import List, Tuple
+
+
 class DrugAnalysisPrompts:
     """Collection of prompts for analyzing drug interactions, dosages, and alternative medications"""
 
@@ -38,11 +42,21 @@ Focus on extracting information relevant to healthcare providers and pharmacists
 
 Pay special attention to drug interactions, contraindications, side effects, and dosage recommendations."""
 
+    @classmethod
+    def drug_interaction_version(cls) -> str:
+        """Fingerprint of the single and batched drug analysis prompts, used to key cached analyses"""
+        source = "\n".join([
+            cls.DRUG_INTERACTION_SYSTEM,
+            cls.drug_interaction_user("{drug_name}", "{content}"),
+            cls.drug_batch_analysis_user([("{drug_name}", "{content}")]),
+        ])
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
     @staticmethod
     def drug_interaction_user(drug_name: str, content: str) -> str:
         return f"""Drug: {drug_name}
 
-Medical Database Content: {content[:2500]}
+Medical Database Content: {content}
 
 Analyze this content from a clinical perspective and provide:
 
@@ -57,6 +71,26 @@ Analyze this content from a clinical perspective and provide:
 
 Focus on clinical safety, drug interactions, and patient-specific considerations."""
 
+    @staticmethod
+    def drug_batch_analysis_user(drugs: List[Tuple[str, str]]) -> str:
+        sections = "\n\n".join(
+            f"### Drug: {drug_name}\n\nMedical Database Content: {content}" for drug_name, content in drugs
+        )
+        return f"""{sections}
+
+Analyze each of the {len(drugs)} drugs above separately from a clinical perspective. Return one entry per drug with drug_name exactly as given above, and provide:
+
+- interaction_severity: One of "Major", "Moderate", "Minor", "None", or "Unknown"
+- contraindications: List of conditions or patient groups where this drug should be avoided
+- age_restrictions: Specific age groups with restrictions (pediatric, geriatric, etc.)
+- dosage_forms: Available forms (tablet, injection, liquid, etc.)
+- description: Brief 1-sentence description of the drug's primary therapeutic use
+- common_interactions: List of other drugs that commonly interact with this medication
+- therapeutic_class: Drug classification (e.g., ACE inhibitor, beta-blocker, antibiotic)
+- monitoring_required: Special monitoring or lab tests required during treatment
+
+Use only the content given for each drug. Focus on clinical safety, drug interactions, and patient-specific considerations."""
+
     # NLP drug information extraction prompts
     NLP_EXTRACTION_SYSTEM = """You are a medical NLP specialist extracting structured drug information from unstructured text.
 
@@ -77,16 +111,18 @@ Identify and structure:
 - duration: Length of treatment if mentioned
 - special_instructions: Any specific timing or food requirements
 
-Return in JSON format for each drug found:
-{
-  "drug_name": "Metformin",
-  "dosage_amount": "500",
-  "dosage_unit": "mg",
-  "frequency": "twice daily",
-  "route": "oral",
-  "duration": "ongoing",
-  "special_instructions": "take with meals"
-}"""
+Return a JSON array with one object per drug found:
+[
+  {{
+    "drug_name": "Metformin",
+    "dosage_amount": "500",
+    "dosage_unit": "mg",
+    "frequency": "twice daily",
+    "route": "oral",
+    "duration": "ongoing",
+    "special_instructions": "take with meals"
+  }}
+]"""
 
     # Age-specific dosage prompts
     AGE_DOSAGE_SYSTEM = """You are a clinical pharmacist specializing in age-appropriate drug dosing.
@@ -170,6 +206,16 @@ Provide evidence-based risk assessment with clinical recommendations."""
 
 Synthesize all drug analysis data into actionable clinical recommendations."""
 
+    @classmethod
+    def recommendations_version(cls) -> str:
+        """Fingerprint of every prompt behind a finished result, used to key cached results"""
+        source = "\n".join([
+            cls.drug_interaction_version(),
+            cls.RECOMMENDATIONS_SYSTEM,
+            cls.recommendations_user("{query}", "{drug_analysis_data}"),
+        ])
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
     @staticmethod
     def recommendations_user(query: str, drug_analysis_data: str) -> str:
         return f"""Clinical Query: {query}
@@ -0,0 +1,235 @@
+import json
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+from .cache import file_digest
+from .models import ExtractedDrugInfo
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "drug_lexicon.json")
+
+_DOSE = re.compile(r"(\d+(?:\.\d+)?)\s*(mg|mcg|µg|g|ml|units?|iu|tablets?|tabs?|capsules?|puffs?)\b", re.IGNORECASE)
+_FREQUENCY = re.compile(
+    r"\b(once daily|twice daily|three times daily|four times daily|once a day|twice a day|"
+    r"every \d+(?:-\d+)? hours?|every (?:morning|evening|night)|at bedtime|as needed|"
+    r"q\d+h|qd|qod|qhs|bid|tid|qid|prn|daily|weekly|nightly)\b",
+    re.IGNORECASE,
+)
+_ROUTE = re.compile(
+    r"\b(by mouth|orally|oral|po|intravenous(?:ly)?|iv|intramuscular(?:ly)?|im|subcutaneous(?:ly)?|"
+    r"sc|subq|sublingual(?:ly)?|sl|topical(?:ly)?|inhaled|inhalation|rectal(?:ly)?|pr)\b",
+    re.IGNORECASE,
+)
+_DURATION = re.compile(r"\b(?:for|x)\s*(\d+\s*(?:days?|weeks?|months?))\b", re.IGNORECASE)
+_INSTRUCTIONS = re.compile(
+    r"\b(with (?:meals|food|water)|after meals|before meals|on an empty stomach|"
+    r"before breakfast|at bedtime|do not crush)\b",
+    re.IGNORECASE,
+)
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]*")
+# Stems of generic names (anticoagulants, statins, ACE inhibitors, ...) that
+# mark an unrecognized word as probably a drug
+_DRUG_SUFFIX = re.compile(
+    r"(?:xaban|gatran|parin|statin|pril|sartan|olol|dipine|azole|prazole|tidine|cillin|mycin|cycline|floxacin|"
+    r"vir|mab|nib|gliptin|gliflozin|glutide|formin|triptan|oxetine|setron|afil|dronate|semide|thiazide|"
+    r"pam|lam|done|sone|olone|caine|tadine|profen|coxib|barbital|azepine|peridol|apine|idone)$"
+)
+# Words that are neither drugs nor signs of one, even when capitalized
+_COMMON_WORDS = set("""
+a an and or plus with without also then but of on in at by to for from per as is are was be been has have had
+the this that these those it its he she his her him they their them patient pt pts patients mr mrs ms dr
+take takes taking taken give given start started stop stopped continue continued increase decrease hold resume
+new current currently prescribed prescription prescriptions rx sig disp refill refills qty quantity
+medication medications meds drug drugs dose doses dosing tablet tablets tab tabs capsule capsules cap caps
+daily day days week weeks month months year years old yo age aged male female man woman child infant weight
+morning evening night bedtime meals meal food water breakfast lunch dinner empty stomach needed pain
+history allergy allergies allergic diagnosis dx hx notes note check verify please any interactions interaction
+what which how does do can should is safe together combined combination other others
+""".split())
+
+_ROUTE_NAMES = {
+    "by mouth": "oral", "orally": "oral", "po": "oral",
+    "iv": "IV", "intravenous": "IV", "intravenously": "IV",
+    "im": "IM", "intramuscular": "IM", "intramuscularly": "IM",
+    "sc": "subcutaneous", "subq": "subcutaneous", "subcutaneously": "subcutaneous",
+    "sl": "sublingual", "sublingually": "sublingual",
+    "topically": "topical", "inhalation": "inhaled", "pr": "rectal", "rectally": "rectal",
+}
+
+
+class Recognition(BaseModel):
+    drugs: List[ExtractedDrugInfo] = []
+    confidence: float = 0.0
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text finds every lexicon term"""
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for term in terms:
+            self._add(term)
+        self._build_failure_links()
+
+    def _add(self, term: str) -> None:
+        node = 0
+        for char in term:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(term)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                # Children of the root always fall back to the root
+                self._fail[child] = self._goto[fallback].get(char, 0) if node else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, term) matches, including overlapping ones"""
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for term in self._output[node]:
+                matches.append((position - len(term) + 1, position + 1, term))
+        return matches
+
+
+class DrugRecognizer:
+    """Dictionary-backed drug name recognizer with dose/frequency capture"""
+
+    def __init__(self, lexicon: Dict[str, List[str]]):
+        # Every generic name, brand name and synonym maps to its canonical generic
+        self.canonical: Dict[str, str] = {}
+        for generic, synonyms in lexicon.items():
+            self.canonical[generic.lower()] = generic.lower()
+            for synonym in synonyms:
+                self.canonical[synonym.lower()] = generic.lower()
+        self._matcher = AhoCorasick(self.canonical)
+        # Content hash of the lexicon file ("" if built in memory)
+        self.digest = ""
+
+    @classmethod
+    def from_file(cls, path: str) -> "DrugRecognizer":
+        with open(path, encoding="utf-8") as f:
+            recognizer = cls(json.load(f))
+        recognizer.digest = file_digest(path)
+        return recognizer
+
+    def aliases(self) -> Dict[str, str]:
+        """Synonym -> canonical generic mapping (for other name-keyed indexes)"""
+        return {alias: generic for alias, generic in self.canonical.items() if alias != generic}
+
+    def canonical_name(self, name: str) -> Optional[str]:
+        return self.canonical.get(" ".join(name.lower().split()))
+
+    def _find_drugs(self, text: str) -> List[Tuple[int, int, str]]:
+        lowered = text.lower()
+        candidates = []
+        for start, end, term in self._matcher.find(lowered):
+            before = lowered[start - 1] if start > 0 else " "
+            after = lowered[end] if end < len(lowered) else " "
+            if before.isalnum() or after.isalnum():
+                continue  # Part of a longer word
+            candidates.append((start, end, term))
+        # Prefer the longest match at each position, then drop overlaps
+        candidates.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        selected = []
+        last_end = -1
+        for start, end, term in candidates:
+            if start >= last_end:
+                selected.append((start, end, term))
+                last_end = end
+        return selected
+
+    def recognize(self, text: str) -> Recognition:
+        matches = self._find_drugs(text)
+        drugs: List[ExtractedDrugInfo] = []
+        seen = set()
+        doses_attached = 0
+
+        for index, (start, end, term) in enumerate(matches):
+            generic = self.canonical[term]
+            # Attributes are read from the text between this drug and the next one
+            segment_end = matches[index + 1][0] if index + 1 < len(matches) else len(text)
+            segment = text[end:segment_end]
+            dose = _DOSE.search(segment)
+            if dose:
+                doses_attached += 1
+            if generic in seen:
+                continue
+            seen.add(generic)
+            frequency = _FREQUENCY.search(segment)
+            route = _ROUTE.search(segment)
+            duration = _DURATION.search(segment)
+            instructions = _INSTRUCTIONS.search(segment)
+            drugs.append(ExtractedDrugInfo(
+                drug_name=generic.title(),
+                dosage_amount=dose.group(1) if dose else "",
+                dosage_unit=dose.group(2).lower() if dose else "",
+                frequency=frequency.group(1) if frequency else "",
+                route=_ROUTE_NAMES.get(route.group(1).lower(), route.group(1).lower()) if route else "",
+                duration=duration.group(1) if duration else "",
+                special_instructions=instructions.group(1) if instructions else "",
+            ))
+
+        # Doses that no recognized drug accounts for suggest an unknown drug
+        total_doses = len(_DOSE.findall(text))
+        if not drugs:
+            confidence = 0.0
+        elif total_doses == 0:
+            confidence = 1.0
+        else:
+            confidence = min(1.0, doses_attached / total_doses)
+        # So do leftover words that look like drug names ("warfarin 5 mg plus Eliquis")
+        unknown = self.unrecognized_drug_words(text, matches)
+        if drugs and unknown:
+            confidence = min(confidence, len(drugs) / (len(drugs) + len(unknown)))
+        return Recognition(drugs=drugs, confidence=confidence)
+
+    @staticmethod
+    def unrecognized_drug_words(text: str, matches: Optional[List[Tuple[int, int, str]]] = None) -> List[str]:
+        """Words outside recognized drugs and dosing phrases that look like drug names.
+
+        A word counts when it is capitalized or ends in a generic-name stem
+        and is not a common English or prescription word.
+        """
+        covered = [(start, end) for start, end, _ in matches or []]
+        for pattern in (_DOSE, _FREQUENCY, _ROUTE, _DURATION, _INSTRUCTIONS):
+            covered.extend(match.span() for match in pattern.finditer(text))
+        unknown = []
+        for match in _WORD.finditer(text):
+            start, end = match.span()
+            if any(start < covered_end and end > covered_start for covered_start, covered_end in covered):
+                continue
+            word = match.group()
+            lowered = word.lower().strip("'-")
+            if len(lowered) < 3 or lowered in _COMMON_WORDS:
+                continue
+            if word[0].isupper() or _DRUG_SUFFIX.search(lowered):
+                unknown.append(word)
+        return unknown
+
+
+def default_recognizer() -> DrugRecognizer:
+    """Recognizer over DRUG_LEXICON_PATH (bundled lexicon by default)"""
+    return DrugRecognizer.from_file(os.getenv("DRUG_LEXICON_PATH", DEFAULT_LEXICON_PATH))
@@ -0,0 +1,415 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple
+from .tracing import tracer
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Lanes in the order they are served
+PRIORITIES = [INTERACTIVE, BATCH]
+
+# Per-backend defaults; each can be overridden with <BACKEND>_RATE_LIMIT,
+# <BACKEND>_BURST, <BACKEND>_CONCURRENCY and <BACKEND>_MAX_RETRIES.
+# A rate of 0 means no request-rate limit, only the concurrency cap.
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "llm": {"rate_limit": 0, "burst": 5, "concurrency": 8, "max_retries": 4},
+    "firecrawl": {"rate_limit": 0, "burst": 10, "concurrency": 10, "max_retries": 3},
+}
+
+# How each backend's sync client takes a per-call timeout: the keyword and a
+# conversion from seconds. The LLM client takes seconds, Firecrawl milliseconds.
+# Async calls are bounded with asyncio.wait_for instead.
+CLIENT_TIMEOUTS: Dict[str, Tuple[str, Callable[[float], Any]]] = {
+    "llm": ("timeout", float),
+    "firecrawl": ("timeout", lambda seconds: max(1, int(seconds * 1000))),
+}
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+_RETRYABLE_MESSAGE = re.compile(
+    r"\b(?:429|502|503|504)\b|rate.?limit|too many requests|overloaded|temporarily unavailable",
+    re.IGNORECASE,
+)
+# (priority, absolute monotonic deadline or None) of the request being served
+_request: ContextVar[Tuple[str, Optional[float]]] = ContextVar("request", default=(INTERACTIVE, None))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an upstream call cannot finish before the request deadline"""
+
+
+@contextmanager
+def request_context(priority: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[None]:
+    """Run the enclosed work in a priority lane and with a deadline timeout seconds away.
+
+    Nested contexts inherit the outer lane and never extend an outer deadline.
+    """
+    outer_priority, deadline = _request.get()
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+    if timeout is not None:
+        own = time.monotonic() + timeout
+        deadline = own if deadline is None else min(deadline, own)
+    token = _request.set((priority or outer_priority, deadline))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def set_lane(priority: str) -> None:
+    """Put the current thread in a priority lane for good (pool initializers)"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}")
+    _request.set((priority, _request.get()[1]))
+
+
+def current_request() -> Tuple[str, Optional[float]]:
+    return _request.get()
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current request's deadline, or None without one"""
+    deadline = _request.get()[1]
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, overload and transient network errors; never bad requests"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    return bool(_RETRYABLE_MESSAGE.search(str(error)))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Request-rate limiter; tokens may go negative, which queues callers in order"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how long to wait before using it"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next seconds (after the backend pushed back)"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class BackendLimiter:
+    """Concurrency cap, request rate and retry policy for one upstream service.
+
+    Free slots go to interactive callers before batch callers; async callers
+    wait on a future per lane that a release hands the slot to. Rate-limit
+    tokens are taken before the slot, so throttled callers hold no slot. Retryable
+    failures back off exponentially with full jitter (or for the server's
+    Retry-After) and a rate-limit response slows every caller of the backend,
+    not just the one that hit it. Nothing waits or sleeps past the request
+    deadline; DeadlineExceeded is raised instead. The call itself is bounded
+    by the time left too: sync clients get it as their timeout (through
+    client_timeout) and async calls are cancelled when it runs out.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_limit: float = 0,
+        burst: float = 5,
+        concurrency: int = 8,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        client_timeout: Optional[Tuple[str, Callable[[float], Any]]] = None,
+    ):
+        self.name = name
+        self.client_timeout = client_timeout
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = {priority: 0 for priority in PRIORITIES}
+        # Async waiters by lane, each with the loop its future belongs to
+        self._async_waiters: Dict[str, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+
+    def _can_enter(self, priority: str) -> bool:
+        if self._active >= self.concurrency:
+            return False
+        ahead = PRIORITIES[:PRIORITIES.index(priority)]
+        return not any(self._waiting[lane] for lane in ahead)
+
+    def _deadline_exceeded(self, what: str) -> DeadlineExceeded:
+        tracer.inc("rxverify_backend_deadline_exceeded_total", backend=self.name)
+        return DeadlineExceeded(f"Request deadline reached {what} {self.name}")
+
+    def _acquire(self, priority: str, deadline: Optional[float]) -> None:
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if timeout is not None and timeout <= 0:
+                        raise self._deadline_exceeded("waiting for")
+                    if self._can_enter(priority):
+                        break
+                    self._cond.wait(timeout)
+                self._active += 1
+            finally:
+                self._waiting[priority] -= 1
+                # A lane emptying may let lower lanes in
+                self._dispatch()
+
+    async def _aacquire(self, priority: str, deadline: Optional[float]) -> None:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise self._deadline_exceeded("waiting for")
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._can_enter(priority):
+                self._active += 1
+                return
+            entry = (loop, loop.create_future())
+            self._async_waiters[priority].append(entry)
+            self._waiting[priority] += 1
+        future = entry[1]
+        try:
+            await asyncio.wait_for(future, None if deadline is None else deadline - time.monotonic())
+        except BaseException as e:
+            with self._cond:
+                if entry in self._async_waiters[priority]:
+                    self._async_waiters[priority].remove(entry)
+                    self._waiting[priority] -= 1
+                    self._dispatch()
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as this waiter gave up
+                self._release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._deadline_exceeded("waiting for") from None
+            raise
+
+    def _dispatch(self) -> None:
+        """Hand free slots to async waiters and wake sync ones, highest lane first (lock held)"""
+        for lane in PRIORITIES:
+            waiters = self._async_waiters[lane]
+            while waiters and self._active < self.concurrency:
+                loop, future = waiters.popleft()
+                self._waiting[lane] -= 1
+                self._active += 1
+                try:
+                    loop.call_soon_threadsafe(self._wake, future)
+                except RuntimeError:
+                    # The waiter's loop has closed
+                    self._active -= 1
+            if self._waiting[lane]:
+                # Lower lanes wait until this one is served
+                break
+        self._cond.notify_all()
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.done():
+            # The waiter gave up before the slot reached it
+            self._release()
+        else:
+            future.set_result(None)
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._dispatch()
+
+    def _token_delay(self, deadline: Optional[float]) -> float:
+        if self.bucket is None:
+            return 0.0
+        delay = self.bucket.reserve()
+        if deadline is not None and time.monotonic() + delay > deadline:
+            self.bucket.cancel()
+            raise self._deadline_exceeded("before a request slot at")
+        if delay:
+            tracer.inc("rxverify_backend_throttled_total", backend=self.name)
+        return delay
+
+    def _backoff(self, attempt: int, error: BaseException, deadline: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+        if deadline is not None and time.monotonic() + delay > deadline:
+            raise self._deadline_exceeded("before retrying") from error
+        if status_code(error) == 429 and self.bucket is not None:
+            self.bucket.pause(delay)
+        tracer.inc("rxverify_backend_retries_total", backend=self.name)
+        print(f"⏳ {self.name} call failed ({error}); retrying in {delay:.2f}s")
+        return delay
+
+    def _time_left(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise self._deadline_exceeded("before calling")
+        return left
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        priority, deadline = _request.get()
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self._token_delay(deadline))
+            self._acquire(priority, deadline)
+            try:
+                left = self._time_left(deadline)
+                if left is not None and self.client_timeout is not None:
+                    keyword, convert = self.client_timeout
+                    kwargs[keyword] = convert(left)
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e, deadline)
+            finally:
+                self._release()
+            # Slots are not held while backing off
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        priority, deadline = _request.get()
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self._token_delay(deadline))
+            await self._aacquire(priority, deadline)
+            try:
+                left = self._time_left(deadline)
+                try:
+                    return await asyncio.wait_for(fn(*args, **kwargs), left)
+                except asyncio.TimeoutError:
+                    if left is None or deadline - time.monotonic() > 0:
+                        raise  # The call's own timeout, not the deadline
+                    raise self._deadline_exceeded("during a call to") from None
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e, deadline)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot without retries, for calls that cannot be replayed (streams)"""
+        priority, deadline = _request.get()
+        time.sleep(self._token_delay(deadline))
+        self._acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        priority, deadline = _request.get()
+        await asyncio.sleep(self._token_delay(deadline))
+        await self._aacquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"active": self._active, **{f"waiting_{lane}": count for lane, count in self._waiting.items()}}
+
+
+class Scheduler:
+    """Shared limiters for every upstream backend, configured from the environment"""
+
+    def __init__(self):
+        self._backends: Dict[str, BackendLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str, **settings: Any) -> BackendLimiter:
+        """Replace the limiter for name (settings as for BackendLimiter)"""
+        limiter = BackendLimiter(name, **settings)
+        with self._lock:
+            self._backends[name] = limiter
+        return limiter
+
+    def backend(self, name: str) -> BackendLimiter:
+        with self._lock:
+            limiter = self._backends.get(name)
+            if limiter is None:
+                defaults = DEFAULT_LIMITS.get(name, DEFAULT_LIMITS["llm"])
+                prefix = name.upper()
+                limiter = self._backends[name] = BackendLimiter(
+                    name,
+                    rate_limit=float(os.getenv(f"{prefix}_RATE_LIMIT", defaults["rate_limit"])),
+                    burst=float(os.getenv(f"{prefix}_BURST", defaults["burst"])),
+                    concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", defaults["concurrency"])),
+                    max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", defaults["max_retries"])),
+                    client_timeout=CLIENT_TIMEOUTS.get(name),
+                )
+            return limiter
+
+    def call(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return self.backend(name).call(fn, *args, **kwargs)
+
+    async def acall(self, name: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        return await self.backend(name).acall(fn, *args, **kwargs)
+
+    def slot(self, name: str):
+        return self.backend(name).slot()
+
+    def aslot(self, name: str):
+        return self.backend(name).aslot()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            backends = dict(self._backends)
+        return {name: limiter.stats() for name, limiter in backends.items()}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,221 @@
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from .models import ResearchState
+from .scheduler import INTERACTIVE
+from .tracing import tracer
+from .workflow import Workflow
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ServerBusy(Exception):
+    """Raised when a request is not admitted because the pool is saturated"""
+
+
+class WorkflowPool:
+    """Warm Workflow objects shared by all requests, with admission control.
+
+    Every Workflow reuses the first one's LLM client, Firecrawl client,
+    caches and local indexes, so connection pools and compiled data are
+    built once. At most size requests run at a time and at most max_queue
+    more wait for a free Workflow; anything beyond that is rejected at once.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        max_queue: int = 16,
+        queue_timeout: float = 30.0,
+        factory: Optional[Callable[..., Workflow]] = None,
+    ):
+        factory = factory or Workflow
+        # Clients and graphs are built now rather than on the first request
+        first = factory().warm()
+        shared = {
+            "llm": first.llm,
+            "firecrawl": first.firecrawl,
+            "analysis_cache": first.analysis_cache,
+            "result_cache": first.result_cache,
+            "dose_checker": first.dose_checker,
+            "interaction_index": first.interaction_index,
+            "monograph_index": first.monograph_index,
+            "recognizer": first.recognizer,
+            "medical_text_classifier": first.medical_text_classifier,
+        }
+        self.size = max(1, size)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._idle: "queue.Queue[Workflow]" = queue.Queue()
+        self._idle.put(first)
+        for _ in range(self.size - 1):
+            self._idle.put(factory(**shared).warm())
+        self._admitted = threading.BoundedSemaphore(self.size + self.max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+
+    @contextmanager
+    def lease(self) -> Iterator[Workflow]:
+        if not self._admitted.acquire(blocking=False):
+            tracer.inc("rxverify_server_rejected_total", reason="queue_full")
+            raise ServerBusy("Too many requests queued")
+        try:
+            with self._lock:
+                self.waiting += 1
+            try:
+                workflow = self._idle.get(timeout=self.queue_timeout)
+            except queue.Empty:
+                tracer.inc("rxverify_server_rejected_total", reason="queue_timeout")
+                raise ServerBusy("Timed out waiting for a free worker")
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            with self._lock:
+                self.in_flight += 1
+            try:
+                yield workflow
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                self._idle.put(workflow)
+        finally:
+            self._admitted.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.size,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_queue": self.max_queue,
+            }
+
+
+def _gauges(stats: Dict[str, int]) -> str:
+    lines = []
+    for name, value in stats.items():
+        lines.append(f"# TYPE rxverify_server_{name} gauge")
+        lines.append(f"rxverify_server_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class VerificationHandler(BaseHTTPRequestHandler):
+    """POST /verify, GET /healthz and GET /metrics"""
+
+    server_version = "RxVerify/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: str, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, json.dumps(payload), headers=headers)
+
+    def do_GET(self):
+        pool: WorkflowPool = self.server.pool
+        if self.path == "/healthz":
+            self._send_json(200, {"status": "ok", **pool.stats()})
+        elif self.path == "/metrics":
+            self._send(200, tracer.prometheus() + _gauges(pool.stats()), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/verify":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        request, error = self._read_request()
+        if error:
+            self._send_json(*error)
+            return
+
+        pool: WorkflowPool = self.server.pool
+        tracer.inc("rxverify_server_requests_total")
+        # Upstream calls stop once the request's deadline has passed
+        timeout = request.get("timeout") or self.server.request_timeout
+        try:
+            with pool.lease() as workflow:
+                if request.get("previous"):
+                    result = workflow.reverify(
+                        ResearchState(**request["previous"]), request.get("add"), request.get("remove"),
+                        timeout=timeout, priority=INTERACTIVE,
+                    )
+                else:
+                    result = workflow.run(request["query"], timeout=timeout, priority=INTERACTIVE)
+        except ServerBusy as e:
+            self._send_json(503, {"error": str(e)}, headers={"Retry-After": str(self.server.retry_after)})
+            return
+        except Exception as e:
+            print(f"Verification error: {e}")
+            tracer.inc("rxverify_server_errors_total")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result.model_dump(mode="json"))
+
+    def _read_request(self) -> Tuple[Dict[str, Any], Optional[Tuple[int, Dict[str, str]]]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            return {}, (413, {"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}, (400, {"error": "Request body is not valid JSON"})
+        if not isinstance(request, dict):
+            return {}, (400, {"error": "Request body must be a JSON object"})
+        if not request.get("previous") and not str(request.get("query") or "").strip():
+            return {}, (400, {"error": "Missing 'query'"})
+        timeout = request.get("timeout")
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+            return {}, (400, {"error": "'timeout' must be a positive number of seconds"})
+        return request, None
+
+
+class VerificationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        pool: WorkflowPool,
+        retry_after: int = 2,
+        request_timeout: Optional[float] = None,
+    ):
+        super().__init__(address, VerificationHandler)
+        self.pool = pool
+        self.retry_after = retry_after
+        # Default per-request deadline in seconds (None = no deadline)
+        self.request_timeout = request_timeout
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, workers: Optional[int] = None) -> None:
+    """Run the verification service until interrupted"""
+    pool = WorkflowPool(
+        size=workers or int(os.getenv("SERVER_WORKERS", "4")),
+        max_queue=int(os.getenv("SERVER_MAX_QUEUE", "16")),
+        queue_timeout=float(os.getenv("SERVER_QUEUE_TIMEOUT", "30")),
+    )
+    server = VerificationServer(
+        (host, port),
+        pool,
+        retry_after=int(os.getenv("SERVER_RETRY_AFTER", "2")),
+        request_timeout=float(os.getenv("SERVER_REQUEST_TIMEOUT", "0")) or None,
+    )
+    print(f"🩺 Verification service listening on http://{host}:{port} ({pool.size} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .scheduler import PRIORITIES, DeadlineExceeded, current_request
+from .tracing import tracer
+
+# Result of a flight whose leader gave up; followers run the call again themselves
+_ABANDONED = object()
+
+
+def _leader_only(error: BaseException) -> bool:
+    """Failures that belong to the leader's request rather than to the shared call"""
+    return isinstance(error, (DeadlineExceeded, asyncio.CancelledError))
+
+
+def _flight_key(key: str) -> Tuple[str, str]:
+    # Calls are only shared within a priority lane, so an interactive caller
+    # never waits on work scheduled in the batch lane
+    return current_request()[0], key
+
+
+class Flight:
+    """One in-flight call; followers block on it until the leader finishes"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key (the leader) runs it; callers arriving while
+    it is in flight wait and share its result or exception. If the leader
+    gives up for reasons of its own (its deadline passed, it was cancelled),
+    followers run the call again under their own budget instead. Nothing is
+    kept after the call finishes, so this complements rather than replaces
+    caching.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Tuple[str, str], Flight] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """The flight for key and whether the caller leads it (and must finish() it)"""
+        flight_key = _flight_key(key)
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            if flight is not None:
+                tracer.inc("rxverify_singleflight_coalesced_total", group=self.name)
+                return flight, False
+            flight = self._flights[flight_key] = Flight()
+            return flight, True
+
+    def finish(self, key: str, flight: Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            for lane in PRIORITIES:
+                if self._flights.get((lane, key)) is flight:
+                    del self._flights[(lane, key)]
+        if error is not None and _leader_only(error):
+            result, error = _ABANDONED, None
+        flight.result, flight.error = result, error
+        flight.done.set()
+
+    def wait(self, key: str, flight: Flight, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Follow flight to its result, running fn again if the leader gave up"""
+        result = flight.wait()
+        if result is _ABANDONED:
+            tracer.inc("rxverify_singleflight_retried_total", group=self.name)
+            return self.do(key, fn, *args, **kwargs)
+        return result
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        flight, leader = self.join(key)
+        if not leader:
+            return self.wait(key, flight, fn, *args, **kwargs)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines; flights are tracked per event loop"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _loop_flights(self) -> Dict[Tuple[str, str], asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            flights = self._flights[loop] = {}
+        return flights
+
+    def join(self, key: str) -> Tuple[asyncio.Future, bool]:
+        flights = self._loop_flights()
+        flight_key = _flight_key(key)
+        future = flights.get(flight_key)
+        if future is not None:
+            tracer.inc("rxverify_singleflight_coalesced_total", group=self.name)
+            return future, False
+        future = flights[flight_key] = asyncio.get_running_loop().create_future()
+        return future, True
+
+    def finish(self, key: str, future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        flights = self._loop_flights()
+        for lane in PRIORITIES:
+            if flights.get((lane, key)) is future:
+                del flights[(lane, key)]
+        if future.done():
+            return
+        if error is not None and _leader_only(error):
+            # A cancelled leader must not cancel its followers
+            future.set_result(_ABANDONED)
+        elif error is not None:
+            future.set_exception(error)
+            # Mark the exception retrieved even if nobody was waiting
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def wait(self, key: str, future: asyncio.Future, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """Follow future to its result, running fn again if the leader gave up"""
+        # A cancelled follower must not cancel the shared call
+        result = await asyncio.shield(future)
+        if result is _ABANDONED:
+            tracer.inc("rxverify_singleflight_retried_total", group=self.name)
+            return await self.do(key, fn, *args, **kwargs)
+        return result
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        future, leader = self.join(key)
+        if not leader:
+            return await self.wait(key, future, fn, *args, **kwargs)
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result=result)
+        return result
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_current_run: ContextVar[Optional["RunTrace"]] = ContextVar("current_run", default=None)
+
+
+def current_run() -> Optional["RunTrace"]:
+    return _current_run.get()
+
+
+class RunTrace:
+    """Per-stage timings, LLM usage and Firecrawl traffic for one workflow run"""
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}
+        self.llm = {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0}
+        self.firecrawl = {"calls": 0, "seconds": 0.0, "bytes": 0, "cache_hits": 0}
+        # Path taken at each conditional edge, e.g. {"recommendations": "template"}
+        self.routes: Dict[str, str] = {}
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def record_llm(self, seconds: float, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.llm["calls"] += 1
+            self.llm["seconds"] += seconds
+            self.llm["input_tokens"] += input_tokens
+            self.llm["output_tokens"] += output_tokens
+
+    def record_firecrawl(self, seconds: float, size: int, cache_hit: bool) -> None:
+        with self._lock:
+            self.firecrawl["calls"] += 1
+            self.firecrawl["seconds"] += seconds
+            self.firecrawl["bytes"] += size
+            self.firecrawl["cache_hits"] += int(cache_hit)
+
+    def record_route(self, decision: str, route: str) -> None:
+        with self._lock:
+            self.routes[decision] = route
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "total_seconds": round(self.total_seconds, 4),
+                "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+                "llm": {**self.llm, "seconds": round(self.llm["seconds"], 4)},
+                "firecrawl": {**self.firecrawl, "seconds": round(self.firecrawl["seconds"], 4)},
+                "routes": dict(self.routes),
+            }
+
+
+class Tracer:
+    """Process-wide counters with JSON-lines and Prometheus text export"""
+
+    def __init__(self, export_path: Optional[str] = None):
+        self.export_path = export_path
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def start_run(self) -> Tuple[RunTrace, Any]:
+        trace = RunTrace()
+        return trace, _current_run.set(trace)
+
+    def end_run(self, trace: RunTrace, token: Any) -> Dict[str, Any]:
+        trace.total_seconds = time.time() - trace.started_at
+        _current_run.reset(token)
+        self.inc("rxverify_runs_total")
+        self.inc("rxverify_run_seconds_total", trace.total_seconds)
+        summary = trace.summary()
+        if self.export_path:
+            # Only timings and counters are exported, never the prescription text
+            with self._lock, open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": trace.started_at, **summary}) + "\n")
+        return summary
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.inc("rxverify_stage_calls_total", stage=stage)
+        self.inc("rxverify_stage_seconds_total", seconds, stage=stage)
+        trace = current_run()
+        if trace is not None:
+            trace.record_stage(stage, seconds)
+
+    def record_llm(self, seconds: float, input_tokens: int, output_tokens: int) -> None:
+        self.inc("rxverify_llm_calls_total")
+        self.inc("rxverify_llm_seconds_total", seconds)
+        self.inc("rxverify_llm_tokens_total", input_tokens, type="input")
+        self.inc("rxverify_llm_tokens_total", output_tokens, type="output")
+        trace = current_run()
+        if trace is not None:
+            trace.record_llm(seconds, input_tokens, output_tokens)
+
+    def record_firecrawl(self, operation: str, seconds: float, size: int, cache_hit: bool) -> None:
+        self.inc("rxverify_firecrawl_calls_total", operation=operation, cache="hit" if cache_hit else "miss")
+        self.inc("rxverify_firecrawl_seconds_total", seconds, operation=operation)
+        self.inc("rxverify_firecrawl_bytes_total", size, operation=operation)
+        trace = current_run()
+        if trace is not None:
+            trace.record_firecrawl(seconds, size, cache_hit)
+
+    def node(self, stage: str, fn: Callable) -> Callable:
+        """Wrap a graph node so its wall time is recorded under stage"""
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.record_stage(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record_stage(stage, time.perf_counter() - start)
+        return wrapper
+
+    def record_route(self, decision: str, route: str) -> None:
+        self.inc("rxverify_routes_total", decision=decision, route=route)
+        trace = current_run()
+        if trace is not None:
+            trace.record_route(decision, route)
+
+    def prometheus(self) -> str:
+        """Counters in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=None)
+def _llm_tracing_callback_class() -> type:
+    # LangChain is only imported once a real LLM client is built
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LLMTracingCallback(BaseCallbackHandler):
+        """LangChain callback that reports latency and token usage of every LLM call"""
+
+        run_inline = True
+
+        def __init__(self, tracer: Tracer):
+            self.tracer = tracer
+            self._starts: Dict[Any, float] = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+            self._starts[run_id] = time.perf_counter()
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+            self._starts[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+            start = self._starts.pop(run_id, None)
+            seconds = time.perf_counter() - start if start is not None else 0.0
+            input_tokens, output_tokens = _token_usage(response)
+            self.tracer.record_llm(seconds, input_tokens, output_tokens)
+
+        def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+            self._starts.pop(run_id, None)
+            self.tracer.inc("rxverify_llm_errors_total")
+
+    return LLMTracingCallback
+
+
+def __getattr__(name: str) -> Any:
+    if name == "LLMTracingCallback":
+        return _llm_tracing_callback_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            input_tokens += metadata.get("input_tokens", 0)
+            output_tokens += metadata.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+# Shared by every Workflow and Firecrawl client in the process
+tracer = Tracer(export_path=os.getenv("TRACE_PATH") or None)
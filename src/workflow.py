@@ -1,164 +1,732 @@
-from typing import Dict, Any, List
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from .models import ResearchState, DrugInfo, DrugAnalysis, ExtractedDrugInfo
-from .firecrawl import FirecrawlService
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Callable, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+import asyncio
+import threading
+from .models import (
+    ResearchState, DrugInfo, DrugAnalysis, DrugAnalysisBatch, ExtractedDrugInfo, ExtractedDrugList,
+    DrugInteraction, DosageRecommendation, Alternative, FLAGGED_DOSE_STATUSES,
+)
+from .firecrawl import FirecrawlService, AsyncFirecrawlService
 from .prompts import DrugAnalysisPrompts
+from .cache import SQLiteCache
+from .interactions import InteractionIndex, default_interaction_index
+from .monographs import LocalMonograph, MonographIndex, default_monograph_index
+from .recognizer import DrugRecognizer, default_recognizer
+from .classifier import MedicalTextClassifier, default_classifier
+from .tracing import tracer
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .scheduler import request_context, scheduler
+from .extraction import parse_drug_details, raw_output_text
+from .compaction import compact_content, compact_recommendation_data, content_token_budget, recommendation_token_budget
+import hashlib
 import os
-import json
 import re
 
+if TYPE_CHECKING:
+    from .dosing import DoseCheck, DoseChecker, DoseOrder
+
+MODEL_ID = "deepseek/deepseek-chat-v3-0324:free"
+# Characters of each search result page fed to drug-name extraction
+SEARCH_CONTENT_CHARS = 1500
+
+# Concurrent runs analyzing the same drug content share one LLM call; keys
+# include the model and prompt version, so the groups are process-wide
+ANALYSIS_FLIGHTS = SingleFlight("drug_analysis")
+ASYNC_ANALYSIS_FLIGHTS = AsyncSingleFlight("drug_analysis")
+
+# Set by stream()/astream() so the recommendation step streams its tokens
+_stream_tokens: ContextVar[bool] = ContextVar("stream_tokens", default=False)
+
+# Results whose every severity is one of these get templated recommendations
+LOW_RISK_SEVERITIES = {"Minor", "None"}
+# Drugs researched per query
+MAX_RESEARCHED_DRUGS = 5
+RECOMMENDATION_ERROR = "Unable to generate recommendations due to processing error."
+# Description of a DrugAnalysis that came from the failure path
+ANALYSIS_FAILED = "Analysis failed"
+# Fields of a finished result reused for a repeat prescription; the query and
+# extraction always come from the current request
+CACHED_RESULT_FIELDS = ["drug_info", "search_results", "analysis", "interactions", "dosage_recommendations", "alternatives"]
+
+
+class _AnalysisPlan(NamedTuple):
+    """Drugs of one _analyze_drugs call: cached, led (analyzed here) or followed (another run's flight)"""
+    compacted: List[Tuple[str, str]]
+    analyses: List[Optional[DrugAnalysis]]
+    keys: Dict[int, str]
+    flights: Dict[int, Tuple[Any, bool]]
+    batches: List[List[int]]
+
+    @property
+    def led(self) -> List[int]:
+        return [i for batch in self.batches for i in batch]
+
+    @property
+    def followed(self) -> List[int]:
+        return [i for i, (_, leader) in self.flights.items() if not leader]
+
+
+def _env_flag(name: str, default: str = "1") -> bool:
+    return os.getenv(name, default).lower() in {"1", "true", "yes"}
+
+
+def emit_event(event: Dict[str, Any]) -> None:
+    """Send an event to stream()/astream() consumers; a no-op in any other run"""
+    from langgraph.config import get_stream_writer
+
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return  # Called outside a graph run (e.g. batch research)
+    writer(event)
+
+
+def default_analysis_cache() -> Optional[SQLiteCache]:
+    """Build the DrugAnalysis memo store from environment settings (None if disabled)"""
+    path = os.getenv("ANALYSIS_CACHE_PATH", ".cache/analysis.sqlite")
+    if not path:
+        return None
+    return SQLiteCache(
+        path,
+        namespace="drug_analysis",
+        ttl=float(os.getenv("ANALYSIS_CACHE_TTL", 30 * 24 * 3600)),
+        max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "20000")),
+    )
+
+
+def default_result_cache() -> Optional[SQLiteCache]:
+    """Build the whole-prescription result store from environment settings (None if disabled)"""
+    path = os.getenv("RESULT_CACHE_PATH", ".cache/results.sqlite")
+    if not path:
+        return None
+    return SQLiteCache(
+        path,
+        namespace="prescription_results",
+        ttl=float(os.getenv("RESULT_CACHE_TTL", 7 * 24 * 3600)),
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000")),
+    )
+
+
 class Workflow:
-    def __init__(self):
-        self.firecrawl = FirecrawlService()
+    def __init__(
+        self,
+        research_concurrency: Optional[int] = None,
+        analysis_cache: Optional[SQLiteCache] = None,
+        result_cache: Optional[SQLiteCache] = None,
+        interaction_index: Optional[InteractionIndex] = None,
+        recognizer: Optional[DrugRecognizer] = None,
+        medical_text_classifier: Optional[MedicalTextClassifier] = None,
+        llm: Optional[Any] = None,
+        firecrawl: Optional[FirecrawlService] = None,
+        async_firecrawl: Optional[AsyncFirecrawlService] = None,
+        content_tokens: Optional[int] = None,
+        recommendation_tokens: Optional[int] = None,
+        analysis_batch_size: Optional[int] = None,
+        monograph_index: Optional[MonographIndex] = None,
+        dose_checker: Optional["DoseChecker"] = None,
+        local_research: Optional[bool] = None,
+        template_low_risk: Optional[bool] = None,
+        structured_extraction: Optional[bool] = None,
+    ):
+        # Number of drugs researched in parallel (1 = sequential)
+        if research_concurrency is None:
+            research_concurrency = int(os.getenv("RESEARCH_CONCURRENCY", "5"))
+        self.research_concurrency = max(1, research_concurrency)
+        # Drugs analyzed per structured-output LLM call (1 = one call per drug)
+        if analysis_batch_size is None:
+            analysis_batch_size = int(os.getenv("ANALYSIS_BATCH_SIZE", "5"))
+        self.analysis_batch_size = max(1, analysis_batch_size)
+        # LLM and Firecrawl backends can be injected (e.g. fakes for offline benchmarks);
+        # otherwise they, and the compiled graph, are built on first use so that
+        # runs served from caches and local indexes never import their SDKs
+        self._firecrawl = firecrawl
+        self._llm = llm
+        self.model_id = getattr(llm, "model_name", None) or MODEL_ID
+        self._analysis_llm = None
+        self._batch_analysis_llm = None
+        self._extraction_llm = None
+        self._workflow = None
+        self._lazy_lock = threading.RLock()
+        self.prompts = DrugAnalysisPrompts()
+        # Token budgets for scraped page content and the recommendations payload
+        self.content_tokens = content_tokens if content_tokens is not None else content_token_budget()
+        self.recommendation_tokens = recommendation_tokens if recommendation_tokens is not None else recommendation_token_budget()
+        # Cache keys include the prompt and model version, so entries written by an
+        # older version (or another deployment sharing the file) are never read;
+        # they age out through TTL and LRU eviction, or purge_caches() drops them
+        self.analysis_cache = analysis_cache if analysis_cache is not None else default_analysis_cache()
+        # Finished results keyed by prescription fingerprint, so refills skip every later stage
+        self.result_cache = result_cache if result_cache is not None else default_result_cache()
+        self.medical_text_classifier = medical_text_classifier or default_classifier()
+        self.recognizer = recognizer if recognizer is not None else default_recognizer()
+        # Minimum recognizer confidence for skipping LLM extraction entirely
+        self.recognizer_min_confidence = float(os.getenv("RECOGNIZER_MIN_CONFIDENCE", "1.0"))
+        # Extraction uses structured output unless the model lacks tool calling
+        self.structured_extraction = (
+            structured_extraction if structured_extraction is not None else _env_flag("STRUCTURED_EXTRACTION")
+        )
+        if interaction_index is None:
+            # Brand names and synonyms resolve to the same canonical ids as generics
+            interaction_index = default_interaction_index(aliases=self.recognizer.aliases())
+        self.interaction_index = interaction_index
+        # Local monographs answer research before any web search
+        if monograph_index is None:
+            monograph_index = default_monograph_index(aliases=self.recognizer.aliases())
+        self.monograph_index = monograph_index
+        # Dose limits are loaded (with NumPy) on the first dose check
+        self._dose_checker = dose_checker
+        # Routing: drugs with a local monograph and a cached analysis skip the
+        # research stage, and low-risk results skip the recommendation LLM
+        self.local_research = local_research if local_research is not None else _env_flag("ROUTE_LOCAL_RESEARCH")
+        self.template_low_risk = (
+            template_low_risk if template_low_risk is not None else _env_flag("ROUTE_TEMPLATE_RECOMMENDATIONS")
+        )
+        # Async client and graph are only built on the first arun()
+        self._async_firecrawl = async_firecrawl
+        self._async_workflow = None
+
+    def purge_caches(self) -> Dict[str, int]:
+        """Drop expired cache entries and those written by other versions (maintenance only)"""
+        removed = {}
+        for name, cache, version in (
+            ("analysis", self.analysis_cache, self._analysis_version),
+            ("result", self.result_cache, self._result_version),
+        ):
+            if cache is not None:
+                removed[name] = cache.purge_expired() + cache.purge_tag(version())
+        return removed
+
+    def _lazy(self, attribute: str, build: Callable[[], Any]) -> Any:
+        """Build a client or graph once, on first use, even under concurrent access"""
+        value = getattr(self, attribute)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, attribute)
+                if value is None:
+                    value = build()
+                    setattr(self, attribute, value)
+        return value
+
+    @property
+    def llm(self) -> Any:
+        return self._lazy("_llm", self._build_llm)
+
+    def _build_llm(self) -> Any:
+        from langchain_openai import ChatOpenAI
+        from .tracing import LLMTracingCallback
+
         # Use OpenRouter-compatible ChatOpenAI config
-        self.llm = ChatOpenAI(
-            model="deepseek/deepseek-chat-v3-0324:free",
+        return ChatOpenAI(
+            model=self.model_id,
             temperature=0.1,
             api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1"
+            base_url="https://openrouter.ai/api/v1",
+            # Token usage is reported for streamed completions too
+            stream_usage=True,
+            # Retries and backoff are left to the shared scheduler
+            max_retries=0,
+            callbacks=[LLMTracingCallback(tracer)]
         )
-        self.prompts = DrugAnalysisPrompts()
-        self.workflow = self._build_workflow()
+
+    @property
+    def analysis_llm(self) -> Any:
+        # Structured-output wrappers are built once and shared by every call
+        return self._lazy("_analysis_llm", lambda: self.llm.with_structured_output(DrugAnalysis))
+
+    @property
+    def batch_analysis_llm(self) -> Any:
+        return self._lazy("_batch_analysis_llm", lambda: self.llm.with_structured_output(DrugAnalysisBatch))
+
+    @property
+    def nlp_extraction_llm(self) -> Any:
+        """Structured extraction returning the raw message too, so malformed output can be recovered"""
+        if not self.structured_extraction:
+            return self.llm
+        return self._lazy(
+            "_extraction_llm", lambda: self.llm.with_structured_output(ExtractedDrugList, include_raw=True)
+        )
+
+    @property
+    def firecrawl(self) -> FirecrawlService:
+        return self._lazy("_firecrawl", FirecrawlService)
+
+    @property
+    def workflow(self) -> Any:
+        return self._lazy("_workflow", self._build_workflow)
+
+    @property
+    def dose_checker(self) -> "DoseChecker":
+        def build():
+            from .dosing import default_dose_checker
+
+            return default_dose_checker(aliases=self.recognizer.aliases())
+
+        return self._lazy("_dose_checker", build)
+
+    def warm(self) -> "Workflow":
+        """Build every lazily created client and graph up front (long-running services)"""
+        for attribute in ("llm", "analysis_llm", "batch_analysis_llm", "nlp_extraction_llm", "firecrawl", "workflow", "dose_checker"):
+            getattr(self, attribute)
+        return self
+
+    @staticmethod
+    def _chat_messages(system: str, user: str) -> List[Any]:
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        return [SystemMessage(content=system), HumanMessage(content=user)]
+
+    @staticmethod
+    def _invoke(runnable: Any, messages: List[Any]) -> Any:
+        """Call an LLM under the shared rate limits, retry policy and request deadline"""
+        return scheduler.call("llm", runnable.invoke, messages)
+
+    @staticmethod
+    async def _ainvoke(runnable: Any, messages: List[Any]) -> Any:
+        return await scheduler.acall("llm", runnable.ainvoke, messages)
 
     def _build_workflow(self):
+        from langgraph.graph import StateGraph
+
         graph = StateGraph(ResearchState)
-        graph.add_node("extract_drugs", self._extract_drugs_step)
-        graph.add_node("research_drugs", self._research_drugs_step)
-        graph.add_node("analyze_interactions", self._analyze_interactions_step)
-        graph.add_node("generate_recommendations", self._generate_recommendations_step)
+        graph.add_node("extract_drugs", tracer.node("extract_drugs", self._extract_drugs_step))
+        graph.add_node("resolve_local", tracer.node("resolve_local", self._resolve_local_step))
+        graph.add_node("research_drugs", tracer.node("research_drugs", self._research_drugs_step))
+        graph.add_node("analyze_interactions", tracer.node("analyze_interactions", self._analyze_interactions_step))
+        graph.add_node("generate_recommendations", tracer.node("generate_recommendations", self._generate_recommendations_step))
+        graph.add_node("template_recommendations", tracer.node("template_recommendations", self._template_recommendations_step))
+        self._add_routes(graph)
         
+        return graph.compile()
+
+    def _add_routes(self, graph: Any) -> None:
+        """Nodes and edges shared by the sync and async graphs; stages that add nothing are skipped"""
+        from langgraph.graph import END
+
+        graph.add_node("lookup_result", tracer.node("lookup_result", self._lookup_result_step))
+        graph.add_node("store_result", tracer.node("store_result", self._store_result_step))
         graph.set_entry_point("extract_drugs")
-        graph.add_edge("extract_drugs", "research_drugs")
+        graph.add_edge("extract_drugs", "lookup_result")
+        graph.add_conditional_edges(
+            "lookup_result",
+            # A repeat prescription already has its analysis
+            lambda state: END if state.analysis is not None else self._route_after_extraction(state),
+            [END, "resolve_local", "research_drugs", "analyze_interactions"],
+        )
+        graph.add_conditional_edges("resolve_local", self._route_after_local, ["research_drugs", "analyze_interactions"])
         graph.add_edge("research_drugs", "analyze_interactions")
-        graph.add_edge("analyze_interactions", "generate_recommendations")
-        graph.add_edge("generate_recommendations", END)
-        
-        return graph.compile()
+        graph.add_conditional_edges(
+            "analyze_interactions", self._route_recommendations, ["generate_recommendations", "template_recommendations"]
+        )
+        graph.add_edge("generate_recommendations", "store_result")
+        graph.add_edge("template_recommendations", "store_result")
+        graph.add_edge("store_result", END)
+
+    def _route_after_extraction(self, state: ResearchState) -> str:
+        if not state.extracted_drugs:
+            tracer.record_route("research", "none")
+            return "analyze_interactions"
+        if self.local_research and self.monograph_index is not None and self.analysis_cache is not None:
+            return "resolve_local"
+        tracer.record_route("research", "web")
+        return "research_drugs"
+
+    def _route_after_local(self, state: ResearchState) -> str:
+        if self._unresearched(state):
+            tracer.record_route("research", "web")
+            return "research_drugs"
+        tracer.record_route("research", "local")
+        return "analyze_interactions"
+
+    def _route_recommendations(self, state: ResearchState) -> str:
+        if self.template_low_risk and self._is_low_risk(state):
+            tracer.record_route("recommendations", "template")
+            return "template_recommendations"
+        tracer.record_route("recommendations", "llm")
+        return "generate_recommendations"
+
+    @staticmethod
+    def _unresearched(state: ResearchState) -> List[str]:
+        """Drugs to research that have no DrugInfo yet"""
+        researched = {drug.name for drug in state.drug_info}
+        return [name for name in state.extracted_drugs[:MAX_RESEARCHED_DRUGS] if name not in researched]
+
+    def _is_low_risk(self, state: ResearchState) -> bool:
+        """Every drug researched, every pair in the interaction index, no severity above Minor and no flagged dose"""
+        if len(state.extracted_drugs) > MAX_RESEARCHED_DRUGS or self._unresearched(state):
+            return False
+        # A pair the index has no record for was only assessed heuristically
+        for i, drug_a in enumerate(state.extracted_drugs):
+            for drug_b in state.extracted_drugs[i + 1:]:
+                if self.interaction_index is None or self.interaction_index.pair(drug_a, drug_b) is None:
+                    return False
+        severities = [drug.interaction_severity for drug in state.drug_info]
+        severities += [interaction.interaction_severity for interaction in state.interactions]
+        if any(severity not in LOW_RISK_SEVERITIES for severity in severities):
+            return False
+        return not any(rec.status in FLAGGED_DOSE_STATUSES for rec in state.dosage_recommendations)
+
+    # The sync and async pipelines share every step but their I/O: the helpers
+    # below hold the pre- and post-processing both paths run around a call
 
     def _extract_drugs_step(self, state: ResearchState) -> Dict[str, Any]:
-        print(f"🔍 Extracting drug information from: {state.query}")
+        recognized = self._recognize_drugs(state.query)
+        if recognized is not None:
+            return recognized
         
         # Check if query contains drug names or medical text
         if self._contains_medical_text(state.query):
             # Extract structured drug info using NLP
-            messages = [
-                SystemMessage(content=self.prompts.NLP_EXTRACTION_SYSTEM),
-                HumanMessage(content=self.prompts.nlp_extraction_user(state.query))
-            ]
-            
-            try:
-                response = self.llm.invoke(messages)
-                # Parse JSON response for structured drug info
-                extracted_details = self._parse_drug_details(response.content)
-                drug_names = [detail.drug_name for detail in extracted_details]
-                
-                return {
-                    "extracted_drugs": drug_names,
-                    "extracted_drug_details": extracted_details
-                }
-            except Exception as e:
-                print(f"NLP extraction error: {e}")
-                # Fallback to simple drug name extraction
-                drug_names = self._extract_drug_names_simple(state.query)
-                return {"extracted_drugs": drug_names}
-        else:
-            # Search for drug information based on query
-            search_results = self.firecrawl.search_drug_info(state.query, num_results=3)
-            
-            all_content = ""
-            for result in search_results.data if hasattr(search_results, 'data') else []:
-                url = result.get("url", "")
-                scraped = self.firecrawl.scrape_medical_page(url)
-                if scraped:
-                    all_content += scraped.markdown[:1500] + "\n\n"
-            
-            # Extract drug names from search results
-            messages = [
-                SystemMessage(content=self.prompts.DRUG_EXTRACTION_SYSTEM),
-                HumanMessage(content=self.prompts.drug_extraction_user(state.query, all_content))
-            ]
-            
             try:
-                response = self.llm.invoke(messages)
-                drug_names = [
-                    name.strip()
-                    for name in response.content.strip().split("\n")
-                    if name.strip()
-                ]
-                
-                print(f"Extracted drugs: {', '.join(drug_names[:5])}")
-                return {"extracted_drugs": drug_names}
+                response = self._invoke(self.nlp_extraction_llm, self._nlp_extraction_messages(state.query))
+                return self._nlp_extraction_update(response)
             except Exception as e:
-                print(f"Drug extraction error: {e}")
-                return {"extracted_drugs": []}
+                return self._nlp_extraction_fallback(state.query, e)
+        
+        # Search for drug information based on query, then extract drug names from the results
+        search_results = self.firecrawl.search_drug_info(state.query, num_results=3, max_chars=SEARCH_CONTENT_CHARS)
+        all_content = self._gather_search_content(search_results)
+        try:
+            response = self._invoke(self.llm, self._drug_extraction_messages(state.query, all_content))
+            return self._drug_extraction_update(response.content)
+        except Exception as e:
+            print(f"Drug extraction error: {e}")
+            return {"extracted_drugs": []}
+
+    def _recognize_drugs(self, query: str) -> Optional[Dict[str, Any]]:
+        """Dictionary-based extraction; None when the LLM is still needed"""
+        print(f"🔍 Extracting drug information from: {query}")
+        recognition = self.recognizer.recognize(query)
+        if not recognition.drugs or recognition.confidence < self.recognizer_min_confidence:
+            return None
+        print(f"Recognized drugs: {', '.join(drug.drug_name for drug in recognition.drugs)}")
+        return {
+            "extracted_drugs": [drug.drug_name for drug in recognition.drugs],
+            "extracted_drug_details": recognition.drugs
+        }
+
+    def _nlp_extraction_messages(self, query: str) -> List[Any]:
+        return self._chat_messages(
+            self.prompts.NLP_EXTRACTION_SYSTEM,
+            self.prompts.nlp_extraction_user(query)
+        )
+
+    def _nlp_extraction_fallback(self, query: str, error: Exception) -> Dict[str, Any]:
+        print(f"NLP extraction error: {error}")
+        # Fall back to simple drug name extraction
+        return {"extracted_drugs": self._extract_drug_names_simple(query)}
+
+    def _nlp_extraction_update(self, response: Any) -> Dict[str, Any]:
+        extracted_details = self._parse_drug_details(response)
+        drug_names = [detail.drug_name for detail in extracted_details]
+        
+        return {
+            "extracted_drugs": drug_names,
+            "extracted_drug_details": extracted_details
+        }
+
+    def _drug_extraction_messages(self, query: str, content: str) -> List[Any]:
+        return self._chat_messages(
+            self.prompts.DRUG_EXTRACTION_SYSTEM,
+            self.prompts.drug_extraction_user(query, content)
+        )
+
+    def _drug_extraction_update(self, response_content: str) -> Dict[str, Any]:
+        drug_names = [
+            name.strip()
+            for name in response_content.strip().split("\n")
+            if name.strip()
+        ]
+        
+        print(f"Extracted drugs: {', '.join(drug_names[:5])}")
+        return {"extracted_drugs": drug_names}
 
     def _research_drugs_step(self, state: ResearchState) -> Dict[str, Any]:
-        extracted_drugs = getattr(state, "extracted_drugs", [])
-        if not extracted_drugs:
-            print("⚠️ No extracted drugs found")
+        drug_names = self._research_targets(state)
+        if not drug_names:
             return {"drug_info": []}
+        researched = dict(zip(drug_names, self._research_drugs(drug_names)))
+        return {"drug_info": self._merge_drug_info(state, researched)}
+
+    def _research_targets(self, state: ResearchState) -> List[str]:
+        if not state.extracted_drugs:
+            print("⚠️ No extracted drugs found")
+            return []
+        # Drugs already resolved from local sources are not researched again
+        drug_names = self._unresearched(state)
+        print(f"🔬 Researching specific drugs: {', '.join(drug_names)}")
+        return drug_names
+
+    def _batches_research(self, drug_names: List[str]) -> bool:
+        """Whether drugs are fetched first and then analyzed several per LLM call"""
+        return self.analysis_batch_size > 1 and len(drug_names) > 1
+
+    @staticmethod
+    def _merge_drug_info(state: ResearchState, researched: Dict[str, Optional[DrugInfo]]) -> List[DrugInfo]:
+        """Resolved and newly researched DrugInfo, in extraction order"""
+        known = {drug.name: drug for drug in state.drug_info}
+        drug_info = [
+            researched.get(name) if name in researched else known.get(name)
+            for name in state.extracted_drugs[:MAX_RESEARCHED_DRUGS]
+        ]
+        return [info for info in drug_info if info is not None]
+
+    def _resolve_local_step(self, state: ResearchState) -> Dict[str, Any]:
+        """DrugInfo for every drug with a local monograph whose analysis is already cached"""
+        drug_info = [self._local_drug_info(name) for name in state.extracted_drugs[:MAX_RESEARCHED_DRUGS]]
+        resolved = [self._emit_drug(info) for info in drug_info if info is not None]
+        if resolved:
+            print(f"📚 Resolved locally: {', '.join(drug.name for drug in resolved)}")
+        return {"drug_info": resolved}
+
+    def _local_drug_info(self, drug_name: str) -> Optional[DrugInfo]:
+        local = self._local_monograph(drug_name)
+        if local is None:
+            return None
+        analysis = self._cached_analysis(drug_name, compact_content(local.content, self.content_tokens))
+        if analysis is None:
+            return None
+        drug_info = DrugInfo(name=drug_name, description="", source_url=local.source)
+        self._apply_analysis(drug_info, analysis)
+        return drug_info
+
+    def _research_drugs(self, drug_names: List[str]) -> List[Optional[DrugInfo]]:
+        if self._batches_research(drug_names):
+            return self._research_drugs_batched(drug_names)
+        # Fan out the per-drug pipelines
+        return self._run_parallel(self._research_drug_safe, drug_names)
+
+    def _run_parallel(self, fn: Callable, items: List[Any]) -> List[Any]:
+        """Map fn over items on up to research_concurrency threads, keeping input order"""
+        if self.research_concurrency == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        max_workers = min(self.research_concurrency, len(items))
+        # Each task runs in a copy of this context so tracing follows it
+        contexts = [copy_context() for _ in items]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda context, item: context.run(fn, item), contexts, items))
+
+    def _research_drugs_batched(self, drug_names: List[str]) -> List[Optional[DrugInfo]]:
+        """Fetch every drug page in parallel, then analyze several drugs per LLM call"""
+        fetched = self._run_parallel(self._fetch_drug_safe, drug_names)
+        scraped = self._scraped(fetched)
+        analyses = self._analyze_drugs([(drug_info.name, content) for drug_info, content in scraped])
+        return self._apply_analyses(fetched, scraped, analyses)
+
+    @staticmethod
+    def _scraped(fetched: List[Optional[Tuple[DrugInfo, Optional[str]]]]) -> List[Tuple[DrugInfo, str]]:
+        return [item for item in fetched if item is not None and item[1] is not None]
+
+    def _apply_analyses(
+        self,
+        fetched: List[Optional[Tuple[DrugInfo, Optional[str]]]],
+        scraped: List[Tuple[DrugInfo, str]],
+        analyses: List[DrugAnalysis],
+    ) -> List[Optional[DrugInfo]]:
+        for (drug_info, _), analysis in zip(scraped, analyses):
+            self._apply_analysis(drug_info, analysis)
+        return [self._emit_drug(item[0]) if item is not None else None for item in fetched]
+
+    @staticmethod
+    def _emit_drug(drug_info: Optional[DrugInfo]) -> Optional[DrugInfo]:
+        if drug_info is not None:
+            emit_event({"type": "drug", "drug": drug_info})
+        return drug_info
+
+    def _research_drug_safe(self, drug_name: str) -> Optional[DrugInfo]:
+        """Research a single drug, isolating failures from the other drugs"""
+        try:
+            return self._emit_drug(self._research_drug(drug_name))
+        except Exception as e:
+            return self._research_failed(drug_name, e)
+
+    @staticmethod
+    def _research_failed(drug_name: str, error: Exception) -> None:
+        print(f"Drug research error for {drug_name}: {error}")
+
+    def _research_drug(self, drug_name: str) -> Optional[DrugInfo]:
+        """Search, scrape and analyze a single drug"""
+        fetched = self._fetch_drug(drug_name)
+        if fetched is None:
+            return None
         
-        print(f"🔬 Researching specific drugs: {', '.join(extracted_drugs[:5])}")
+        drug_info, content = fetched
+        if content is not None:
+            analysis = self._analyze_drug_content(drug_name, content)
+            self._apply_analysis(drug_info, analysis)
         
-        drug_info_list = []
-        for drug_name in extracted_drugs[:5]:  # Limit to 5 drugs
-            # Search for specific drug information
-            drug_search_results = self.firecrawl.search_drug_interactions(drug_name, num_results=2)
-            
-            if drug_search_results and hasattr(drug_search_results, 'data') and drug_search_results.data:
-                result = drug_search_results.data[0]
-                url = result.get("url", "")
-                
-                drug_info = DrugInfo(
-                    name=drug_name,
-                    description="",
-                    source_url=url
-                )
-                
-                # Scrape detailed drug information
-                scraped = self.firecrawl.scrape_medical_page(url)
-                if scraped:
-                    content = scraped.markdown
-                    analysis = self._analyze_drug_content(drug_name, content)
-                    
-                    drug_info.interaction_severity = analysis.interaction_severity
-                    drug_info.contraindications = analysis.contraindications
-                    drug_info.age_restrictions = analysis.age_restrictions
-                    drug_info.dosage_forms = analysis.dosage_forms
-                    drug_info.description = analysis.description
-                    drug_info.common_interactions = analysis.common_interactions
-                    drug_info.therapeutic_class = analysis.therapeutic_class
-                    drug_info.monitoring_required = analysis.monitoring_required
-                
-                drug_info_list.append(drug_info)
+        return drug_info
+
+    def _fetch_drug_safe(self, drug_name: str) -> Optional[Tuple[DrugInfo, Optional[str]]]:
+        try:
+            return self._fetch_drug(drug_name)
+        except Exception as e:
+            return self._research_failed(drug_name, e)
+
+    def _fetch_drug(self, drug_name: str) -> Optional[Tuple[DrugInfo, Optional[str]]]:
+        """Search and scrape a single drug; content is None if the page could not be scraped"""
+        local = self._local_monograph(drug_name)
+        if local is not None:
+            return DrugInfo(name=drug_name, description="", source_url=local.source), local.content
         
-        return {"drug_info": drug_info_list}
+        # Search for specific drug information, then scrape the first result
+        drug_info = self._searched_drug(drug_name, self.firecrawl.search_drug_interactions(drug_name, num_results=2))
+        if drug_info is None:
+            return None
+        scraped = self.firecrawl.scrape_medical_page(drug_info.source_url)
+        if scraped and scraped.markdown:
+            self._index_page(drug_name, drug_info.source_url, scraped.markdown)
+        return drug_info, self._scraped_content(scraped)
+
+    def _searched_drug(self, drug_name: str, search_results: Any) -> Optional[DrugInfo]:
+        """DrugInfo pointing at the first search result; None if the search found nothing"""
+        if not (search_results and hasattr(search_results, 'data') and search_results.data):
+            return None
+        return DrugInfo(name=drug_name, description="", source_url=self._result_url(search_results.data[0]))
+
+    @staticmethod
+    def _scraped_content(scraped: Any) -> Optional[str]:
+        return (scraped.markdown or "") if scraped else None
 
-    def _analyze_interactions_step(self, state: ResearchState) -> Dict[str, Any]:
+    def _local_monograph(self, drug_name: str) -> Optional[LocalMonograph]:
+        if self.monograph_index is None:
+            return None
+        try:
+            local = self.monograph_index.lookup(drug_name)
+        except Exception as e:
+            print(f"Monograph index error: {e}")
+            return None
+        tracer.inc("rxverify_monograph_lookups_total", result="hit" if local is not None else "miss")
+        return local
+
+    def _index_page(self, drug_name: str, url: str, markdown: str) -> None:
+        """Keep a scraped page so the next lookup for the drug needs no web search"""
+        if self.monograph_index is None:
+            return
+        try:
+            self.monograph_index.add(drug_name, url, markdown)
+        except Exception as e:
+            print(f"Monograph index error: {e}")
+
+    @staticmethod
+    def _apply_analysis(drug_info: DrugInfo, analysis: DrugAnalysis) -> None:
+        drug_info.interaction_severity = analysis.interaction_severity
+        drug_info.contraindications = analysis.contraindications
+        drug_info.age_restrictions = analysis.age_restrictions
+        drug_info.dosage_forms = analysis.dosage_forms
+        drug_info.description = analysis.description
+        drug_info.common_interactions = analysis.common_interactions
+        drug_info.therapeutic_class = analysis.therapeutic_class
+        drug_info.monitoring_required = analysis.monitoring_required
+
+    @staticmethod
+    def _result_url(result: Any) -> str:
+        """Get the URL of a search result (dict or Firecrawl document)"""
+        if isinstance(result, dict):
+            return result.get("url", "") or ""
+        return getattr(result, "url", "") or ""
+
+    @staticmethod
+    def _result_markdown(result: Any) -> str:
+        if isinstance(result, dict):
+            return result.get("markdown", "") or ""
+        return getattr(result, "markdown", "") or ""
+
+    def _gather_search_content(self, search_results: Any) -> str:
+        """Join search result markdown, scraping only pages the search did not return"""
+        contents, missing = self._search_contents(search_results)
+        if missing:
+            def scrape(url: str) -> str:
+                return self._search_page_text(self.firecrawl.scrape_medical_page(url, max_chars=SEARCH_CONTENT_CHARS))
+            
+            contexts = [copy_context() for _ in missing]
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                pages = executor.map(lambda context, url: context.run(scrape, url), contexts, missing.values())
+                contents.update(zip(missing, pages))
+        return self._join_contents(contents)
+
+    def _search_contents(self, search_results: Any) -> Tuple[Dict[int, str], Dict[int, str]]:
+        """Markdown of each search result, and the URLs of results that came without it"""
+        results = search_results.data if hasattr(search_results, 'data') else []
+        contents = {i: self._result_markdown(result)[:SEARCH_CONTENT_CHARS] for i, result in enumerate(results)}
+        missing = {i: self._result_url(results[i]) for i, content in contents.items() if not content and self._result_url(results[i])}
+        return contents, missing
+
+    @staticmethod
+    def _search_page_text(scraped: Any) -> str:
+        return scraped.markdown[:SEARCH_CONTENT_CHARS] if scraped and scraped.markdown else ""
+
+    @staticmethod
+    def _join_contents(contents: Dict[int, str]) -> str:
+        return "".join(contents[i] + "\n\n" for i in sorted(contents) if contents[i])
+
+    def _analyze_interactions_step(
+        self, state: ResearchState, dose_checks: Optional[List["DoseCheck"]] = None
+    ) -> Dict[str, Any]:
         print("🔍 Analyzing drug interactions")
         
-        drug_info_list = getattr(state, "drug_info", [])
-        if len(drug_info_list) < 2:
+        if dose_checks is None:
+            dose_checks = self.check_doses(state.query, state.extracted_drug_details)
+        return self._interaction_update(
+            getattr(state, "extracted_drugs", []), getattr(state, "drug_info", []), dose_checks=dose_checks
+        )
+
+    def dose_orders(self, query: str, details: List[ExtractedDrugInfo]) -> List["DoseOrder"]:
+        """Dose checker input for each extracted drug with a dose, with age/weight from the query"""
+        from .dosing import DoseOrder, patient_from_text
+
+        age, weight = patient_from_text(query)
+        return [
+            DoseOrder(detail.drug_name, detail.dosage_amount, detail.dosage_unit, detail.frequency, age, weight)
+            for detail in details
+            if detail.dosage_amount
+        ]
+
+    def check_doses(self, query: str, details: List[ExtractedDrugInfo]) -> List["DoseCheck"]:
+        orders = self.dose_orders(query, details)
+        if not orders:
+            return []
+        try:
+            return self.dose_checker.check(orders)
+        except Exception as e:
+            print(f"Dose check error: {e}")
+            return []
+
+    def _interaction_update(
+        self,
+        extracted_drugs: List[str],
+        drug_info_list: List[DrugInfo],
+        previous: Optional[Dict[frozenset, DrugInteraction]] = None,
+        changed: frozenset = frozenset(),
+        dose_checks: Optional[List["DoseCheck"]] = None,
+    ) -> Dict[str, Any]:
+        """Interactions, dosage and alternatives for a drug list.
+
+        With previous pair results, only pairs involving a changed drug are
+        assessed again; the rest are reused as they are.
+        """
+        # The local index covers every extracted drug, not only the researched ones
+        drug_names = list(dict.fromkeys(extracted_drugs + [drug.name for drug in drug_info_list]))
+        if len(drug_info_list) < 2 and not (self.interaction_index and len(drug_names) >= 2):
             return {
                 "interactions": [],
-                "dosage_recommendations": self._generate_dosage_recommendations(drug_info_list),
+                "dosage_recommendations": self._generate_dosage_recommendations(drug_info_list, dose_checks),
                 "alternatives": []
             }
         
+        info_by_name = {drug.name: drug for drug in drug_info_list}
         interactions = []
         # Check interactions between all drug pairs
-        for i, drug1 in enumerate(drug_info_list):
-            for drug2 in drug_info_list[i+1:]:
-                interaction_data = {
-                    "drug_pair": f"{drug1.name} + {drug2.name}",
-                    "interaction_severity": self._assess_interaction_severity(drug1, drug2),
-                    "notes": f"Monitor for interactions between {drug1.therapeutic_class} and {drug2.therapeutic_class}"
-                }
-                interactions.append(interaction_data)
+        for i, name1 in enumerate(drug_names):
+            for name2 in drug_names[i+1:]:
+                if previous is not None and name1.lower() not in changed and name2.lower() not in changed:
+                    interaction_data = previous.get(self._pair_key(name1, name2))
+                else:
+                    interaction_data = self._assess_interaction(name1, name2, info_by_name.get(name1), info_by_name.get(name2))
+                if interaction_data:
+                    interactions.append(interaction_data)
         
-        dosage_recommendations = self._generate_dosage_recommendations(drug_info_list)
+        dosage_recommendations = self._generate_dosage_recommendations(drug_info_list, dose_checks)
         alternatives = self._generate_alternatives(drug_info_list)
         
         return {
@@ -168,93 +736,351 @@ class Workflow:
         }
 
     def _generate_recommendations_step(self, state: ResearchState) -> Dict[str, Any]:
+        try:
+            messages = self._recommendation_messages(state)
+            if _stream_tokens.get():
+                chunks = []
+                # A half-streamed answer cannot be retried, so only the slot is scheduled
+                with scheduler.slot("llm"):
+                    for chunk in self.llm.stream(messages):
+                        chunks.append(self._emit_token(chunk))
+                return {"analysis": "".join(chunks)}
+            response = self._invoke(self.llm, messages)
+            return {"analysis": response.content}
+        except Exception as e:
+            return self._recommendations_failed(e)
+
+    @staticmethod
+    def _emit_token(chunk: Any) -> str:
+        emit_event({"type": "token", "text": chunk.content})
+        return chunk.content
+
+    @staticmethod
+    def _recommendations_failed(error: Exception) -> Dict[str, Any]:
+        print(f"Recommendation generation error: {error}")
+        return {"analysis": RECOMMENDATION_ERROR}
+
+    def recommend(self, state: ResearchState) -> Dict[str, Any]:
+        """Recommendations for an analyzed state, routed as in the graph"""
+        if self._route_recommendations(state) == "template_recommendations":
+            return self._template_recommendations_step(state)
+        return self._generate_recommendations_step(state)
+
+    def _template_recommendations_step(self, state: ResearchState) -> Dict[str, Any]:
+        print("📝 Summarizing low-risk result (no LLM call)")
+        analysis = self._templated_recommendations(state)
+        if _stream_tokens.get():
+            emit_event({"type": "token", "text": analysis})
+        return {"analysis": analysis}
+
+    @staticmethod
+    def _templated_recommendations(state: ResearchState) -> str:
+        """Fixed-form recommendations for a result with nothing above Minor risk"""
+        if not state.drug_info:
+            return (
+                "No medications were identified in the query, so there is nothing to verify. "
+                "Include each drug's name, dose and frequency to check interactions and dosing."
+            )
+        names = ", ".join(drug.name for drug in state.drug_info)
+        checked = [rec.drug_name for rec in state.dosage_recommendations if rec.status == "ok"]
+        sentences = [f"Risk level: low. No major or moderate interactions were found for {names}."]
+        minor = [interaction.drug_pair for interaction in state.interactions if interaction.interaction_severity == "Minor"]
+        if minor:
+            sentences.append(f"Minor interactions ({'; '.join(minor)}) need no change to therapy.")
+        if checked:
+            sentences.append(f"Prescribed doses are within the recommended limits for {', '.join(checked)}.")
+        else:
+            sentences.append("Continue the prescribed doses; no dosage adjustment is indicated.")
+        contraindications = list(dict.fromkeys(c for drug in state.drug_info for c in drug.contraindications))
+        if contraindications:
+            sentences.append(f"Confirm the patient has none of these contraindications: {'; '.join(contraindications[:4])}.")
+        monitoring = list(dict.fromkeys(m for drug in state.drug_info for m in drug.monitoring_required))
+        if monitoring:
+            sentences.append(f"Monitor: {'; '.join(monitoring[:4])}.")
+        sentences.append("Review at the next routine follow-up, or sooner if new symptoms appear.")
+        return " ".join(sentences)
+
+    def _recommendation_messages(self, state: ResearchState) -> List[Any]:
         print("📝 Generating clinical recommendations")
+        # Compile all analysis data, trimmed to the recommendation token budget
+        drug_data = compact_recommendation_data(
+            getattr(state, "drug_info", []),
+            getattr(state, "interactions", []),
+            getattr(state, "dosage_recommendations", []),
+            getattr(state, "alternatives", []),
+            token_budget=self.recommendation_tokens
+        )
         
-        # Compile all analysis data
-        drug_data = {
-            "drugs": [drug.dict() for drug in getattr(state, "drug_info", [])],
-            "interactions": getattr(state, "interactions", []),
-            "dosage_recommendations": getattr(state, "dosage_recommendations", []),
-            "alternatives": getattr(state, "alternatives", [])
-        }
-        
-        messages = [
-            SystemMessage(content=self.prompts.RECOMMENDATIONS_SYSTEM),
-            HumanMessage(content=self.prompts.recommendations_user(state.query, json.dumps(drug_data)))
+        return self._chat_messages(
+            self.prompts.RECOMMENDATIONS_SYSTEM,
+            self.prompts.recommendations_user(state.query, drug_data)
+        )
+
+    def _result_version(self) -> str:
+        # Results also depend on the reference data they were checked against
+        data = [
+            getattr(source, "digest", "") for source in (self.dose_checker, self.interaction_index, self.recognizer)
         ]
-        
+        return ":".join([self.prompts.recommendations_version(), self.model_id] + data)
+
+    def result_key(self, state: ResearchState) -> Optional[str]:
+        """Result cache key for an extracted prescription; None if results are not cached"""
+        if self.result_cache is None or not state.extracted_drugs:
+            return None
+        from .fingerprint import prescription_fingerprint
+
+        fingerprint = prescription_fingerprint(
+            state.extracted_drugs,
+            state.extracted_drug_details,
+            state.query,
+            self._drug_key,
+            self.dose_checker.age_boundaries(),
+        )
+        return SQLiteCache.make_key(fingerprint, self._result_version())
+
+    def cached_result(self, state: ResearchState) -> Optional[Dict[str, Any]]:
+        """State update with the stored result of an identical prescription, or None"""
+        key = self.result_key(state)
+        if key is None:
+            return None
         try:
-            response = self.llm.invoke(messages)
-            return {"analysis": response.content}
+            cached = self.result_cache.get(key)
+        except Exception as e:
+            print(f"Result cache error: {e}")
+            return None
+        tracer.record_route("result_cache", "hit" if cached is not None else "miss")
+        if cached is None:
+            return None
+        # Validated once here to rebuild the typed records from JSON
+        result = ResearchState.model_validate({"query": state.query, **cached})
+        return {field: getattr(result, field) for field in CACHED_RESULT_FIELDS}
+
+    def store_result(self, state: ResearchState) -> None:
+        """Keep a finished result for repeat prescriptions; degraded results are not kept"""
+        key = self.result_key(state)
+        if key is None or state.analysis in (None, RECOMMENDATION_ERROR) or self._unresearched(state):
+            return
+        if any(self._analysis_failed(drug) for drug in state.drug_info):
+            return
+        try:
+            self.result_cache.set(
+                key, state.model_dump(mode="json", include=set(CACHED_RESULT_FIELDS)), tag=self._result_version()
+            )
         except Exception as e:
-            print(f"Recommendation generation error: {e}")
-            return {"analysis": "Unable to generate recommendations due to processing error."}
+            print(f"Result cache error: {e}")
+
+    @staticmethod
+    def _analysis_failed(drug: DrugInfo) -> bool:
+        """DrugInfo whose analysis failed or whose page could not be scraped"""
+        return drug.description == ANALYSIS_FAILED or drug.interaction_severity in (None, "Unknown")
+
+    def _lookup_result_step(self, state: ResearchState) -> Dict[str, Any]:
+        cached = self.cached_result(state)
+        if cached is None:
+            return {}
+        print("♻️ Reusing the result of an identical prescription")
+        if _stream_tokens.get():
+            emit_event({"type": "token", "text": cached["analysis"], "cached": True})
+        return cached
+
+    def _store_result_step(self, state: ResearchState) -> Dict[str, Any]:
+        self.store_result(state)
+        return {}
+
+    def _analysis_version(self) -> str:
+        return f"{self.prompts.drug_interaction_version()}:{self.model_id}"
+
+    def _analysis_cache_key(self, drug_name: str, content: str) -> str:
+        canonical_name = re.sub(r"\s+", " ", drug_name.strip().lower())
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return SQLiteCache.make_key(canonical_name, content_hash, self._analysis_version())
 
     def _analyze_drug_content(self, drug_name: str, content: str) -> DrugAnalysis:
-        """Analyze drug content using structured output"""
-        structured_llm = self.llm.with_structured_output(DrugAnalysis)
-        
-        messages = [
-            SystemMessage(content=self.prompts.DRUG_INTERACTION_SYSTEM),
-            HumanMessage(content=self.prompts.drug_interaction_user(drug_name, content))
-        ]
+        """Analyze drug content, reusing a memoized analysis of the same content"""
+        content = compact_content(content, self.content_tokens)
+        cached = self._cached_analysis(drug_name, content)
+        if cached is not None:
+            return cached
+        return ANALYSIS_FLIGHTS.do(self._analysis_cache_key(drug_name, content), self._analyze_and_store, drug_name, content)
+
+    def _analyze_and_store(self, drug_name: str, content: str) -> DrugAnalysis:
+        analysis = self._analyze_drug_content_uncached(drug_name, content)
+        self._store_analysis(drug_name, content, analysis)
+        return analysis
+
+    def _cached_analysis(self, drug_name: str, content: str) -> Optional[DrugAnalysis]:
+        if self.analysis_cache is None:
+            return None
+        cached = self.analysis_cache.get(self._analysis_cache_key(drug_name, content))
+        return DrugAnalysis(**cached) if cached is not None else None
+
+    def _store_analysis(self, drug_name: str, content: str, analysis: DrugAnalysis) -> None:
+        if self.analysis_cache is None or analysis.description == ANALYSIS_FAILED:
+            return
+        key = self._analysis_cache_key(drug_name, content)
+        self.analysis_cache.set(key, analysis.model_dump(), tag=self._analysis_version())
+
+    def _analyze_drugs(self, drugs: List[Tuple[str, str]]) -> List[DrugAnalysis]:
+        """Analyze (name, content) pairs, sending the uncached ones in batched LLM calls"""
+        compacted = self._compact_drugs(drugs)
+        plan = self._plan_analysis(compacted, [self._cached_analysis(*drug) for drug in compacted], ANALYSIS_FLIGHTS)
+        try:
+            results = self._run_parallel(lambda batch: self._analyze_batch_uncached([compacted[i] for i in batch]), plan.batches)
+            self._record_analyses(plan, results)
+        except BaseException as e:
+            self._finish_flights(plan, ANALYSIS_FLIGHTS, error=e)
+            raise
+        self._finish_flights(plan, ANALYSIS_FLIGHTS)
+        for i in plan.followed:
+            plan.analyses[i] = ANALYSIS_FLIGHTS.wait(plan.keys[i], plan.flights[i][0], self._analyze_and_store, *compacted[i])
+        return plan.analyses
+
+    def _compact_drugs(self, drugs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        return [(name, compact_content(content, self.content_tokens)) for name, content in drugs]
+
+    def _plan_analysis(
+        self, compacted: List[Tuple[str, str]], cached: List[Optional[DrugAnalysis]], flights_group: Any
+    ) -> _AnalysisPlan:
+        """Join a flight for each uncached drug and batch the ones this call leads"""
+        pending = [i for i, analysis in enumerate(cached) if analysis is None]
+        # Drugs another run is already analyzing are awaited rather than batched again
+        keys = {i: self._analysis_cache_key(*compacted[i]) for i in pending}
+        flights = {i: flights_group.join(keys[i]) for i in pending}
+        led = [i for i in pending if flights[i][1]]
+        batches = [led[i:i + self.analysis_batch_size] for i in range(0, len(led), self.analysis_batch_size)]
+        return _AnalysisPlan(compacted, list(cached), keys, flights, batches)
+
+    def _record_analyses(self, plan: _AnalysisPlan, results: List[List[DrugAnalysis]]) -> None:
+        """Keep each batch's analyses in the plan and the analysis cache"""
+        for batch, batch_analyses in zip(plan.batches, results):
+            for i, analysis in zip(batch, batch_analyses):
+                self._store_analysis(*plan.compacted[i], analysis)
+                plan.analyses[i] = analysis
+
+    @staticmethod
+    def _finish_flights(plan: _AnalysisPlan, flights_group: Any, error: Optional[BaseException] = None) -> None:
+        # Analyses recorded before a later batch failed still reach their followers
+        for i in plan.led:
+            failed = error if plan.analyses[i] is None else None
+            flights_group.finish(plan.keys[i], plan.flights[i][0], result=plan.analyses[i], error=failed)
+
+    def _analyze_batch_uncached(self, drugs: List[Tuple[str, str]]) -> List[DrugAnalysis]:
+        """One structured-output call for several drugs, falling back to per-drug calls"""
+        if len(drugs) == 1:
+            return [self._analyze_drug_content_uncached(*drugs[0])]
+        try:
+            batch = self._invoke(self.batch_analysis_llm, self._batch_analysis_messages(drugs))
+        except Exception as e:
+            batch = e
+        matched, missing = self._match_batch_analyses(drugs, batch)
+        matched.update(zip(missing, self._run_parallel(lambda i: self._analyze_drug_content_uncached(*drugs[i]), missing)))
+        return [matched[i] for i in range(len(drugs))]
+
+    @staticmethod
+    def _match_batch_analyses(
+        drugs: List[Tuple[str, str]], batch: Any
+    ) -> Tuple[Dict[int, DrugAnalysis], List[int]]:
+        """Pair batched analyses with the requested drugs by name; the positions left are analyzed one by one.
+
+        batch is the DrugAnalysisBatch, or the exception the batched call raised.
+        """
+        def key(name: str) -> str:
+            return re.sub(r"\s+", " ", name.strip().lower())
         
+        matched: Dict[int, DrugAnalysis] = {}
+        if isinstance(batch, Exception):
+            print(f"Batched drug analysis error: {batch}")
+        else:
+            positions = {key(name): i for i, (name, _) in enumerate(drugs)}
+            for entry in batch.analyses:
+                i = positions.get(key(entry.drug_name))
+                if i is not None and i not in matched:
+                    matched[i] = DrugAnalysis(**entry.model_dump(exclude={"drug_name"}))
+        missing = [i for i in range(len(drugs)) if i not in matched]
+        if missing:
+            print(f"⚠️ Batched analysis missed {len(missing)} of {len(drugs)} drugs, analyzing them individually")
+        return matched, missing
+
+    def _batch_analysis_messages(self, drugs: List[Tuple[str, str]]) -> List[Any]:
+        return self._chat_messages(
+            self.prompts.DRUG_INTERACTION_SYSTEM,
+            self.prompts.drug_batch_analysis_user(drugs)
+        )
+
+    def _drug_analysis_messages(self, drug_name: str, content: str) -> List[Any]:
+        return self._chat_messages(
+            self.prompts.DRUG_INTERACTION_SYSTEM,
+            self.prompts.drug_interaction_user(drug_name, content)
+        )
+
+    @staticmethod
+    def _failed_analysis(error: Exception) -> DrugAnalysis:
+        print(f"Drug analysis error: {error}")
+        return DrugAnalysis(
+            interaction_severity="Unknown",
+            contraindications=[],
+            age_restrictions=[],
+            dosage_forms=[],
+            description=ANALYSIS_FAILED,
+            common_interactions=[],
+            therapeutic_class="Unknown",
+            monitoring_required=[]
+        )
+
+    def _analyze_drug_content_uncached(self, drug_name: str, content: str) -> DrugAnalysis:
+        """Analyze drug content using structured output"""
         try:
-            analysis = structured_llm.invoke(messages)
-            return analysis
+            return self._invoke(self.analysis_llm, self._drug_analysis_messages(drug_name, content))
         except Exception as e:
-            print(f"Drug analysis error: {e}")
-            return DrugAnalysis(
-                interaction_severity="Unknown",
-                contraindications=[],
-                age_restrictions=[],
-                dosage_forms=[],
-                description="Analysis failed",
-                common_interactions=[],
-                therapeutic_class="Unknown",
-                monitoring_required=[]
-            )
+            return self._failed_analysis(e)
 
     def _contains_medical_text(self, text: str) -> bool:
         """Check if text contains medical/prescription information"""
-        medical_patterns = [
-            r'\d+\s*mg', r'\d+\s*mcg', r'\d+\s*ml',
-            r'take\s+\d+', r'twice\s+daily', r'once\s+daily',
-            r'tablet', r'capsule', r'injection'
-        ]
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in medical_patterns)
+        return self.medical_text_classifier.is_medical(text)
 
-    def _parse_drug_details(self, response_content: str) -> List[ExtractedDrugInfo]:
-        """Parse structured drug information from LLM response"""
-        try:
-            # Try to parse JSON response
-            if '{' in response_content:
-                json_str = response_content[response_content.find('{'):response_content.rfind('}')+1]
-                drug_data = json.loads(json_str)
-                
-                if isinstance(drug_data, list):
-                    return [ExtractedDrugInfo(**item) for item in drug_data]
-                else:
-                    return [ExtractedDrugInfo(**drug_data)]
-            else:
-                return []
-        except Exception as e:
-            print(f"JSON parsing error: {e}")
-            return []
+    def _parse_drug_details(self, response: Any) -> List[ExtractedDrugInfo]:
+        """Drugs from a structured (include_raw) or plain-text extraction response"""
+        if isinstance(response, dict):
+            if response.get("parsed") is not None:
+                tracer.inc("rxverify_extraction_parses_total", method="structured")
+                return list(response["parsed"].drugs)
+            # Output that failed schema validation is often truncated or wrapped JSON
+            print(f"Structured extraction error: {response.get('parsing_error')}")
+            method, text = "recovered", raw_output_text(response.get("raw"))
+        else:
+            method, text = "text", response.content
+        details = parse_drug_details(text)
+        tracer.inc("rxverify_extraction_parses_total", method=method if details else "failed")
+        return details
 
     def _extract_drug_names_simple(self, text: str) -> List[str]:
         """Simple drug name extraction fallback"""
-        # This is a basic implementation - in reality, you'd use medical NER
-        common_drugs = [
-            'aspirin', 'ibuprofen', 'acetaminophen', 'metformin', 'lisinopril',
-            'atorvastatin', 'omeprazole', 'warfarin', 'insulin', 'prednisone'
-        ]
-        found_drugs = []
-        text_lower = text.lower()
-        for drug in common_drugs:
-            if drug in text_lower:
-                found_drugs.append(drug.title())
-        return found_drugs
+        return [drug.drug_name for drug in self.recognizer.recognize(text).drugs]
+
+    @staticmethod
+    def _pair_key(name1: str, name2: str) -> frozenset:
+        return frozenset((name1.lower(), name2.lower()))
+
+    def _assess_interaction(
+        self, name1: str, name2: str, drug1: Optional[DrugInfo], drug2: Optional[DrugInfo]
+    ) -> Optional[DrugInteraction]:
+        """Pair-specific interaction from the local index, else the per-drug heuristic"""
+        known = self.interaction_index.pair(name1, name2) if self.interaction_index else None
+        if known:
+            return DrugInteraction(
+                drug_pair=f"{name1} + {name2}",
+                interaction_severity=known["severity"],
+                notes=known["description"],
+                source="interaction_index",
+            )
+        if drug1 is None or drug2 is None:
+            return None
+        return DrugInteraction(
+            drug_pair=f"{name1} + {name2}",
+            interaction_severity=self._assess_interaction_severity(drug1, drug2),
+            notes=f"Monitor for interactions between {drug1.therapeutic_class} and {drug2.therapeutic_class}",
+            source="heuristic",
+        )
 
     def _assess_interaction_severity(self, drug1: DrugInfo, drug2: DrugInfo) -> str:
         """Assess interaction severity between two drugs"""
@@ -266,34 +1092,464 @@ class Workflow:
         else:
             return "Minor"
 
-    def _generate_dosage_recommendations(self, drug_info_list: List[DrugInfo]) -> List[Dict[str, Any]]:
-        """Generate dosage recommendations for drugs"""
+    def _generate_dosage_recommendations(
+        self, drug_info_list: List[DrugInfo], dose_checks: Optional[List["DoseCheck"]] = None
+    ) -> List[DosageRecommendation]:
+        """Dose-range findings for prescribed doses, else general guidance per researched drug"""
+        from .dosing import CHECKED, format_mg
+
         recommendations = []
+        checked = set()
+        for check in dose_checks or []:
+            if check.status not in CHECKED:
+                continue
+            limits = [
+                f"{format_mg(limit)}{suffix}"
+                for limit, suffix in ((check.max_single_mg, " per dose"), (check.max_daily_mg, "/day"))
+                if limit is not None
+            ]
+            recommendations.append(DosageRecommendation(
+                drug_name=check.drug_name,
+                recommended_dose=f"Max {', '.join(limits)}" if limits and check.status != "avoid" else "Avoid",
+                notes=check.message,
+                status=check.status,
+            ))
+            checked.add(self._drug_key(check.drug_name))
         for drug in drug_info_list:
-            rec = {
-                "drug_name": drug.name,
-                "recommended_dose": "Follow prescriber instructions",
-                "notes": "Standard dosing applies unless contraindicated"
-            }
+            if self._drug_key(drug.name) in checked:
+                continue
+            rec = DosageRecommendation(
+                drug_name=drug.name,
+                recommended_dose="Follow prescriber instructions",
+                notes="Standard dosing applies unless contraindicated",
+            )
             if drug.age_restrictions:
-                rec["notes"] = f"Age restrictions: {', '.join(drug.age_restrictions)}"
+                rec.notes = f"Age restrictions: {', '.join(drug.age_restrictions)}"
             recommendations.append(rec)
         return recommendations
 
-    def _generate_alternatives(self, drug_info_list: List[DrugInfo]) -> List[Dict[str, Any]]:
+    def _generate_alternatives(self, drug_info_list: List[DrugInfo]) -> List[Alternative]:
         """Generate alternative medication suggestions"""
         alternatives = []
         for drug in drug_info_list:
             if drug.contraindications:
-                alt = {
-                    "drug_name": f"Alternative to {drug.name}",
-                    "dose": "As prescribed",
-                    "reason": f"Consider due to contraindications: {', '.join(drug.contraindications[:2])}"
-                }
+                alt = Alternative(
+                    drug_name=f"Alternative to {drug.name}",
+                    dose="As prescribed",
+                    reason=f"Consider due to contraindications: {', '.join(drug.contraindications[:2])}",
+                )
                 alternatives.append(alt)
         return alternatives
 
-    def run(self, query: str) -> ResearchState:
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the Firecrawl, DrugAnalysis and result caches and the monograph index"""
+        return {
+            "firecrawl": self._firecrawl.cache_stats() if self._firecrawl is not None else {},
+            "drug_analysis": self.analysis_cache.stats() if self.analysis_cache is not None else {},
+            "results": self.result_cache.stats() if self.result_cache is not None else {},
+            "monographs": self.monograph_index.stats() if self.monograph_index is not None else {},
+        }
+
+    def run(self, query: str, timeout: Optional[float] = None, priority: Optional[str] = None) -> ResearchState:
+        """Verify a prescription; upstream calls give up once timeout seconds have passed"""
+        initial_state = ResearchState(query=query)
+        trace, token = tracer.start_run()
+        try:
+            with request_context(priority, timeout):
+                final_state = self.workflow.invoke(initial_state)
+        finally:
+            timings = tracer.end_run(trace, token)
+        # Node outputs are already typed, so the final state is not validated again
+        return ResearchState.model_construct(**{**final_state, "timings": timings})
+
+    def reverify(
+        self,
+        previous: ResearchState,
+        add: Optional[List[str]] = None,
+        remove: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> ResearchState:
+        """Update a finished verification after drugs are added to or removed from it.
+
+        Kept drugs reuse their DrugInfo and pair results; only drugs without
+        research are researched, only pairs involving them are assessed, and
+        recommendations are regenerated only if the medication list changed.
+        """
+        trace, token = tracer.start_run()
+        try:
+            with request_context(priority, timeout):
+                update = tracer.node("reverify", self._reverify)(previous, add or [], remove or [])
+        finally:
+            timings = tracer.end_run(trace, token)
+        return ResearchState.model_construct(**{**update, "timings": timings})
+
+    def _drug_key(self, name: str) -> str:
+        return self.recognizer.canonical_name(name) or " ".join(name.lower().split())
+
+    def _reverify(self, previous: ResearchState, add: List[str], remove: List[str]) -> Dict[str, Any]:
+        # Shallow copy: kept DrugInfo and interaction objects are reused as they are
+        state = {field: value for field, value in previous if field != "timings"}
+        removed = {self._drug_key(name) for name in remove}
+        kept = [name for name in previous.extracted_drugs if self._drug_key(name) not in removed]
+        removed_names = [name for name in previous.extracted_drugs if self._drug_key(name) in removed]
+        details = [detail for detail in previous.extracted_drug_details if self._drug_key(detail.drug_name) not in removed]
+        
+        known = {self._drug_key(name) for name in kept}
+        added = []
+        for mention in add:
+            recognized = self.recognizer.recognize(mention).drugs
+            # Unrecognized mentions are researched under the name as given
+            for drug in recognized or [ExtractedDrugInfo(drug_name=mention.strip())]:
+                if drug.drug_name and self._drug_key(drug.drug_name) not in known:
+                    known.add(self._drug_key(drug.drug_name))
+                    added.append(drug.drug_name)
+                    if recognized:
+                        details.append(drug)
+        
+        if not added and not removed_names:
+            return state
+        print(f"🔁 Re-verifying: +{', '.join(added) or 'none'} / -{', '.join(removed_names) or 'none'}")
+        
+        extracted_drugs = kept + added
+        previous_info = {self._drug_key(drug.name): drug for drug in previous.drug_info}
+        targets = extracted_drugs[:MAX_RESEARCHED_DRUGS]
+        missing = [name for name in targets if self._drug_key(name) not in previous_info]
+        researched = dict(zip(missing, self._research_drugs(missing)))
+        drug_info = [
+            researched[name] if name in researched else previous_info[self._drug_key(name)]
+            for name in targets
+        ]
+        drug_info = [info for info in drug_info if info is not None]
+        
+        previous_pairs = {}
+        for interaction in previous.interactions:
+            names = interaction.drug_pair.split(" + ")
+            if len(names) == 2:
+                previous_pairs[self._pair_key(*names)] = interaction
+        changed = frozenset(name.lower() for name in added + missing)
+        
+        query = previous.query
+        if added:
+            query += f"; added: {', '.join(added)}"
+        if removed_names:
+            query += f"; removed: {', '.join(removed_names)}"
+        state.update(
+            query=query,
+            extracted_drugs=extracted_drugs,
+            extracted_drug_details=details,
+            drug_info=drug_info,
+            **self._interaction_update(
+                extracted_drugs, drug_info, previous_pairs, changed, dose_checks=self.check_doses(query, details)
+            ),
+        )
+        state.update(self.recommend(ResearchState.model_construct(**state)))
+        return state
+
+    def stream(self, query: str, timeout: Optional[float] = None, priority: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Run the workflow, yielding events as they happen.
+
+        Events are dicts with a "type" of "stage" (a node finished, with its
+        state update), "drug" (one drug researched), "token" (a piece of the
+        recommendations text) and finally "result" (the full ResearchState).
+        A repeat prescription served from the result cache yields a single
+        token with "cached": True and then a "lookup_result" stage whose update
+        holds the whole cached result.
+        """
+        # The run's context variables are set in a context of its own, entered
+        # for each step, so they never leak into the code consuming the events
+        context = copy_context()
+        run = self._stream_run(query, timeout, priority)
+        try:
+            while True:
+                try:
+                    event = context.run(next, run)
+                except StopIteration:
+                    return
+                yield event
+        finally:
+            context.run(run.close)
+
+    def _stream_run(self, query: str, timeout: Optional[float], priority: Optional[str]) -> Iterator[Dict[str, Any]]:
+        initial_state = ResearchState(query=query)
+        state = initial_state.model_dump()
+        trace, token = tracer.start_run()
+        streaming = _stream_tokens.set(True)
+        try:
+            with request_context(priority, timeout):
+                for mode, chunk in self.workflow.stream(initial_state, stream_mode=["updates", "custom"]):
+                    event = self._stream_event(mode, chunk, state)
+                    if event is not None:
+                        yield event
+        finally:
+            _stream_tokens.reset(streaming)
+            timings = tracer.end_run(trace, token)
+        yield {"type": "result", "state": ResearchState.model_construct(**{**state, "timings": timings})}
+
+    @staticmethod
+    def _stream_event(mode: str, chunk: Any, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Turn a LangGraph stream chunk into an event, folding updates into state"""
+        if mode == "custom":
+            return chunk
+        for stage, update in chunk.items():
+            state.update(update or {})
+            return {"type": "stage", "stage": stage, "update": update or {}}
+        return None
+
+    # Async pipeline
+
+    @property
+    def async_firecrawl(self) -> AsyncFirecrawlService:
+        if self._async_firecrawl is None:
+            # Share the on-disk cache with the sync client
+            self._async_firecrawl = AsyncFirecrawlService(
+                cache=getattr(self.firecrawl, "cache", None),
+                cache_only=getattr(self.firecrawl, "cache_only", None),
+            )
+        return self._async_firecrawl
+
+    def _build_async_workflow(self):
+        from langgraph.graph import StateGraph
+
+        graph = StateGraph(ResearchState)
+        graph.add_node("extract_drugs", tracer.node("extract_drugs", self._aextract_drugs_step))
+        # Local resolution, interaction analysis and templating are local work, so the sync nodes are reused
+        graph.add_node("resolve_local", tracer.node("resolve_local", self._resolve_local_step))
+        graph.add_node("research_drugs", tracer.node("research_drugs", self._aresearch_drugs_step))
+        graph.add_node("analyze_interactions", tracer.node("analyze_interactions", self._analyze_interactions_step))
+        graph.add_node("generate_recommendations", tracer.node("generate_recommendations", self._agenerate_recommendations_step))
+        graph.add_node("template_recommendations", tracer.node("template_recommendations", self._template_recommendations_step))
+        self._add_routes(graph)
+        
+        return graph.compile()
+
+    async def _aextract_drugs_step(self, state: ResearchState) -> Dict[str, Any]:
+        recognized = self._recognize_drugs(state.query)
+        if recognized is not None:
+            return recognized
+        
+        if self._contains_medical_text(state.query):
+            try:
+                response = await self._ainvoke(self.nlp_extraction_llm, self._nlp_extraction_messages(state.query))
+                return self._nlp_extraction_update(response)
+            except Exception as e:
+                return self._nlp_extraction_fallback(state.query, e)
+        
+        search_results = await self.async_firecrawl.search_drug_info(
+            state.query, num_results=3, max_chars=SEARCH_CONTENT_CHARS
+        )
+        all_content = await self._agather_search_content(search_results)
+        try:
+            response = await self._ainvoke(self.llm, self._drug_extraction_messages(state.query, all_content))
+            return self._drug_extraction_update(response.content)
+        except Exception as e:
+            print(f"Drug extraction error: {e}")
+            return {"extracted_drugs": []}
+
+    async def _agather_search_content(self, search_results: Any) -> str:
+        contents, missing = self._search_contents(search_results)
+        pages = await asyncio.gather(*(
+            self.async_firecrawl.scrape_medical_page(url, max_chars=SEARCH_CONTENT_CHARS) for url in missing.values()
+        ))
+        contents.update(zip(missing, map(self._search_page_text, pages)))
+        return self._join_contents(contents)
+
+    async def _aresearch_drugs_step(self, state: ResearchState) -> Dict[str, Any]:
+        drug_names = self._research_targets(state)
+        if not drug_names:
+            return {"drug_info": []}
+        researched = dict(zip(drug_names, await self._aresearch_drugs(drug_names)))
+        return {"drug_info": self._merge_drug_info(state, researched)}
+
+    async def _aresearch_drugs(self, drug_names: List[str]) -> List[Optional[DrugInfo]]:
+        if self._batches_research(drug_names):
+            return await self._aresearch_drugs_batched(drug_names)
+        return await self._agather_limited(self._aresearch_drug_safe, drug_names)
+
+    async def _agather_limited(self, fn: Callable, items: List[Any]) -> List[Any]:
+        """Await fn over items, at most research_concurrency at a time, keeping input order"""
+        semaphore = asyncio.Semaphore(self.research_concurrency)
+        
+        async def limited(item: Any) -> Any:
+            async with semaphore:
+                return await fn(item)
+        
+        # gather() keeps results in input order
+        return await asyncio.gather(*(limited(item) for item in items))
+
+    async def _aresearch_drugs_batched(self, drug_names: List[str]) -> List[Optional[DrugInfo]]:
+        fetched = await self._agather_limited(self._afetch_drug_safe, drug_names)
+        scraped = self._scraped(fetched)
+        analyses = await self._aanalyze_drugs([(drug_info.name, content) for drug_info, content in scraped])
+        return self._apply_analyses(fetched, scraped, analyses)
+
+    async def _aresearch_drug_safe(self, drug_name: str) -> Optional[DrugInfo]:
+        try:
+            return self._emit_drug(await self._aresearch_drug(drug_name))
+        except Exception as e:
+            return self._research_failed(drug_name, e)
+
+    async def _aresearch_drug(self, drug_name: str) -> Optional[DrugInfo]:
+        fetched = await self._afetch_drug(drug_name)
+        if fetched is None:
+            return None
+        
+        drug_info, content = fetched
+        if content is not None:
+            analysis = await self._aanalyze_drug_content(drug_name, content)
+            self._apply_analysis(drug_info, analysis)
+        
+        return drug_info
+
+    async def _afetch_drug_safe(self, drug_name: str) -> Optional[Tuple[DrugInfo, Optional[str]]]:
+        try:
+            return await self._afetch_drug(drug_name)
+        except Exception as e:
+            return self._research_failed(drug_name, e)
+
+    async def _afetch_drug(self, drug_name: str) -> Optional[Tuple[DrugInfo, Optional[str]]]:
+        # The monograph index and analysis cache are SQLite, so they are queried off the event loop
+        local = await asyncio.to_thread(self._local_monograph, drug_name)
+        if local is not None:
+            return DrugInfo(name=drug_name, description="", source_url=local.source), local.content
+        
+        search_results = await self.async_firecrawl.search_drug_interactions(drug_name, num_results=2)
+        drug_info = self._searched_drug(drug_name, search_results)
+        if drug_info is None:
+            return None
+        scraped = await self.async_firecrawl.scrape_medical_page(drug_info.source_url)
+        if scraped and scraped.markdown:
+            await asyncio.to_thread(self._index_page, drug_name, drug_info.source_url, scraped.markdown)
+        return drug_info, self._scraped_content(scraped)
+
+    async def _aanalyze_drug_content(self, drug_name: str, content: str) -> DrugAnalysis:
+        content = compact_content(content, self.content_tokens)
+        cached = await asyncio.to_thread(self._cached_analysis, drug_name, content)
+        if cached is not None:
+            return cached
+        key = self._analysis_cache_key(drug_name, content)
+        return await ASYNC_ANALYSIS_FLIGHTS.do(key, self._aanalyze_and_store, drug_name, content)
+
+    async def _aanalyze_and_store(self, drug_name: str, content: str) -> DrugAnalysis:
+        analysis = await self._aanalyze_drug_content_uncached(drug_name, content)
+        await asyncio.to_thread(self._store_analysis, drug_name, content, analysis)
+        return analysis
+
+    async def _aanalyze_drug_content_uncached(self, drug_name: str, content: str) -> DrugAnalysis:
+        try:
+            return await self._ainvoke(self.analysis_llm, self._drug_analysis_messages(drug_name, content))
+        except Exception as e:
+            return self._failed_analysis(e)
+
+    async def _aanalyze_drugs(self, drugs: List[Tuple[str, str]]) -> List[DrugAnalysis]:
+        compacted = self._compact_drugs(drugs)
+        cached = await asyncio.to_thread(lambda: [self._cached_analysis(*drug) for drug in compacted])
+        plan = self._plan_analysis(compacted, cached, ASYNC_ANALYSIS_FLIGHTS)
+        try:
+            results = await asyncio.gather(*(
+                self._aanalyze_batch_uncached([compacted[i] for i in batch]) for batch in plan.batches
+            ))
+            await asyncio.to_thread(self._record_analyses, plan, results)
+        except BaseException as e:
+            self._finish_flights(plan, ASYNC_ANALYSIS_FLIGHTS, error=e)
+            raise
+        self._finish_flights(plan, ASYNC_ANALYSIS_FLIGHTS)
+        for i in plan.followed:
+            plan.analyses[i] = await ASYNC_ANALYSIS_FLIGHTS.wait(
+                plan.keys[i], plan.flights[i][0], self._aanalyze_and_store, *compacted[i]
+            )
+        return plan.analyses
+
+    async def _aanalyze_batch_uncached(self, drugs: List[Tuple[str, str]]) -> List[DrugAnalysis]:
+        if len(drugs) == 1:
+            return [await self._aanalyze_drug_content_uncached(*drugs[0])]
+        try:
+            batch = await self._ainvoke(self.batch_analysis_llm, self._batch_analysis_messages(drugs))
+        except Exception as e:
+            batch = e
+        matched, missing = self._match_batch_analyses(drugs, batch)
+        fallback = await asyncio.gather(*(self._aanalyze_drug_content_uncached(*drugs[i]) for i in missing))
+        matched.update(zip(missing, fallback))
+        return [matched[i] for i in range(len(drugs))]
+
+    async def _agenerate_recommendations_step(self, state: ResearchState) -> Dict[str, Any]:
+        try:
+            messages = self._recommendation_messages(state)
+            if _stream_tokens.get():
+                chunks = []
+                async with scheduler.aslot("llm"):
+                    async for chunk in self.llm.astream(messages):
+                        chunks.append(self._emit_token(chunk))
+                return {"analysis": "".join(chunks)}
+            response = await self._ainvoke(self.llm, messages)
+            return {"analysis": response.content}
+        except Exception as e:
+            return self._recommendations_failed(e)
+
+    async def arun(self, query: str, timeout: Optional[float] = None, priority: Optional[str] = None) -> ResearchState:
+        """Async variant of run() for serving many verifications on one event loop"""
+        if self._async_workflow is None:
+            self._async_workflow = self._build_async_workflow()
         initial_state = ResearchState(query=query)
-        final_state = self.workflow.invoke(initial_state)
-        return ResearchState(**final_state)
+        trace, token = tracer.start_run()
+        try:
+            with request_context(priority, timeout):
+                final_state = await self._async_workflow.ainvoke(initial_state)
+        finally:
+            timings = tracer.end_run(trace, token)
+        return ResearchState.model_construct(**{**final_state, "timings": timings})
+
+    async def astream(
+        self, query: str, timeout: Optional[float] = None, priority: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of stream()"""
+        if self._async_workflow is None:
+            self._async_workflow = self._build_async_workflow()
+        # The run happens in a task of its own (and so in a copy of this context),
+        # so the context variables it sets never leak into the consumer
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(self._apump_stream(query, timeout, priority, events))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            # Raises whatever ended the run early
+            await task
+        finally:
+            task.cancel()
+
+    async def _apump_stream(
+        self, query: str, timeout: Optional[float], priority: Optional[str], events: asyncio.Queue
+    ) -> None:
+        run = self._astream_run(query, timeout, priority)
+        try:
+            async for event in run:
+                events.put_nowait(event)
+        finally:
+            await run.aclose()
+            events.put_nowait(None)
+
+    async def _astream_run(
+        self, query: str, timeout: Optional[float], priority: Optional[str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        initial_state = ResearchState(query=query)
+        state = initial_state.model_dump()
+        trace, token = tracer.start_run()
+        streaming = _stream_tokens.set(True)
+        try:
+            with request_context(priority, timeout):
+                async for mode, chunk in self._async_workflow.astream(initial_state, stream_mode=["updates", "custom"]):
+                    event = self._stream_event(mode, chunk, state)
+                    if event is not None:
+                        yield event
+        finally:
+            _stream_tokens.reset(streaming)
+            timings = tracer.end_run(trace, token)
+        yield {"type": "result", "state": ResearchState.model_construct(**{**state, "timings": timings})}
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP session used by arun()"""
+        if self._async_firecrawl is not None:
+            await self._async_firecrawl.aclose()
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def no_disk_caches(monkeypatch):
+    """Tests never read or write the on-disk caches and indexes"""
+    for name in ("ANALYSIS_CACHE_PATH", "RESULT_CACHE_PATH", "FIRECRAWL_CACHE_PATH", "MONOGRAPH_INDEX_PATH"):
+        monkeypatch.setenv(name, "")
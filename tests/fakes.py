@@ -0,0 +1,134 @@
+"""Instant, deterministic stand-ins for the LLM and Firecrawl backends used by the tests.
+
+Searches for drugs named in `failing` fail (without a retry), so tests can exercise
+the paths where research fails.
+"""
+
+import json
+from typing import Any, Iterable, List
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.firecrawl import AsyncFirecrawlService, CachedScrapeResponse, CachedSearchResponse
+from src.models import DrugAnalysis, DrugAnalysisBatch, ExtractedDrugList, NamedDrugAnalysis
+from src.prompts import DrugAnalysisPrompts
+from src.recognizer import default_recognizer
+
+RECOMMENDATION = "Monitor renal function. No dose adjustment needed. Follow up in two weeks."
+
+
+def monograph(drug_name: str) -> str:
+    return "\n".join([
+        f"# {drug_name.title()}",
+        "## Drug interactions",
+        f"- {drug_name.title()} may interact with NSAIDs.",
+        "## Dosage",
+        "- Usual adult dose: 10 mg once daily.",
+    ])
+
+
+def analysis(model: Any, name: str, **extra: Any) -> Any:
+    return model(
+        **extra,
+        interaction_severity="Moderate",
+        contraindications=["Pregnancy"],
+        description=f"{name} is used to treat chronic conditions.",
+        therapeutic_class="Test class",
+    )
+
+
+class FakeLLM:
+    """Chat model answering every prompt the workflow sends"""
+
+    model_name = "test-llm"
+
+    def __init__(self):
+        self.recognizer = default_recognizer()
+        self.calls = 0
+
+    def _respond(self, messages: List[Any]) -> str:
+        self.calls += 1
+        if messages and messages[0].content == DrugAnalysisPrompts.NLP_EXTRACTION_SYSTEM:
+            drugs = self.recognizer.recognize(messages[-1].content).drugs
+            return json.dumps([drug.model_dump() for drug in drugs])
+        return RECOMMENDATION
+
+    def _structured(self, schema: Any, messages: List[Any]) -> Any:
+        self.calls += 1
+        user = messages[-1].content
+        if schema is DrugAnalysis:
+            return analysis(DrugAnalysis, user.split("\n", 1)[0].replace("Drug:", "").strip())
+        if schema is ExtractedDrugList:
+            return ExtractedDrugList(drugs=self.recognizer.recognize(user).drugs)
+        if schema is DrugAnalysisBatch:
+            names = [line[len("### Drug:"):].strip() for line in user.splitlines() if line.startswith("### Drug:")]
+            return DrugAnalysisBatch(analyses=[analysis(NamedDrugAnalysis, name, drug_name=name) for name in names])
+        raise ValueError(f"FakeLLM has no structured response for {schema}")
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        return AIMessage(content=self._respond(messages))
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> AIMessage:
+        return self.invoke(messages)
+
+    def stream(self, messages: List[Any], *args, **kwargs):
+        for i, word in enumerate(self._respond(messages).split(" ")):
+            yield AIMessageChunk(content=word if i == 0 else " " + word)
+
+    async def astream(self, messages: List[Any], *args, **kwargs):
+        for chunk in self.stream(messages):
+            yield chunk
+
+    def with_structured_output(self, schema: Any, **kwargs) -> "FakeStructuredLLM":
+        return FakeStructuredLLM(self, schema, include_raw=kwargs.get("include_raw", False))
+
+
+class FakeStructuredLLM:
+    def __init__(self, llm: FakeLLM, schema: Any, include_raw: bool = False):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, messages: List[Any], *args, **kwargs) -> Any:
+        result = self.llm._structured(self.schema, messages)
+        if not self.include_raw:
+            return result
+        return {"raw": AIMessage(content=result.model_dump_json()), "parsed": result, "parsing_error": None}
+
+    async def ainvoke(self, messages: List[Any], *args, **kwargs) -> Any:
+        return self.invoke(messages)
+
+
+class FakeFirecrawlApp:
+    """Stands in for firecrawl.FirecrawlApp inside the real FirecrawlService"""
+
+    def __init__(self, failing: Iterable[str] = ()):
+        self.failing = {name.lower() for name in failing}
+        self.searches: List[str] = []
+
+    def search(self, query: str, limit: int = 5, **kwargs) -> CachedSearchResponse:
+        drug_name = query.split(" drug ")[0].strip()
+        self.searches.append(drug_name)
+        if drug_name.lower() in self.failing:
+            raise LookupError(f"no results for {drug_name}")
+        slug = drug_name.lower().replace(" ", "-")
+        return CachedSearchResponse(data=[
+            {"url": f"https://example.org/{slug}/{i}", "markdown": monograph(drug_name)} for i in range(limit)
+        ])
+
+    def scrape_url(self, url: str, **kwargs) -> CachedScrapeResponse:
+        drug_name = url.rstrip("/").split("/")[-2].replace("-", " ")
+        return CachedScrapeResponse(url=url, markdown=monograph(drug_name))
+
+
+class FakeAsyncFirecrawlService(AsyncFirecrawlService):
+    """The real async client with its HTTP layer replaced by FakeFirecrawlApp"""
+
+    def __init__(self, failing: Iterable[str] = (), **kwargs):
+        super().__init__(api_key="fake", **kwargs)
+        self.app = FakeFirecrawlApp(failing)
+
+    async def _post(self, endpoint: str, payload: dict) -> dict:
+        if endpoint == "/v1/search":
+            return self.app.search(payload["query"], payload.get("limit", 5)).model_dump()
+        return {"success": True, "data": self.app.scrape_url(payload["url"]).model_dump()}
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from src.cache import SQLiteCache
+from src.models import DrugAnalysisBatch
+from src.workflow import ANALYSIS_FAILED, Workflow
+from tests.fakes import FakeLLM, monograph
+
+DRUGS = [(name, monograph(name)) for name in ["Warfarin", "Metformin", "Lisinopril"]]
+
+
+class PartialBatchLLM(FakeLLM):
+    """Drops the last drug from every batched answer, or fails batched calls outright"""
+
+    def __init__(self, fail_batches=False, fail_drug=None):
+        super().__init__()
+        self.fail_batches = fail_batches
+        self.fail_drug = fail_drug
+
+    def _structured(self, schema, messages):
+        if schema is DrugAnalysisBatch and self.fail_batches:
+            raise ValueError("malformed batch")
+        if self.fail_drug and messages[-1].content.startswith(f"Drug: {self.fail_drug}"):
+            raise ValueError("analysis failed")
+        result = super()._structured(schema, messages)
+        if schema is DrugAnalysisBatch:
+            result.analyses = result.analyses[:-1]
+        return result
+
+
+def workflow(llm):
+    return Workflow(llm=llm, analysis_cache=SQLiteCache(":memory:"), analysis_batch_size=4)
+
+
+@pytest.mark.parametrize("llm_kwargs", [{}, {"fail_batches": True}, {"fail_batches": True, "fail_drug": "Metformin"}])
+def test_sync_and_async_batches_fall_back_alike(llm_kwargs):
+    sync = workflow(PartialBatchLLM(**llm_kwargs))._analyze_drugs(DRUGS)
+    asynchronous = asyncio.run(workflow(PartialBatchLLM(**llm_kwargs))._aanalyze_drugs(DRUGS))
+
+    assert [a.model_dump() for a in sync] == [a.model_dump() for a in asynchronous]
+    failed = [name for (name, _), a in zip(DRUGS, sync) if a.description == ANALYSIS_FAILED]
+    assert failed == ([llm_kwargs["fail_drug"]] if "fail_drug" in llm_kwargs else [])
@@ -0,0 +1,58 @@
+import json
+
+from src.batch import BatchRunner, completed_ids
+from src.firecrawl import FirecrawlService
+from src.workflow import Workflow
+from tests.fakes import FakeFirecrawlApp, FakeLLM
+
+PRESCRIPTIONS = [
+    {"id": "1", "query": "Metformin 500 mg BID"},
+    {"id": "2", "query": "Warfarin 5 mg daily and metformin 500 mg BID"},
+]
+
+
+def offline_workflow(app, research_concurrency=None):
+    return Workflow(
+        llm=FakeLLM(),
+        firecrawl=FirecrawlService(cache=None, app=app),
+        research_concurrency=research_concurrency,
+        template_low_risk=False,
+    )
+
+
+def run_batch(tmp_path, app):
+    source = tmp_path / "prescriptions.jsonl"
+    source.write_text("".join(json.dumps(row) + "\n" for row in PRESCRIPTIONS), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    runner = BatchRunner(offline_workflow(app), concurrency=2)
+    stats = runner.run(str(source), str(output))
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    return runner, stats, rows
+
+
+def test_failed_research_is_degraded_not_cached(tmp_path):
+    runner, stats, rows = run_batch(tmp_path, FakeFirecrawlApp(failing=["Warfarin"]))
+
+    by_id = {row["id"]: row for row in rows}
+    assert by_id["1"]["status"] == "ok"
+    assert by_id["2"]["status"] == "degraded"
+    assert by_id["2"]["unresearched"] == ["Warfarin"]
+    assert "warfarin" not in runner.drug_cache
+    assert (stats["processed"], stats["degraded"], stats["failed"]) == (1, 1, 0)
+    assert completed_ids(str(tmp_path / "results.jsonl")) == {"1"}
+
+
+def test_resume_retries_only_rows_not_verified(tmp_path):
+    run_batch(tmp_path, FakeFirecrawlApp(failing=["Warfarin"]))
+
+    app = FakeFirecrawlApp()
+    _, stats, rows = run_batch(tmp_path, app)
+    assert stats["skipped"] == 1
+    assert rows[-1]["id"] == "2" and rows[-1]["status"] == "ok"
+    assert sorted(app.searches) == ["Metformin", "Warfarin"]
+    assert completed_ids(str(tmp_path / "results.jsonl")) == {"1", "2"}
+
+
+def test_concurrency_flag_bounds_research():
+    runner = BatchRunner(concurrency=3)
+    assert runner.workflow.research_concurrency == 3
@@ -0,0 +1,49 @@
+import pytest
+
+from src import cache
+from src.cache import SQLiteCache
+from src.workflow import Workflow
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    store = SQLiteCache(":memory:", ttl=60)
+    store.set("a", {"value": 1})
+    clock[0] += 30
+    assert store.get("a") == {"value": 1}
+    clock[0] += 60
+    assert store.get("a") is None
+    assert store.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    store = SQLiteCache(":memory:", max_entries=2)
+    store.set("a", 1)
+    clock[0] += 1
+    store.set("b", 2)
+    clock[0] += 1
+    assert store.get("a") == 1
+    clock[0] += 1
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert store.get("a") == 1 and store.get("c") == 3
+    assert store.evictions == 1
+
+
+def test_workflows_of_other_versions_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    store = SQLiteCache(path, namespace="prescription_results")
+    store.set("older", {"analysis": "kept"}, tag="other-version")
+
+    workflow = Workflow(result_cache=SQLiteCache(path, namespace="prescription_results"))
+    assert store.get("older") == {"analysis": "kept"}
+
+    # Only the explicit maintenance command drops them
+    assert workflow.purge_caches()["result"] == 1
+    assert store.get("older") is None
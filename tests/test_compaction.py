@@ -0,0 +1,25 @@
+import json
+
+from src.compaction import compact_recommendation_data
+from src.models import Alternative, DosageRecommendation, DrugInfo, DrugInteraction
+
+
+def test_tight_budget_keeps_flagged_doses():
+    drugs = [
+        DrugInfo(name=name, description="", therapeutic_class="Anticoagulant", contraindications=["Bleeding"] * 4)
+        for name in ("Warfarin", "Apixaban")
+    ]
+    dosage = [
+        DosageRecommendation("Warfarin", "", notes="50 mg exceeds the 10 mg single-dose limit", status="exceeds_single"),
+        DosageRecommendation("Apixaban", "", notes="No dosing limits on record for this drug", status="no_limits"),
+    ]
+    data = json.loads(compact_recommendation_data(
+        drugs,
+        [DrugInteraction("Warfarin + Apixaban", "Major", notes="Additive bleeding risk")],
+        dosage,
+        [Alternative("Apixaban", "5 mg twice daily", reason="Fewer interactions")],
+        token_budget=50,
+    ))
+    assert data["dosage"] == [{"drug": "Warfarin", "status": "exceeds_single", "notes": dosage[0].notes}]
+    assert "alternatives" not in data
+    assert all("contraindications" not in drug for drug in data["drugs"])
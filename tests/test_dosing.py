@@ -0,0 +1,28 @@
+import math
+
+import pytest
+
+from src.dosing import DEFAULT_LIMITS_PATH, DoseChecker, DoseOrder, doses_per_day
+
+
+@pytest.mark.parametrize("frequency, per_day", [
+    ("BID", 2), ("b.i.d.", 2), ("t.i.d.", 3), ("Q.I.D.", 4), ("q.d.", 1), ("q.o.d.", 0.5),
+    ("twice daily", 2), ("3 times a day", 3), ("q8h", 3), ("every 4-6 hours", 6), ("q1.5h", 16),
+])
+def test_doses_per_day(frequency, per_day):
+    assert doses_per_day(frequency) == per_day
+
+
+@pytest.mark.parametrize("frequency", ["", "PRN", "as directed"])
+def test_unknown_frequency_is_nan(frequency):
+    assert math.isnan(doses_per_day(frequency))
+
+
+def test_dotted_sig_codes_are_checked_against_daily_limits():
+    checker = DoseChecker.from_file(DEFAULT_LIMITS_PATH)
+    ok, over = checker.check([
+        DoseOrder("acetaminophen", "1000", "mg", "q.i.d.", age=40),
+        DoseOrder("acetaminophen", "1000", "mg", "q.4.h.", age=40),
+    ])
+    assert ok.status == "ok" and ok.daily_mg == 4000
+    assert over.status == "exceeds_daily"
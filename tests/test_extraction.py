@@ -0,0 +1,45 @@
+import pytest
+
+from src.extraction import JSONItemParser, parse_drug_details, parse_json_items
+
+NESTED = '[{"drug_name": "A", "dose": {"amount": 5, "unit": "mg"}, "route": "oral"}, {"drug_name": "B"}]'
+
+
+def feed_in_pieces(text, size):
+    parser = JSONItemParser()
+    items = []
+    for start in range(0, len(text), size):
+        items += parser.feed(text[start:start + size])
+    return items + parser.close()
+
+
+def test_items_keep_their_nested_objects():
+    assert parse_json_items(NESTED) == [
+        {"drug_name": "A", "dose": {"amount": 5, "unit": "mg"}, "route": "oral"},
+        {"drug_name": "B"},
+    ]
+
+
+def test_nested_object_before_the_item_key():
+    text = '{"drugs": [{"dose": {"amount": 5}, "drug_name": "A", "frequency": "BID"}]}'
+    assert parse_json_items(text) == [{"dose": {"amount": 5}, "drug_name": "A", "frequency": "BID"}]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(NESTED)])
+def test_items_are_the_same_however_the_text_is_split(size):
+    assert feed_in_pieces(NESTED, size) == parse_json_items(NESTED)
+
+
+def test_truncated_item_keeps_its_complete_members():
+    text = '[{"drug_name": "A", "dose": {"amount": 5}}, {"drug_name": "B", "route": "oral", "dose": {"amou'
+    assert parse_json_items(text) == [{"drug_name": "A", "dose": {"amount": 5}}, {"drug_name": "B", "route": "oral"}]
+
+
+def test_item_key_inside_strings_and_prose_is_ignored():
+    text = 'Found {"note": "no drug_name here", "drug": "{\\"drug_name\\": 1}"} and ```{"drug_name": "C",}```'
+    assert parse_json_items(text) == [{"drug_name": "C"}]
+
+
+def test_drug_details_from_mixed_output():
+    details = parse_drug_details('```json\n{"drugs": [{"drug_name": "Metformin", "dosage_amount": 500, "dose": {"x": 1}}]}\n```')
+    assert [(detail.drug_name, detail.dosage_amount) for detail in details] == [("Metformin", "500")]
@@ -0,0 +1,56 @@
+import shutil
+
+from src.cache import SQLiteCache
+from src.dosing import DEFAULT_LIMITS_PATH, DoseChecker
+from src.fingerprint import age_band, prescription_fingerprint
+from src.models import ExtractedDrugInfo, ResearchState
+from src.workflow import Workflow
+
+BOUNDARIES = [1, 12, 18]
+
+
+def fingerprint(query, frequency="TID"):
+    details = [ExtractedDrugInfo(drug_name="Ibuprofen", dosage_amount="400", dosage_unit="mg", frequency=frequency)]
+    return prescription_fingerprint(["Ibuprofen"], details, query, str.lower, BOUNDARIES)
+
+
+def test_wording_variants_share_a_fingerprint():
+    assert fingerprint("Ibuprofen 400 mg TID for a 30 year old") == fingerprint(
+        "30-year-old: ibuprofen 400mg three times daily", frequency="three times daily"
+    )
+    # Same age band
+    assert fingerprint("Ibuprofen 400 mg TID, 30 years old") == fingerprint("Ibuprofen 400 mg TID, 45 years old")
+
+
+def test_conditions_and_names_change_the_fingerprint():
+    base = fingerprint("Ibuprofen 400 mg TID for a 30 year old")
+    assert fingerprint("Ibuprofen 400 mg TID for a 30 year old, pregnant") != base
+    assert fingerprint("Ibuprofen 400 mg TID for a 30 year old with CKD") != base
+    assert fingerprint("Ibuprofen 400 mg TID for a 30 year old, allergic to aspirin") != base
+    assert fingerprint("Jane Doe, ibuprofen 400 mg TID, 30 years old") != base
+
+
+def test_age_bands_follow_the_dose_limit_boundaries():
+    boundaries = DoseChecker.from_file(DEFAULT_LIMITS_PATH).age_boundaries()
+    assert boundaries == [0.25, 0.5, 1, 3, 6, 10, 12, 16, 18]
+    assert age_band(11, boundaries) == "10-12"
+    assert age_band(70, boundaries) == "18+"
+    assert age_band(None, boundaries) == "unknown"
+
+
+def test_result_version_covers_the_reference_data(tmp_path):
+    limits = tmp_path / "dose_limits.csv"
+    shutil.copy(DEFAULT_LIMITS_PATH, limits)
+    state = ResearchState(query="ibuprofen 400 mg tid", extracted_drugs=["Ibuprofen"])
+
+    def key():
+        workflow = Workflow(
+            result_cache=SQLiteCache(":memory:"), dose_checker=DoseChecker.from_file(str(limits))
+        )
+        return workflow.result_key(state)
+
+    before = key()
+    assert key() == before
+    with open(limits, "a", encoding="utf-8") as f:
+        f.write("ibuprofen,0,0.5,0,0,,,,Not for infants\n")
+    assert key() != before
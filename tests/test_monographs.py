@@ -0,0 +1,33 @@
+import time
+
+from src import monographs
+from src.monographs import MonographIndex
+
+PAGE = "# Warfarin\n## Drug interactions\nAspirin increases bleeding risk.\n## Dosage\n2 to 10 mg daily."
+
+
+def test_scraped_pages_expire_after_ttl_unless_fetched_again(monkeypatch):
+    index = MonographIndex(":memory:", ttl=60)
+    index.add("Warfarin", "https://example.org/warfarin", PAGE)
+    index.add("Warfarin", "file:///monographs/warfarin.md", PAGE.replace("Aspirin", "NSAIDs"))
+    now = time.time()
+
+    monkeypatch.setattr(monographs.time, "time", lambda: now + 120)
+    assert index.lookup("warfarin").source == "file:///monographs/warfarin.md"
+    index.remove("file:///monographs/warfarin.md")
+    assert index.lookup("warfarin") is None
+
+    # A repeat fetch of the same page makes it current again
+    assert not index.add("Warfarin", "https://example.org/warfarin", PAGE)
+    assert index.lookup("warfarin").source == "https://example.org/warfarin"
+
+    monkeypatch.setattr(monographs.time, "time", lambda: now + 240)
+    assert index.purge_expired() == 1
+    assert len(index) == 0
+
+
+def test_lookup_misses_when_no_passage_matches_clinical_terms():
+    index = MonographIndex(":memory:")
+    index.add("Warfarin", "https://example.org/warfarin-history", "# Warfarin\n## History\nFirst sold in 1954 as a rodenticide.")
+    assert index.lookup("warfarin") is None
+    assert index.stats()["misses"] == 1
@@ -0,0 +1,22 @@
+from src.extraction import parse_drug_details
+from src.prompts import DrugAnalysisPrompts
+
+
+def test_analysis_version_follows_rendered_templates(monkeypatch):
+    version = DrugAnalysisPrompts.drug_interaction_version()
+    result_version = DrugAnalysisPrompts.recommendations_version()
+    for template in ("drug_interaction_user", "drug_batch_analysis_user"):
+        original = getattr(DrugAnalysisPrompts, template)
+        monkeypatch.setattr(
+            DrugAnalysisPrompts, template, staticmethod(lambda *args, original=original: original(*args) + "\nBe brief.")
+        )
+        assert DrugAnalysisPrompts.drug_interaction_version() != version
+        assert DrugAnalysisPrompts.recommendations_version() != result_version
+        monkeypatch.undo()
+        assert DrugAnalysisPrompts.drug_interaction_version() == version
+
+
+def test_nlp_extraction_prompt_renders_its_json_example():
+    prompt = DrugAnalysisPrompts.nlp_extraction_user("Metformin 500 mg BID")
+    example = prompt[prompt.index("["):]
+    assert [detail.drug_name for detail in parse_drug_details(example)] == ["Metformin"]
@@ -0,0 +1,25 @@
+from src.recognizer import default_recognizer
+from src.workflow import Workflow
+
+
+def test_unrecognized_brand_lowers_confidence():
+    recognizer = default_recognizer()
+    for query, known in [
+        ("warfarin 5 mg daily plus Eliquis", ["Warfarin"]),
+        ("Lipitor and Xarelto", ["Atorvastatin"]),
+    ]:
+        recognition = recognizer.recognize(query)
+        assert [drug.drug_name for drug in recognition.drugs] == known
+        assert recognition.confidence < 1.0
+
+
+def test_unrecognized_brand_falls_back_to_llm_extraction():
+    workflow = Workflow(recognizer=default_recognizer())
+    assert workflow._recognize_drugs("warfarin 5 mg daily plus Eliquis") is None
+    assert workflow._recognize_drugs("Lipitor and Xarelto") is None
+
+
+def test_fully_recognized_prescription_keeps_full_confidence():
+    recognition = default_recognizer().recognize("Take warfarin 5 mg PO daily with meals; Patient age 45")
+    assert [drug.drug_name for drug in recognition.drugs] == ["Warfarin"]
+    assert recognition.confidence == 1.0
@@ -0,0 +1,42 @@
+from src.models import DrugInfo, DrugInteraction, ResearchState
+from src.workflow import MAX_RESEARCHED_DRUGS, Workflow
+
+
+class PairIndex:
+    """Interaction index holding only the given pairs"""
+
+    def __init__(self, pairs):
+        self.pairs = {frozenset(pair) for pair in pairs}
+
+    def pair(self, drug_a, drug_b):
+        if frozenset((drug_a, drug_b)) in self.pairs:
+            return {"severity": "Minor", "description": "Indexed"}
+        return None
+
+
+def low_risk_state(drugs):
+    return ResearchState(
+        query=" and ".join(drugs),
+        extracted_drugs=drugs,
+        drug_info=[DrugInfo(name=drug, description="Researched", interaction_severity="Minor") for drug in drugs],
+        interactions=[
+            DrugInteraction(drug_pair=f"{a} + {b}", interaction_severity="Minor", source="interaction_index")
+            for i, a in enumerate(drugs) for b in drugs[i + 1:]
+        ],
+    )
+
+
+def test_indexed_minor_pairs_are_low_risk():
+    workflow = Workflow(interaction_index=PairIndex([("A", "B")]))
+    assert workflow._is_low_risk(low_risk_state(["A", "B"]))
+
+
+def test_pair_without_index_entry_is_not_low_risk():
+    workflow = Workflow(interaction_index=PairIndex([("A", "B")]))
+    assert not workflow._is_low_risk(low_risk_state(["A", "C"]))
+
+
+def test_drugs_beyond_research_cap_are_not_low_risk():
+    drugs = [f"D{i}" for i in range(MAX_RESEARCHED_DRUGS + 1)]
+    index = PairIndex([(a, b) for i, a in enumerate(drugs) for b in drugs[i + 1:]])
+    assert not Workflow(interaction_index=index)._is_low_risk(low_risk_state(drugs))
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.scheduler import BATCH, INTERACTIVE, BackendLimiter, DeadlineExceeded, request_context
+
+
+async def enter(limiter, priority, order, timeout=None):
+    with request_context(priority, timeout):
+        async with limiter.aslot():
+            order.append(priority)
+
+
+def test_released_slot_goes_to_interactive_lane_first():
+    async def scenario():
+        limiter = BackendLimiter("test", concurrency=1)
+        order = []
+        await limiter._aacquire(INTERACTIVE, None)
+        batch = asyncio.create_task(enter(limiter, BATCH, order))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(enter(limiter, INTERACTIVE, order))
+        await asyncio.sleep(0.01)
+        assert limiter.stats() == {"active": 1, "waiting_interactive": 1, "waiting_batch": 1}
+        limiter._release()
+        await asyncio.gather(batch, interactive)
+        assert order == [INTERACTIVE, BATCH]
+        assert limiter.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_past_deadline_gives_up_without_leaking_slot():
+    async def scenario():
+        limiter = BackendLimiter("test", concurrency=1)
+        await limiter._aacquire(INTERACTIVE, None)
+        with pytest.raises(DeadlineExceeded):
+            await enter(limiter, INTERACTIVE, [], timeout=0.02)
+        assert limiter.stats() == {"active": 1, "waiting_interactive": 0, "waiting_batch": 0}
+        limiter._release()
+        order = []
+        await enter(limiter, BATCH, order)
+        assert order == [BATCH]
+
+    asyncio.run(scenario())
+
+
+def test_release_from_another_thread_wakes_async_waiter():
+    async def scenario():
+        limiter = BackendLimiter("test", concurrency=1)
+        limiter._acquire(INTERACTIVE, None)
+        order = []
+        waiter = asyncio.create_task(enter(limiter, BATCH, order))
+        await asyncio.sleep(0.01)
+        threading.Timer(0.01, limiter._release).start()
+        await asyncio.wait_for(waiter, 1)
+        assert order == [BATCH]
+
+    asyncio.run(scenario())
+
+
+def test_throttled_caller_holds_no_slot():
+    async def scenario():
+        limiter = BackendLimiter("test", rate_limit=10, burst=1, concurrency=1)
+
+        async def call():
+            return limiter.stats()["active"]
+
+        assert await limiter.acall(call) == 1
+        throttled = asyncio.create_task(limiter.acall(call))
+        await asyncio.sleep(0.03)
+        assert limiter.stats()["active"] == 0
+        assert await throttled == 1
+
+    asyncio.run(scenario())
+
+
+def test_sync_call_passes_time_left_as_client_timeout():
+    limiter = BackendLimiter("test", client_timeout=("timeout", float))
+    with request_context(timeout=5):
+        timeout = limiter.call(lambda **kwargs: kwargs["timeout"])
+    assert 4 < timeout <= 5
+    assert limiter.call(lambda **kwargs: kwargs) == {}
+
+
+def test_async_call_is_cut_off_at_the_deadline():
+    async def scenario():
+        limiter = BackendLimiter("test")
+
+        async def slow():
+            await asyncio.sleep(5)
+
+        start = time.monotonic()
+        with request_context(timeout=0.05):
+            with pytest.raises(DeadlineExceeded):
+                await limiter.acall(slow)
+        assert time.monotonic() - start < 1
+        assert limiter.stats()["active"] == 0
+
+    asyncio.run(scenario())
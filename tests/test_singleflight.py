@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.scheduler import BATCH, INTERACTIVE, DeadlineExceeded, request_context
+from src.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flights = AsyncSingleFlight("test")
+        calls = []
+        started = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0.05)
+            return "page"
+
+        leader = asyncio.create_task(flights.do("key", fetch))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "page"
+        assert leader.cancelled()
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_leader_deadline_is_retried_for_async_followers():
+    async def scenario():
+        flights = AsyncSingleFlight("test")
+        started = asyncio.Event()
+        attempts = []
+
+        async def fetch():
+            attempts.append(1)
+            started.set()
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise DeadlineExceeded("leader out of time")
+            return "page"
+
+        leader = asyncio.create_task(flights.do("key", fetch))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("key", fetch))
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        assert await follower == "page"
+
+    asyncio.run(scenario())
+
+
+def test_leader_deadline_is_retried_for_sync_followers():
+    flights = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    attempts = []
+    results = []
+
+    def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            started.set()
+            release.wait(1)
+            raise DeadlineExceeded("leader out of time")
+        return "page"
+
+    def lead():
+        with pytest.raises(DeadlineExceeded):
+            flights.do("key", fetch)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flights.do("key", fetch)))
+    follower.start()
+    # Let the follower join the leader's flight before the leader gives up
+    time.sleep(0.05)
+    release.set()
+    leader.join(1)
+    follower.join(1)
+    assert results == ["page"]
+    assert len(attempts) == 2
+
+
+def test_shared_call_errors_reach_every_follower_once():
+    async def scenario():
+        flights = AsyncSingleFlight("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("bad page")
+
+        results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(3)), return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError] * 3
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_interactive_callers_are_not_coalesced_onto_batch_work():
+    async def scenario():
+        flights = AsyncSingleFlight("test")
+        lanes = []
+
+        async def fetch(lane):
+            lanes.append(lane)
+            await asyncio.sleep(0.01)
+            return lane
+
+        async def call(lane):
+            with request_context(lane):
+                return await flights.do("key", fetch, lane)
+
+        assert await asyncio.gather(call(BATCH), call(INTERACTIVE), call(BATCH)) == [BATCH, INTERACTIVE, BATCH]
+        assert sorted(lanes) == [BATCH, INTERACTIVE]
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import asyncio
+
+import main
+from src.cache import SQLiteCache
+from src.firecrawl import FirecrawlService
+from src.scheduler import BATCH, INTERACTIVE, current_request
+from src.tracing import current_run
+from src.workflow import Workflow, _stream_tokens
+from tests.fakes import FakeAsyncFirecrawlService, FakeFirecrawlApp, FakeLLM
+
+QUERY = "Patient 45 years: Metformin 500 mg BID, Warfarin 5 mg daily"
+
+
+def offline_workflow():
+    return Workflow(
+        llm=FakeLLM(),
+        firecrawl=FirecrawlService(cache=None, app=FakeFirecrawlApp()),
+        async_firecrawl=FakeAsyncFirecrawlService(cache=None),
+        result_cache=SQLiteCache(":memory:", namespace="results"),
+        template_low_risk=False,
+    )
+
+
+def assert_context_untouched():
+    assert current_request() == (INTERACTIVE, None)
+    assert current_run() is None
+    assert not _stream_tokens.get()
+
+
+def test_stream_served_from_result_cache(capsys):
+    workflow = offline_workflow()
+    first = workflow.run(QUERY)
+
+    events = []
+    for event in workflow.stream(QUERY, timeout=30, priority=BATCH):
+        # The run's context variables stay inside the run
+        assert_context_untouched()
+        events.append(event)
+
+    stages = [event["stage"] for event in events if event["type"] == "stage"]
+    assert stages == ["extract_drugs", "lookup_result"]
+    assert [event["text"] for event in events if event["type"] == "token" and event.get("cached")] == [first.analysis]
+    assert events[-1]["type"] == "result"
+    assert events[-1]["state"].analysis == first.analysis
+
+    capsys.readouterr()
+    for event in events:
+        main.render_event(event)
+    output = capsys.readouterr().out
+    assert "Drug Interactions:" in output
+    assert output.count(first.analysis) == 1
+    assert output.index("Clinical Recommendations:") < output.index(first.analysis)
+
+
+def test_astream_served_from_result_cache():
+    workflow = offline_workflow()
+    first = workflow.run(QUERY)
+
+    async def collect():
+        events = []
+        async for event in workflow.astream(QUERY, timeout=30, priority=BATCH):
+            assert_context_untouched()
+            events.append(event)
+        await workflow.aclose()
+        return events
+
+    events = asyncio.run(collect())
+    assert [event["stage"] for event in events if event["type"] == "stage"] == ["extract_drugs", "lookup_result"]
+    assert events[-1]["state"].analysis == first.analysis
+
+
+def test_abandoned_stream_leaves_context_untouched():
+    workflow = offline_workflow()
+    events = workflow.stream(QUERY, priority=BATCH)
+    next(events)
+    events.close()
+    assert_context_untouched()
+
+
+def test_unstreamed_result_renders_like_a_cached_one(capsys):
+    result = offline_workflow().run(QUERY)
+
+    capsys.readouterr()
+    main.render_result(dict(result))
+    output = capsys.readouterr().out
+    assert "Drugs found: Metformin, Warfarin" in output
+    assert "Drug Interactions:" in output and "Dosage Recommendations:" in output
+    assert output.index("Clinical Recommendations:") < output.index(result.analysis)